@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Date, ForeignKey, CheckConstraint, Time, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Date, ForeignKey, CheckConstraint, Time, JSON, Float
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -33,6 +33,8 @@ class File(Base):
     filename = Column(String(255), nullable=False)
     file_path = Column(Text, nullable=False)
     upload_date = Column(DateTime(timezone=True), server_default=func.now())
+    parse_stage = Column(String(20), nullable=True)  # 'provisional', 'final', 'regex_only', 'failed'
+    parse_version = Column(Integer, nullable=False, default=0, server_default="0")  # bumped on every stored result
     
     # Relationships
     user = relationship("User", back_populates="files")
@@ -120,3 +122,41 @@ class Lectures(Base):
         CheckConstraint(start_date <= end_date, name='valid_date_range'),
         CheckConstraint(type.in_(['lab', 'lecture', 'discussion']), name='valid_lecture_type'),
     )
+
+class ParseRun(Base):
+    __tablename__ = "parse_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # No foreign key: the ledger outlives deleted files
+    file_id = Column(UUID(as_uuid=True), nullable=True, index=True)
+    started_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    outcome = Column(String(20), nullable=False)  # 'completed', 'degraded', 'failed', 'rejected', 'cancelled'
+    error_class = Column(String(100), nullable=True)
+    tier = Column(String(20), nullable=True)
+    model = Column(String(50), nullable=True)
+    route = Column(String(30), nullable=True)
+    chunks = Column(Integer, nullable=True)
+    llm_calls = Column(Integer, nullable=False, default=0)
+    retries = Column(Integer, nullable=False, default=0)
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    cached_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    cache_hits = Column(Integer, nullable=False, default=0)  # LLM calls served partly from the provider prompt cache
+    cost_usd = Column(Float, nullable=True)  # None when the model has no price in LLM_PRICING
+    total_s = Column(Float, nullable=True)  # wall time of the whole job, queue to stored result
+    llm_s = Column(Float, nullable=True)
+    timings = Column(JSON, nullable=True)  # per-stage seconds from the parser
+
+    # Constraints
+    __table_args__ = (
+        CheckConstraint(outcome.in_(['completed', 'degraded', 'failed', 'rejected', 'cancelled']), name='valid_outcome'),
+    )
+
+class LLMRateBucket(Base):
+    __tablename__ = "llm_rate_buckets"
+
+    # One row per shared budget; PostgresRateLimiter updates it under SELECT ... FOR UPDATE
+    name = Column(String(64), primary_key=True)
+    requests = Column(Float, nullable=False)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)  # epoch seconds, from the database clock
@@ -0,0 +1,181 @@
+"""
+batching.py — packing several small documents into one LLM request
+
+A one-page lab or section schedule spends most of its LLM latency on
+per-request overhead, and at the start of a term thousands of them arrive
+together. With LLM_BATCH on, small single-chunk documents are not sent alone:
+the first one to arrive opens a batch and leads it, later ones join it, and
+the leader sends one request for all of them once the batch is
+
+- full: LLM_BATCH_MAX_DOCS documents or LLM_BATCH_MAX_TOKENS prompt tokens, or
+- old: LLM_BATCH_MAX_WAIT_MS after it opened, so interactive latency grows by
+  at most that much, or
+- alone: no other parse is in progress (Batcher.parsing), so nothing could
+  join it and a lone upload does not wait at all
+
+Each member gets its own document's result back and continues through its
+own job's merge and store path. A batch of one, a failed batch call or a
+document missing from the response is not an error: the member makes its
+normal single-document call instead (result None).
+
+Jobs run in separate event loops (one asyncio.run per background task), so
+results are handed to each member through its own loop with
+call_soon_threadsafe.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from .config import LLM_BATCH, LLM_BATCH_MAX_DOCS, LLM_BATCH_MAX_TOKENS, LLM_BATCH_MAX_WAIT_MS
+from .metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# Sends one request for the payloads; returns one result per payload (None = not in the response)
+BatchRunner = Callable[[List[Any]], Awaitable[List[Optional[Any]]]]
+
+
+class _Batch:
+    __slots__ = ("key", "loop", "ready", "members", "tokens", "closed", "opened")
+
+    def __init__(self, key: Hashable, loop: asyncio.AbstractEventLoop):
+        self.key = key
+        self.loop = loop                   # the leader's loop
+        self.ready = loop.create_future()  # set when the batch fills up
+        self.members: List[Tuple[Any, asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self.tokens = 0
+        self.closed = False
+        self.opened = time.monotonic()
+
+
+def _resolve(future: asyncio.Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+def _deliver(loop: asyncio.AbstractEventLoop, future: asyncio.Future, result: Any = None,
+             error: Optional[BaseException] = None) -> None:
+    try:
+        loop.call_soon_threadsafe(_resolve, future, result, error)
+    except RuntimeError:  # that job's loop is gone
+        pass
+
+
+class Batcher:
+    """Open batches per key (model + schema), shared across threads and event loops."""
+
+    def __init__(self, max_docs: int = LLM_BATCH_MAX_DOCS, max_tokens: int = LLM_BATCH_MAX_TOKENS,
+                 max_wait: float = LLM_BATCH_MAX_WAIT_MS / 1000):
+        self.max_docs = max_docs
+        self.max_tokens = max_tokens
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._open: Dict[Hashable, _Batch] = {}
+        self._parsing = 0
+
+    @contextmanager
+    def parsing(self) -> Iterator[None]:
+        """Marks one parse in progress: until it reaches the LLM step, it may still join a batch."""
+        with self._lock:
+            self._parsing += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._parsing -= 1
+
+    def _close(self, batch: _Batch) -> None:
+        # Caller holds _lock
+        if batch.closed:
+            return
+        batch.closed = True
+        if self._open.get(batch.key) is batch:
+            del self._open[batch.key]
+        _deliver(batch.loop, batch.ready)
+
+    async def submit(self, key: Hashable, payload: Any, tokens: int, run: BatchRunner) -> Optional[Any]:
+        """
+        This document's result from a batched request, or None when it should
+        make its own request. `run` is used if this call ends up leading.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            batch = self._open.get(key)
+            if batch is not None and batch.tokens + tokens > self.max_tokens:
+                self._close(batch)
+                batch = None
+            leader = batch is None
+            if leader:
+                batch = self._open[key] = _Batch(key, loop)
+            batch.members.append((payload, loop, future))
+            batch.tokens += tokens
+            if len(batch.members) >= self.max_docs:
+                self._close(batch)
+        if leader:
+            await self._lead(batch, run)
+        try:
+            return await future
+        except Exception as e:
+            get_metrics().incr("llm_batch_fallbacks_total", reason=type(e).__name__)
+            logger.warning(f"Batched LLM request failed, parsing the document on its own: {e}")
+            return None
+
+    async def _lead(self, batch: _Batch, run: BatchRunner) -> None:
+        try:
+            with self._lock:
+                company = self._parsing > len(batch.members)
+            if company:
+                try:
+                    await asyncio.wait_for(asyncio.shield(batch.ready), self.max_wait)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                get_metrics().incr("llm_batch_wait_skipped_total")
+            with self._lock:
+                self._close(batch)
+            members = batch.members
+            metrics = get_metrics()
+            metrics.observe("llm_batch_size", len(members))
+            metrics.observe("llm_batch_wait_seconds", time.monotonic() - batch.opened)
+            if len(members) == 1:
+                results: List[Optional[Any]] = [None]
+            else:
+                results = await run([payload for payload, _, _ in members])
+                metrics.incr("llm_batched_docs_total", len(members))
+                logger.info(f"Batched LLM request: {len(members)} documents, {batch.tokens} prompt tokens")
+            for (_, loop, future), result in zip(members, results):
+                _deliver(loop, future, result)
+        except BaseException as e:
+            # Leader cancelled or the batch call raised: every member falls back to its own request
+            with self._lock:
+                self._close(batch)
+            error = e if isinstance(e, Exception) else RuntimeError("batch leader cancelled")
+            for _, loop, future in batch.members:
+                _deliver(loop, future, error=error)
+            if not isinstance(e, Exception):
+                raise
+
+
+_batcher: Optional[Batcher] = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher() -> Optional[Batcher]:
+    """Get or create the process-wide batcher (None unless LLM_BATCH is on)"""
+    global _batcher
+    if not LLM_BATCH:
+        return None
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = Batcher()
+    return _batcher
@@ -0,0 +1,253 @@
+"""
+boilerplate.py — corpus-wide index of recurring syllabus paragraphs
+
+Academic-integrity, accessibility and Title IX statements are pasted verbatim
+into thousands of syllabi. Each parsed document contributes the word shingles
+of its policy paragraphs to a shared index (counted once per document), and
+any policy paragraph whose shingles mostly recur across at least
+BOILERPLATE_MIN_DOCS documents is dropped or collapsed before the prompt is
+rendered.
+
+- Only paragraphs that match a known policy label (_LABELS) are ever indexed
+  or suppressed: course descriptions and grading text recur across sections
+  of one course too, and the LLM needs those
+
+- Shingles are 64-bit blake2b hashes so lookups are plain dict hits
+- Documents are keyed by content hash, so re-parsing a file never inflates counts
+- The index holds the BOILERPLATE_MAX_DOCS most recently indexed documents;
+  older ones are evicted and their shingle counts taken back (LRU)
+- Documents are added only once their parse has succeeded
+- Optional append-only JSONL log (BOILERPLATE_INDEX_PATH) persists the index.
+  Workers pointed at the same file pick up each other's entries before every
+  lookup, so they converge on the same index; until a worker has read the
+  newest lines, the same document can still get a slightly different prompt
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .config import BOILERPLATE_INDEX_PATH, BOILERPLATE_MAX_DOCS, BOILERPLATE_MIN_DOCS
+
+logger = logging.getLogger(__name__)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Constants
+# ──────────────────────────────────────────────────────────────────────────────
+
+SHINGLE_SIZE = 5
+MIN_PARAGRAPH_WORDS = 30
+MATCH_RATIO = 0.8
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_PAGE_HEADER_RE = re.compile(r"^(\[PAGE \d+\]\n)")
+# Paragraphs carrying dates or times are schedule content, never boilerplate
+_DATED_RE = re.compile(
+    r"\b\d{1,2}/\d{1,2}\b|\b\d{1,2}:\d{2}\b|"
+    r"\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+\d{1,2}\b",
+    re.IGNORECASE,
+)
+
+# The only paragraphs that count as boilerplate: institutional policy statements
+_LABELS = [
+    (re.compile(r"academic\s+(?:integrity|honesty|misconduct)|plagiari", re.IGNORECASE), "academic integrity"),
+    (re.compile(r"disabilit|(?:reasonable|academic|testing)\s+accommodations?|"
+                r"accessibility\s+(?:services|resources|office)", re.IGNORECASE), "accessibility"),
+    (re.compile(r"title\s+ix|sexual\s+(?:harassment|misconduct)", re.IGNORECASE), "Title IX"),
+    (re.compile(r"mental\s+health|counseling\s+(?:services|center)|psychological\s+services", re.IGNORECASE),
+     "wellness"),
+]
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Shingling
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _words(paragraph: str) -> List[str]:
+    return _WORD_RE.findall(paragraph.lower())
+
+
+def _shingles(words: List[str], k: int = SHINGLE_SIZE) -> Set[int]:
+    if len(words) < k:
+        return set()
+    return {
+        int.from_bytes(hashlib.blake2b(" ".join(words[i:i + k]).encode(), digest_size=8).digest(), "big")
+        for i in range(len(words) - k + 1)
+    }
+
+
+def _policy_label(paragraph: str) -> Optional[str]:
+    for pattern, label in _LABELS:
+        if pattern.search(paragraph):
+            return label
+    return None
+
+
+def _eligible(paragraph: str, words: List[str]) -> bool:
+    return (len(words) >= MIN_PARAGRAPH_WORDS and not _DATED_RE.search(paragraph)
+            and _policy_label(paragraph) is not None)
+
+
+def _split_header(paragraph: str) -> Tuple[str, str]:
+    """Separate a leading "[PAGE N]" marker so it never affects matching."""
+    m = _PAGE_HEADER_RE.match(paragraph)
+    if not m:
+        return "", paragraph
+    return m.group(1), paragraph[m.end():]
+
+
+def _placeholder(paragraph: str) -> str:
+    # Only reached for eligible paragraphs, which always carry a label
+    return f"[Standard {_policy_label(paragraph)} statement omitted]"
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Index
+# ──────────────────────────────────────────────────────────────────────────────
+
+class ShingleIndex:
+    """Document-frequency index of paragraph shingles, shared by all parses."""
+
+    def __init__(self, min_docs: int = BOILERPLATE_MIN_DOCS, match_ratio: float = MATCH_RATIO,
+                 path: Optional[str] = None, max_docs: int = BOILERPLATE_MAX_DOCS):
+        self.min_docs = min_docs
+        self.match_ratio = match_ratio
+        self.path = path
+        self.max_docs = max_docs
+        self._shingle_docs: Dict[int, int] = {}
+        # doc key -> its shingles (packed), oldest first
+        self._docs: "OrderedDict[str, array]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._log_offset = 0
+        self._refresh()
+
+    @property
+    def document_count(self) -> int:
+        return len(self._docs)
+
+    def is_boilerplate(self, paragraph: str) -> bool:
+        words = _words(paragraph)
+        if not _eligible(paragraph, words):
+            return False
+        shingles = _shingles(words)
+        if not shingles:
+            return False
+        frequent = sum(1 for s in shingles if self._shingle_docs.get(s, 0) >= self.min_docs)
+        return frequent / len(shingles) >= self.match_ratio
+
+    def suppress(self, text: str, collapse: bool = True) -> Tuple[str, int]:
+        """
+        Drop (or collapse to a one-line placeholder) paragraphs that recur across
+        the corpus. Returns the filtered text and the number of paragraphs removed.
+        """
+        self._refresh()
+        if self.document_count < self.min_docs:
+            return text, 0
+        out: List[str] = []
+        omitted = 0
+        for para in text.split("\n\n"):
+            header, body = _split_header(para)
+            if not self.is_boilerplate(body):
+                out.append(para)
+                continue
+            omitted += 1
+            if collapse:
+                out.append(header + _placeholder(body))
+            elif header:
+                out.append(header.rstrip("\n"))
+        return "\n\n".join(out), omitted
+
+    def add_document(self, text: str) -> bool:
+        """Count the shingles of one document. Returns False if it was already indexed."""
+        doc_key = hashlib.sha1(text.encode()).hexdigest()
+        shingles: Set[int] = set()
+        for para in text.split("\n\n"):
+            _, body = _split_header(para)
+            words = _words(body)
+            if _eligible(body, words):
+                shingles |= _shingles(words)
+        self._refresh()
+        with self._lock:
+            if doc_key in self._docs:
+                self._docs.move_to_end(doc_key)
+                return False
+            self._apply(doc_key, shingles)
+            if self.path:
+                self._append(doc_key, shingles)
+        return True
+
+    def _apply(self, doc_key: str, shingles: Iterable[int]) -> None:
+        # Caller holds _lock (or is __init__)
+        packed = array("Q", shingles)
+        self._docs[doc_key] = packed
+        counts = self._shingle_docs
+        for s in packed:
+            counts[s] = counts.get(s, 0) + 1
+        while len(self._docs) > self.max_docs:
+            self._evict()
+
+    def _evict(self) -> None:
+        _, packed = self._docs.popitem(last=False)
+        counts = self._shingle_docs
+        for s in packed:
+            remaining = counts[s] - 1
+            if remaining:
+                counts[s] = remaining
+            else:
+                del counts[s]
+
+    def _append(self, doc_key: str, shingles: Set[int]) -> None:
+        # Caller holds _lock; our own line is skipped by the next _refresh (already indexed)
+        try:
+            with open(self.path, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps({"doc": doc_key, "shingles": sorted(shingles)}) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not persist boilerplate index entry: {e}")
+
+    def _refresh(self) -> None:
+        """Apply log lines written since the last read (by this or another worker)."""
+        if not self.path:
+            return
+        try:
+            if os.path.getsize(self.path) <= self._log_offset:
+                return
+        except OSError:
+            return
+        with self._lock:
+            try:
+                with open(self.path, "rb") as fh:
+                    fh.seek(self._log_offset)
+                    for raw in fh:
+                        if not raw.endswith(b"\n"):
+                            break  # a line still being written; read it next time
+                        self._log_offset += len(raw)
+                        if not raw.strip():
+                            continue
+                        entry = json.loads(raw)
+                        if entry["doc"] in self._docs:
+                            self._docs.move_to_end(entry["doc"])
+                        else:
+                            self._apply(entry["doc"], entry["shingles"])
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Could not load boilerplate index from {self.path}: {e}")
+
+
+_index: Optional[ShingleIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_shingle_index() -> ShingleIndex:
+    """Get or create the process-wide shingle index"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ShingleIndex(path=BOILERPLATE_INDEX_PATH)
+    return _index
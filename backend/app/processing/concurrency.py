@@ -0,0 +1,189 @@
+"""
+concurrency.py — adaptive limit on in-flight LLM calls
+
+A fixed concurrency is either too low (capacity left idle) or too high (the
+provider throttles and every call slows down). AdaptiveLimiter adjusts the
+number of calls in flight with AIMD, from what each call reports back:
+
+- increase: +1 / limit per successful call, i.e. about +1 per round of calls,
+  but only while the limit is actually being used
+- decrease: × LLM_CONCURRENCY_BACKOFF on a transient failure (429 / 5xx /
+  timeout), or when a label's short-term latency average rises above
+  LLM_CONCURRENCY_LATENCY_RATIO × its long-term average; at most once per
+  long-term latency, so one burst of slow calls counts as one signal
+
+Latency is compared per call label (full, compact, metadata, ...) because the
+labels have very different normal latencies. Client errors (400, bad schema)
+leave the limit alone.
+
+One limiter serves every parse in the process: chunk and group fan-out
+within a job and concurrent jobs alike. Jobs run in separate event loops
+(one asyncio.run per background task), so waiters are woken through their
+own loop with call_soon_threadsafe, in FIFO order.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from .config import (
+    LLM_CONCURRENCY, LLM_CONCURRENCY_BACKOFF, LLM_CONCURRENCY_INITIAL, LLM_CONCURRENCY_LATENCY_RATIO,
+    LLM_CONCURRENCY_MAX, LLM_CONCURRENCY_MIN,
+)
+from .metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+SHORT_ALPHA = 0.3    # EWMA weight of the newest latency, short-term average
+LONG_ALPHA = 0.05    # ... long-term average
+WARMUP_CALLS = 5     # per label, before latency can trigger a decrease
+DEFAULT_WINDOW_S = 1.0  # decrease spacing before a label has a latency average
+
+
+class _LatencyTrend:
+    __slots__ = ("short", "long", "count")
+
+    def __init__(self):
+        self.short = self.long = 0.0
+        self.count = 0
+
+    def update(self, seconds: float) -> None:
+        if self.count == 0:
+            self.short = self.long = seconds
+        else:
+            self.short += SHORT_ALPHA * (seconds - self.short)
+            self.long += LONG_ALPHA * (seconds - self.long)
+        self.count += 1
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit shared across threads and event loops."""
+
+    def __init__(self, initial: int = LLM_CONCURRENCY_INITIAL, min_limit: int = LLM_CONCURRENCY_MIN,
+                 max_limit: int = LLM_CONCURRENCY_MAX, backoff: float = LLM_CONCURRENCY_BACKOFF,
+                 latency_ratio: float = LLM_CONCURRENCY_LATENCY_RATIO):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_ratio = latency_ratio
+        self._limit = float(max(min_limit, min(max_limit, initial)))
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._trends: Dict[str, _LatencyTrend] = {}
+        self._last_decrease = 0.0
+        self._publish()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def _publish(self) -> None:
+        metrics = get_metrics()
+        metrics.set_gauge("llm_concurrency_limit", int(self._limit))
+        metrics.set_gauge("llm_concurrency_in_flight", self._in_flight)
+        metrics.set_gauge("llm_concurrency_queue", len(self._waiters))
+
+    # ── slots ────────────────────────────────────────────────────────────────
+
+    async def acquire(self) -> None:
+        """Wait for a slot (FIFO); pair with release()."""
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._in_flight < int(self._limit) and not self._waiters:
+                self._in_flight += 1
+                self._publish()
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+            self._publish()
+        try:
+            await waiter[1]
+        except BaseException:
+            with self._lock:
+                try:
+                    self._waiters.remove(waiter)
+                    granted = False
+                except ValueError:
+                    # Granted already; if the grant callback is still pending it sees the
+                    # cancelled future and gives the slot back itself
+                    granted = waiter[1].done() and not waiter[1].cancelled()
+                self._publish()
+            if granted:
+                self._give_back()
+            raise
+        get_metrics().observe("llm_concurrency_wait_seconds", time.monotonic() - started)
+
+    def _grant(self, future: asyncio.Future) -> None:
+        # Runs in the waiter's own loop
+        if future.done():
+            self._give_back()
+        else:
+            future.set_result(None)
+
+    def _give_back(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._wake()
+
+    def _wake(self) -> None:
+        # Caller holds _lock
+        while self._waiters and self._in_flight < int(self._limit):
+            loop, future = self._waiters.popleft()
+            self._in_flight += 1
+            try:
+                loop.call_soon_threadsafe(self._grant, future)
+            except RuntimeError:  # that job's loop is gone
+                self._in_flight -= 1
+        self._publish()
+
+    def release(self, label: str, latency: Optional[float], outcome: str) -> None:
+        """
+        Free the slot and adapt the limit. outcome: "ok", "overload" (transient
+        provider failure), or "neutral" (client error, cancelled: no signal).
+        """
+        with self._lock:
+            self._in_flight -= 1
+            if outcome == "ok" and latency is not None:
+                trend = self._trends.setdefault(label, _LatencyTrend())
+                trend.update(latency)
+                if trend.count > WARMUP_CALLS and trend.short > trend.long * self.latency_ratio:
+                    self._decrease("latency", trend.long)
+                elif self._in_flight + 1 >= int(self._limit):
+                    self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            elif outcome == "overload":
+                trend = self._trends.get(label)
+                self._decrease("error", trend.long if trend else DEFAULT_WINDOW_S)
+            self._wake()
+
+    def _decrease(self, reason: str, window: float) -> None:
+        # Caller holds _lock
+        now = time.monotonic()
+        if now - self._last_decrease < window:
+            return
+        self._last_decrease = now
+        before = int(self._limit)
+        self._limit = max(float(self.min_limit), self._limit * self.backoff)
+        get_metrics().incr("llm_concurrency_decreases_total", reason=reason)
+        if int(self._limit) != before:
+            logger.info(f"LLM concurrency limit {before} -> {int(self._limit)} ({reason})")
+
+
+_limiter: Optional[AdaptiveLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_concurrency_limiter() -> Optional[AdaptiveLimiter]:
+    """Get or create the process-wide limiter (None when LLM_CONCURRENCY=off)"""
+    global _limiter
+    if LLM_CONCURRENCY == "off":
+        return None
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = AdaptiveLimiter()
+    return _limiter
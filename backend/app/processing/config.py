@@ -6,3 +6,82 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 DEFAULT_MODEL = "gpt-5-mini"
 MAX_TOKENS = 6000
+
+# Boilerplate suppression of recurring policy statements: off | collapse | drop
+BOILERPLATE_MODE = os.getenv("BOILERPLATE_MODE", "off")
+BOILERPLATE_MIN_DOCS = int(os.getenv("BOILERPLATE_MIN_DOCS", "5"))
+BOILERPLATE_INDEX_PATH = os.getenv("BOILERPLATE_INDEX_PATH")
+BOILERPLATE_MAX_DOCS = int(os.getenv("BOILERPLATE_MAX_DOCS", "5000"))
+
+# Table serialization in prompts: markdown | compact | tsv
+TABLE_FORMAT = os.getenv("TABLE_FORMAT", "markdown")
+
+# LLM response schema: full (SyllabusData) | compact (CompactSyllabusData)
+RESPONSE_SCHEMA = os.getenv("RESPONSE_SCHEMA", "full")
+
+# PDF extraction tier: fast | balanced | accurate | auto
+EXTRACTION_TIER = os.getenv("EXTRACTION_TIER", "auto")
+
+# Extraction guards (see sandbox.py); EXTRACT_ISOLATION: process | inline
+EXTRACT_ISOLATION = os.getenv("EXTRACT_ISOLATION", "process")
+EXTRACT_TIMEOUT_S = float(os.getenv("EXTRACT_TIMEOUT_S", "120"))
+EXTRACT_PAGE_TIMEOUT_S = float(os.getenv("EXTRACT_PAGE_TIMEOUT_S", "15"))
+EXTRACT_MEMORY_MB = int(os.getenv("EXTRACT_MEMORY_MB", "2048"))
+MAX_PDF_BYTES = int(os.getenv("MAX_PDF_BYTES", str(25 * 1024 * 1024)))
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "150"))
+
+# LLM record / replay (see replay.py): off | record | replay
+LLM_REPLAY_MODE = os.getenv("LLM_REPLAY_MODE", "off")
+LLM_REPLAY_DIR = os.getenv("LLM_REPLAY_DIR", "llm_recordings")
+LLM_REPLAY_LATENCY = os.getenv("LLM_REPLAY_LATENCY", "0").lower() in ("1", "true", "yes")
+
+# LLM call layout: single (one prompt, all fields) | grouped (concurrent call per field group)
+LLM_CALL_MODE = os.getenv("LLM_CALL_MODE", "single")
+
+# Stream LLM responses and publish each top-level field to the job status as it completes
+LLM_STREAM = os.getenv("LLM_STREAM", "0").lower() in ("1", "true", "yes")
+
+# Per-call LLM timeout; on failure the parse falls back to regex / table results
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "90"))
+
+# LLM resilience (see resilience.py): parse budget, retries, circuit breaker
+LLM_PARSE_BUDGET_S = float(os.getenv("LLM_PARSE_BUDGET_S", "180"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_S = float(os.getenv("LLM_RETRY_BASE_S", "0.5"))
+LLM_RETRY_MAX_S = float(os.getenv("LLM_RETRY_MAX_S", "8"))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN_S = float(os.getenv("LLM_BREAKER_COOLDOWN_S", "30"))
+
+# LLM rate limiting (see ratelimit.py): off | local | postgres
+LLM_RATE_LIMITER = os.getenv("LLM_RATE_LIMITER", "local")
+LLM_RPM = float(os.getenv("LLM_RPM", "500"))
+LLM_TPM = float(os.getenv("LLM_TPM", "200000"))
+
+# Hedged LLM requests (see hedging.py): duplicate a call once it is slower than
+# this percentile of recent calls; hedges are capped at MAX_RATIO of calls
+LLM_HEDGE = os.getenv("LLM_HEDGE", "0").lower() in ("1", "true", "yes")
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_MAX_RATIO = float(os.getenv("LLM_HEDGE_MAX_RATIO", "0.1"))
+
+# Adaptive (AIMD) limit on in-flight LLM calls, see concurrency.py: adaptive | off
+LLM_CONCURRENCY = os.getenv("LLM_CONCURRENCY", "adaptive")
+LLM_CONCURRENCY_INITIAL = int(os.getenv("LLM_CONCURRENCY_INITIAL", "8"))
+LLM_CONCURRENCY_MIN = int(os.getenv("LLM_CONCURRENCY_MIN", "1"))
+LLM_CONCURRENCY_MAX = int(os.getenv("LLM_CONCURRENCY_MAX", "64"))
+LLM_CONCURRENCY_BACKOFF = float(os.getenv("LLM_CONCURRENCY_BACKOFF", "0.7"))
+LLM_CONCURRENCY_LATENCY_RATIO = float(os.getenv("LLM_CONCURRENCY_LATENCY_RATIO", "1.5"))
+
+# Model / completion budget routing table (see routing.py): JSON or a path to a JSON file
+LLM_ROUTING_TABLE = os.getenv("LLM_ROUTING_TABLE")
+
+# Cross-document batching of small single-chunk documents (see batching.py)
+LLM_BATCH = os.getenv("LLM_BATCH", "0").lower() in ("1", "true", "yes")
+LLM_BATCH_MAX_DOCS = int(os.getenv("LLM_BATCH_MAX_DOCS", "8"))
+LLM_BATCH_MAX_TOKENS = int(os.getenv("LLM_BATCH_MAX_TOKENS", "24000"))
+LLM_BATCH_MAX_DOC_TOKENS = int(os.getenv("LLM_BATCH_MAX_DOC_TOKENS", "4000"))
+LLM_BATCH_MAX_WAIT_MS = float(os.getenv("LLM_BATCH_MAX_WAIT_MS", "500"))
+LLM_BATCH_MAX_COMPLETION = int(os.getenv("LLM_BATCH_MAX_COMPLETION", "32000"))
+
+# Parse run ledger pricing (see ledger.py): JSON {model: [input, cached input, output]} in USD per 1M tokens
+LLM_PRICING = os.getenv("LLM_PRICING")
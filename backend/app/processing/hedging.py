@@ -0,0 +1,211 @@
+"""
+hedging.py — hedged LLM requests to cut tail latency
+
+Most LLM calls finish close to the median, but a few take 3–4× as long and
+those set the p99 of a parse. A hedged call starts the request; if it is still
+running once it is slower than the LLM_HEDGE_PERCENTILE of recent calls of the
+same kind, a duplicate is sent. The first successful response wins and the
+other is cancelled.
+
+- Threshold: per call label (full, compact, metadata, ...), over the last
+  HISTORY completed calls; no hedging until LLM_HEDGE_MIN_SAMPLES are known
+- Load cap: every call earns LLM_HEDGE_MAX_RATIO of a credit and every hedge
+  spends one, so hedges stay under that fraction of calls even when the
+  provider is slow across the board (when hedging would only add load)
+- Censoring: when the duplicate wins, the cancelled original is still
+  observed, at the time it had run so far (a lower bound on its latency);
+  observing only winners would let the threshold drift down as hedges win
+- Streaming: both requests would publish fields mid-stream; FirstPublisher
+  lets only the first request to emit one publish at all
+- A cancelled streamed request closes its connection; a cancelled
+  non-streamed request runs on in its worker thread and its result is dropped
+
+Counters: llm_hedges_total (duplicates sent), llm_hedge_wins_total (the
+duplicate answered first), llm_hedge_skipped_total{reason}.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set, TypeVar
+
+from .config import LLM_HEDGE, LLM_HEDGE_MAX_RATIO, LLM_HEDGE_MIN_SAMPLES, LLM_HEDGE_PERCENTILE
+from .metrics import get_metrics, percentile
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+HISTORY = 200       # recent latencies kept per label
+MAX_CREDIT = 10.0   # hedges that may be banked during a quiet spell
+
+# One request; the event is set when its result is no longer wanted
+HedgeableCall = Callable[[threading.Event], Awaitable[T]]
+# May a duplicate be sent now? (e.g. rate-limit room without waiting)
+HedgeGate = Callable[[], Awaitable[bool]]
+# Publishes one completed top-level field (name, value)
+Publish = Callable[[str, Any], None]
+
+
+class Hedger:
+    """Per-label latency history and the shared hedge budget."""
+
+    def __init__(self, quantile: float = LLM_HEDGE_PERCENTILE, min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+                 max_ratio: float = LLM_HEDGE_MAX_RATIO):
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.max_ratio = max_ratio
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._credit = 1.0
+        self.calls = 0
+        self.hedges = 0
+        self.wins = 0
+
+    def threshold(self, label: str) -> Optional[float]:
+        """Seconds after which a call of this label is hedged; None while history is short."""
+        with self._lock:
+            recent = list(self._latencies.get(label, ()))
+        if len(recent) < self.min_samples:
+            return None
+        return percentile(recent, self.quantile)
+
+    def observe(self, label: str, seconds: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(label, deque(maxlen=HISTORY)).append(seconds)
+
+    def _earn(self) -> None:
+        with self._lock:
+            self.calls += 1
+            self._credit = min(MAX_CREDIT, self._credit + self.max_ratio)
+
+    def _spend(self) -> bool:
+        with self._lock:
+            if self._credit < 1:
+                return False
+            self._credit -= 1
+            self.hedges += 1
+            return True
+
+    def _unspend(self) -> None:
+        with self._lock:
+            self._credit += 1
+            self.hedges -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hedges": self.hedges,
+                "wins": self.wins,
+                "hedge_rate": round(self.hedges / self.calls, 4) if self.calls else 0.0,
+                "thresholds_s": {
+                    label: round(percentile(v, self.quantile), 3)
+                    for label, v in self._latencies.items() if len(v) >= self.min_samples
+                },
+            }
+
+    async def run(self, call: HedgeableCall, label: str, gate: Optional[HedgeGate] = None) -> T:
+        """
+        Await call(cancel), sending one duplicate if it outlives the label's
+        threshold. A failure of one request waits for the other; if both fail
+        the first error is raised.
+        """
+        metrics = get_metrics()
+        self._earn()
+        delay = self.threshold(label)
+        cancels = [threading.Event()]
+        tasks = [asyncio.ensure_future(self._timed(call, cancels[0], label, censored=True))]
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    skipped = None
+                    if not self._spend():
+                        skipped = "budget"
+                    elif gate is not None and not await gate():
+                        self._unspend()
+                        skipped = "rate_limit"
+                    if skipped:
+                        metrics.incr("llm_hedge_skipped_total", call=label, reason=skipped)
+                    else:
+                        metrics.incr("llm_hedges_total", call=label)
+                        logger.info(f"LLM call {label} slower than p{self.quantile:g} ({delay:.1f}s), hedging")
+                        cancels.append(threading.Event())
+                        tasks.append(asyncio.ensure_future(self._timed(call, cancels[1], label)))
+
+            first_error: Optional[BaseException] = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if len(tasks) > 1 and task is tasks[1]:
+                            metrics.incr("llm_hedge_wins_total", call=label)
+                            with self._lock:
+                                self.wins += 1
+                        return task.result()
+                    first_error = first_error or task.exception()
+            raise first_error
+        finally:
+            for cancel, task in zip(cancels, tasks):
+                if not task.done():
+                    cancel.set()
+                    task.cancel()
+
+    async def _timed(self, call: HedgeableCall, cancel: threading.Event, label: str,
+                     censored: bool = False) -> T:
+        """call(cancel), observing its latency; with censored, also the time a cancelled call had run."""
+        started = time.perf_counter()
+        try:
+            result = await call(cancel)
+        except asyncio.CancelledError:
+            if censored:
+                self.observe(label, time.perf_counter() - started)
+            raise
+        self.observe(label, time.perf_counter() - started)
+        return result
+
+
+class FirstPublisher:
+    """
+    One publish callback shared by the requests of a hedged call. The first
+    request to publish a field owns it from then on and the other request's
+    fields are dropped, so two streams never interleave partial results.
+    """
+
+    def __init__(self, publish: Publish):
+        self._publish = publish
+        self._lock = threading.Lock()
+        self._owner: Optional[object] = None
+        self.published: Set[str] = set()
+
+    def bind(self, request: object) -> Publish:
+        """The publish callback for one request (any object that identifies it)."""
+        def publish(name: str, value: Any) -> None:
+            with self._lock:
+                if self._owner is None:
+                    self._owner = request
+                if self._owner is not request:
+                    return
+                self.published.add(name)
+            self._publish(name, value)
+        return publish
+
+
+_hedger: Optional[Hedger] = None
+_hedger_lock = threading.Lock()
+
+
+def get_hedger() -> Optional[Hedger]:
+    """Get or create the process-wide hedger (None unless LLM_HEDGE is on)"""
+    global _hedger
+    if not LLM_HEDGE:
+        return None
+    if _hedger is None:
+        with _hedger_lock:
+            if _hedger is None:
+                _hedger = Hedger()
+    return _hedger
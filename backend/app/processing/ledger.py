@@ -0,0 +1,198 @@
+"""
+ledger.py — one parse_runs row per parse job, for latency / token / cost history
+
+The metrics endpoint only knows about the current process and its recent
+samples. Every parse job writes one row to parse_runs instead, whatever its
+outcome (completed, degraded, failed, rejected, cancelled). Each row holds:
+
+- stage timings (the parser's `timings`), LLM seconds and total job seconds
+- prompt, cached and completion tokens, LLM calls and prompt-cache hits
+- model, route, tier and chunk count, retries, and the error class
+- cost_usd, from LLM_PRICING (USD per 1M tokens: input, cached input, output)
+
+LLM_PRICING is JSON or a path to a JSON file, {model: [input, cached, output]};
+models without a price get a NULL cost. parse_run_stats() aggregates the
+ledger per day and model (p50 / p95 latency and tokens, cost) in Postgres.
+
+Writing the row is best effort: a ledger failure is logged and never fails
+the job.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+
+from .config import LLM_PRICING
+from .metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# USD per 1M tokens: input, cached input, output
+DEFAULT_PRICING: Dict[str, List[float]] = {
+    "gpt-5": [1.25, 0.125, 10.00],
+    "gpt-5-mini": [0.25, 0.025, 2.00],
+    "gpt-5-nano": [0.05, 0.005, 0.40],
+}
+
+OUTCOMES = ("completed", "degraded", "failed", "rejected", "cancelled")
+
+
+def load_pricing(spec: Optional[str]) -> Dict[str, List[float]]:
+    """Parse and check a pricing table (JSON text or file path); None gives the default."""
+    if not spec:
+        return {model: list(prices) for model, prices in DEFAULT_PRICING.items()}
+    if os.path.isfile(spec):
+        with open(spec, encoding="utf-8") as fh:
+            spec = fh.read()
+    pricing = json.loads(spec)
+    if not isinstance(pricing, dict):
+        raise ValueError("LLM_PRICING must be a JSON object of model -> [input, cached, output]")
+    for model, prices in pricing.items():
+        if (not isinstance(prices, list) or len(prices) != 3
+                or not all(isinstance(p, (int, float)) for p in prices)):
+            raise ValueError(f"LLM_PRICING for {model} must be [input, cached, output] USD per 1M tokens")
+    return pricing
+
+
+_pricing: Optional[Dict[str, List[float]]] = None
+_pricing_lock = threading.Lock()
+
+
+def get_pricing() -> Dict[str, List[float]]:
+    """Get or load the process-wide pricing table"""
+    global _pricing
+    if _pricing is None:
+        with _pricing_lock:
+            if _pricing is None:
+                _pricing = load_pricing(LLM_PRICING)
+    return _pricing
+
+
+def run_cost(model: Optional[str], prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> Optional[float]:
+    """USD for one run's tokens; None when the model has no price."""
+    prices = get_pricing().get(model) if model else None
+    if prices is None:
+        return None
+    input_price, cached_price, output_price = prices
+    cost = ((prompt_tokens - cached_tokens) * input_price + cached_tokens * cached_price
+            + completion_tokens * output_price) / 1_000_000
+    return round(cost, 6)
+
+
+class ParseRunRecorder:
+    """Created when a job starts; record() writes its row once the outcome is known."""
+
+    def __init__(self, file_id: str):
+        self.file_id = file_id
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        self.recorded = False
+
+    def record(self, outcome: str, result: Optional[Dict[str, Any]] = None,
+               error_class: Optional[str] = None) -> None:
+        """Write the row (first call only); result is the parser's result dict, if there is one."""
+        if self.recorded:
+            return
+        self.recorded = True
+        try:
+            row = self._row(outcome, result or {}, error_class)
+            from app.database.db import get_session_local
+            from app.database.models import ParseRun
+            db = get_session_local()()
+            try:
+                db.add(ParseRun(**row))
+                db.commit()
+            finally:
+                db.close()
+            get_metrics().incr("parse_runs_recorded_total", outcome=outcome)
+        except Exception as e:
+            get_metrics().incr("parse_runs_record_errors_total")
+            logger.warning(f"Could not record parse run for file {self.file_id}: {e}")
+
+    def _row(self, outcome: str, result: Dict[str, Any], error_class: Optional[str]) -> Dict[str, Any]:
+        llm = result.get("llm") or {}
+        route = llm.get("route") or {}
+        usage = llm.get("usage") or {}
+        timings = result.get("timings") or {}
+        error_class = error_class or result.get("error_class")
+        prompt_tokens = usage.get("prompt_tokens") or 0
+        cached_tokens = usage.get("cached_tokens") or 0
+        completion_tokens = usage.get("completion_tokens") or 0
+        try:
+            file_uuid = uuid.UUID(self.file_id)
+        except ValueError:
+            file_uuid = None
+        return {
+            "file_id": file_uuid,
+            "started_at": self.started_at,
+            "outcome": outcome,
+            "error_class": error_class[:100] if error_class else None,
+            "tier": result.get("tier"),
+            "model": route.get("model"),
+            "route": route.get("route"),
+            "chunks": route.get("chunks"),
+            "llm_calls": llm.get("calls") or 0,
+            "retries": len(llm.get("retries") or []),
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "completion_tokens": completion_tokens,
+            "cache_hits": llm.get("cache_hits") or 0,
+            "cost_usd": run_cost(route.get("model"), prompt_tokens, cached_tokens, completion_tokens),
+            "total_s": round(time.perf_counter() - self._started, 3),
+            "llm_s": timings.get("llm"),
+            "timings": timings or None,
+        }
+
+
+def parse_run_stats(db, days: int = 30) -> List[Dict[str, Any]]:
+    """Per day and model over the last `days` days: runs by outcome, p50 / p95 latency and tokens, cost."""
+    from app.database.models import ParseRun
+
+    def p(q: float, column):
+        return func.percentile_cont(q).within_group(column.asc())
+
+    day = func.date_trunc("day", ParseRun.started_at).label("day")
+    tokens = ParseRun.prompt_tokens + ParseRun.completion_tokens
+    columns = [
+        day,
+        ParseRun.model,
+        func.count().label("runs"),
+        *[func.count().filter(ParseRun.outcome == outcome).label(outcome) for outcome in OUTCOMES],
+        p(0.5, ParseRun.total_s).label("total_p50_s"),
+        p(0.95, ParseRun.total_s).label("total_p95_s"),
+        p(0.5, ParseRun.llm_s).label("llm_p50_s"),
+        p(0.95, ParseRun.llm_s).label("llm_p95_s"),
+        p(0.5, tokens).label("tokens_p50"),
+        p(0.95, tokens).label("tokens_p95"),
+        func.sum(ParseRun.prompt_tokens).label("prompt_tokens"),
+        func.sum(ParseRun.cached_tokens).label("cached_tokens"),
+        func.sum(ParseRun.completion_tokens).label("completion_tokens"),
+        func.sum(ParseRun.llm_calls).label("llm_calls"),
+        func.sum(ParseRun.cache_hits).label("cache_hits"),
+        func.sum(ParseRun.cost_usd).label("cost_usd"),
+    ]
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    rows = (db.query(*columns)
+            .filter(ParseRun.started_at >= since)
+            .group_by(day, ParseRun.model)
+            .order_by(day.desc(), ParseRun.model)
+            .all())
+    stats = []
+    for row in rows:
+        entry = dict(row._mapping)
+        entry["day"] = entry["day"].date().isoformat() if entry["day"] else None
+        entry["outcomes"] = {outcome: entry.pop(outcome) for outcome in OUTCOMES}
+        for key in ("runs", "prompt_tokens", "cached_tokens", "completion_tokens", "llm_calls", "cache_hits"):
+            entry[key] = int(entry[key] or 0)
+        for key in ("total_p50_s", "total_p95_s", "llm_p50_s", "llm_p95_s", "tokens_p50", "tokens_p95"):
+            entry[key] = round(float(entry[key]), 3) if entry[key] is not None else None
+        entry["cost_usd"] = round(float(entry["cost_usd"]), 6) if entry["cost_usd"] is not None else None
+        stats.append(entry)
+    return stats
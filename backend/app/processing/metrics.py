@@ -0,0 +1,111 @@
+"""
+metrics.py — in-process counters, gauges and latency histograms
+
+Small enough to need no client library: values live in this process and are
+served as JSON by GET /processing/metrics. Series are keyed by name plus
+labels, rendered Prometheus-style ("llm_calls_total{outcome=ok}").
+
+- counters: monotonically increasing totals
+- gauges: last value set (breaker state, in-flight calls)
+- histograms: count / sum / max plus p50 / p95 over the most recent samples
+"""
+
+import math
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+HISTOGRAM_WINDOW = 1024  # recent samples kept per series for percentiles
+
+
+def _series(name: str, labels: Dict[str, Any]) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{k}={labels[k]}" for k in sorted(labels)) + "}"
+
+
+def percentile(values, q: float) -> Optional[float]:
+    """Nearest-rank percentile (q in 0..100) of a sequence, None when empty."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(1, min(len(ordered), math.ceil(q / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 4)
+
+
+class _Histogram:
+    __slots__ = ("count", "total", "max", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent: Deque[float] = deque(maxlen=HISTOGRAM_WINDOW)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.total, 4),
+            "max": round(self.max, 4),
+            "p50": _round(percentile(self.recent, 50)),
+            "p95": _round(percentile(self.recent, 95)),
+        }
+
+
+class Metrics:
+    """Thread-safe metric registry."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._histograms: Dict[str, _Histogram] = {}
+
+    def incr(self, name: str, value: float = 1, **labels) -> None:
+        key = _series(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._gauges[_series(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _series(name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = _Histogram()
+            hist.observe(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "histograms": {k: h.summary() for k, h in self._histograms.items()},
+            }
+
+
+_metrics: Optional[Metrics] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """Get or create the process-wide metric registry"""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = Metrics()
+    return _metrics
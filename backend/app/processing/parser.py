@@ -162,16 +162,45 @@ Key fixes in this version:
 - Post-parse date normalization (catches "2/14", "Feb 14" GPT returns)
 """
 
+import asyncio
+import copy
+import json
+import logging
 import re
-from io import BytesIO
-from typing import Any, Dict, List, Optional, Tuple
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import cached_property, lru_cache
+from typing import Any, Awaitable, Callable, ContextManager, Dict, Iterator, List, Optional, Tuple
 
-import fitz  # PyMuPDF >= 1.23 recommended
 from google.cloud import storage
-from openai import OpenAI
-
-from .config import OPENAI_API_KEY, DEFAULT_MODEL, MAX_TOKENS
-from .types import SyllabusData
+from openai import LengthFinishReasonError, OpenAI
+from pydantic import BaseModel, create_model
+
+from .batching import get_batcher
+from .boilerplate import get_shingle_index
+from .concurrency import get_concurrency_limiter
+from .hedging import FirstPublisher, get_hedger
+from .metrics import get_metrics
+from .partial_json import FieldStream
+from .ratelimit import get_rate_limiter
+from .replay import ReplayMiss, fingerprint, get_replay_store
+from .routing import choose_route, escalate_route, get_routing_table
+from .resilience import CircuitOpen, Deadline, DeadlineExceeded, RetryCallback, call_with_retries
+from .sandbox import ExtractionRejected, PageBudgetExceeded, extract_pdf
+from .scanners import scan_lecture_lines, scan_numbered_due
+from .semester import SemesterCalendar, find_breaks, get_semester_calendar, numbers_break_weeks
+from .config import (
+    OPENAI_API_KEY, DEFAULT_MODEL, MAX_TOKENS, BOILERPLATE_MODE, TABLE_FORMAT, RESPONSE_SCHEMA,
+    EXTRACTION_TIER, LLM_CALL_MODE, LLM_STREAM, LLM_TIMEOUT_S, LLM_PARSE_BUDGET_S,
+    LLM_BATCH_MAX_COMPLETION, LLM_BATCH_MAX_DOC_TOKENS,
+)
+from .tokens import estimate_tokens
+from .types import (
+    CompactSyllabusData, DeliverablesGroup, GradingGroup, MeetingsGroup, MetadataGroup, SyllabusData,
+)
+
+logger = logging.getLogger(__name__)
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -199,39 +228,104 @@ RULES:
 - Times: 24-hour HH:MM only. Convert AM/PM when shown.
 - Dates: YYYY-MM-DD only. Use the SEMESTER YEAR provided in the prompt to resolve M/D dates.
 - Office hours are NOT lectures.
-- MWF means three separate lecture entries (Mon, Wed, Fri).
-- TTh / Tu/Th means two entries (Tue, Thu).
-- Multiple lecture time options (e.g. "9:05-9:55 OR 10:10-11:00") → include each as separate entries for each day.
+- How multi-day meetings (MWF, TTh) are listed depends on the lecture format in REQUIRED FIELDS.
 - "Prelims: TIME - Date1; Date2; Date3" → separate exam entry for each date.
 - Do NOT include Final Exams in the exams list.
 - Points-only grading → record in description, do not invent percentages.
 - Confidence 85-100: explicit. 70-84: minor ambiguity. 50-69: uncertain.
 """
 
-USER_PROMPT_TEMPLATE = """Extract structured data from this syllabus.
+# Static instructions first, per-document content last: provider-side prompt caching reuses the
+# longest prefix shared with earlier requests (schema + SYSTEM_PROMPT + everything before SEMESTER)
+USER_PROMPT_TEMPLATE = """Extract structured data from the syllabus at the end of this message.
+
+REQUIRED FIELDS:
+{fields}
+
+Use "Not Listed" for any field not explicitly in the text.
+Use the SEMESTER year given with the syllabus to convert ALL partial dates (M/D or Month Day) to YYYY-MM-DD.
 
 SEMESTER: {term_str}
 SEMESTER START: {start_date}
 SEMESTER END: {end_date}
 
-Use the semester year above to convert ALL partial dates (M/D or Month Day) to YYYY-MM-DD.
+SYLLABUS TEXT:
+{text}
+"""
 
-REQUIRED FIELDS:
-- course_name
+METADATA_FIELDS_SPEC = """- course_name
 - instructor (name + contact)
-- summary (description, objectives, prerequisites)
-- lectures: [{{"day":0-6,"start_time":"HH:MM","end_time":"HH:MM","start_date":"YYYY-MM-DD","end_date":"YYYY-MM-DD","location":"...","type":"lecture|lab|discussion"}}]
-- assignments: [{{"description":"...","date":"YYYY-MM-DD","time_due":"HH:MM","confidence":0-100}}]
-- exams: [{{"description":"...","date":"YYYY-MM-DD","time_due":"HH:MM","confidence":0-100}}]
-- grading: {{"categories":[{{"name":"...","weight":float,"description":"..."}}],"confidence":0-100}}
+- summary (description, objectives, prerequisites)"""
+
+MEETINGS_FIELDS_SPEC = """- lectures: [{"day":0-6,"start_time":"HH:MM","end_time":"HH:MM","start_date":"YYYY-MM-DD","end_date":"YYYY-MM-DD","location":"...","type":"lecture|lab|discussion"}]
+  ONE entry per day: MWF → three entries (Mon, Wed, Fri); TTh / Tu/Th → two entries (Tue, Thu).
+  Multiple time options (e.g. "9:05-9:55 OR 10:10-11:00") → separate entries for each option on each day."""
+
+DELIVERABLES_FIELDS_SPEC = """- assignments: [{"description":"...","date":"YYYY-MM-DD","time_due":"HH:MM","confidence":0-100}]
+- exams: [{"description":"...","date":"YYYY-MM-DD","time_due":"HH:MM","confidence":0-100}]"""
+
+GRADING_FIELDS_SPEC = """- grading: {"categories":[{"name":"...","weight":float,"description":"..."}],"confidence":0-100}"""
+
+FULL_FIELDS_SPEC = "\n".join(
+    (METADATA_FIELDS_SPEC, MEETINGS_FIELDS_SPEC, DELIVERABLES_FIELDS_SPEC, GRADING_FIELDS_SPEC)
+)
+
+COMPACT_FIELDS_SPEC = """- course: course name
+- instr: instructor (name + contact)
+- summary: description, objectives, prerequisites
+- sd / ed: first / last day of classes (YYYY-MM-DD)
+- lec: [{"d":[days 0-6],"s":"HH:MM","e":"HH:MM","sd":null,"ed":null,"loc":"...","t":"lecture|lab|discussion"}]
+  ONE entry per meeting pattern: MWF → "d":[0,2,4] (not three entries). sd/ed null = same as course dates.
+  Multiple time options (e.g. "9:05-9:55 OR 10:10-11:00") → one entry per option.
+- hw (assignments) / ex (exams): [{"n":"description","d":"YYYY-MM-DD","t":"HH:MM","c":0-100}]
+- gr (grading): {"cats":[{"n":"name","w":float,"d":"description"}],"c":0-100}"""
+
+_RESPONSE_SCHEMAS = {
+    "full": (SyllabusData, FULL_FIELDS_SPEC),
+    "compact": (CompactSyllabusData, COMPACT_FIELDS_SPEC),
+}
 
-Use "Not Listed" for any field not explicitly in the text.
+# Several small documents in one request (batching.py); each document is keyed doc_0, doc_1, ...
+BATCH_PROMPT_TEMPLATE = """Extract structured data from each syllabus below, independently.
+Each document starts with a "=== doc_N ===" line: return its data under that key, and never mix
+facts between documents.
+
+REQUIRED FIELDS (per document):
+{fields}
+
+Use "Not Listed" for any field not explicitly in that document's text.
+Use each document's own semester year to convert ALL partial dates (M/D or Month Day) to YYYY-MM-DD.
+
+{documents}"""
+
+BATCH_DOCUMENT_TEMPLATE = """=== {key} ===
+SEMESTER: {term_str}
+SEMESTER START: {start_date}
+SEMESTER END: {end_date}
 
 SYLLABUS TEXT:
 {text}
 """
 
 
+@lru_cache(maxsize=None)
+def _schema_text(response_format: Any) -> str:
+    return json.dumps(response_format.model_json_schema())
+
+
+def _prompt_cache_text(response_format: Any, prompt: str) -> str:
+    """What the provider's prefix cache sees, in order: response schema, system prompt, user prompt."""
+    return _schema_text(response_format) + SYSTEM_PROMPT + prompt
+
+
+@lru_cache(maxsize=None)
+def _batch_schema(schema_name: str, count: int) -> type:
+    """Response model with one field per document: doc_0 .. doc_{count-1}."""
+    document = _RESPONSE_SCHEMAS[schema_name][0]
+    return create_model(f"{document.__name__}Batch{count}", __base__=BaseModel,
+                        **{f"doc_{i}": (document, ...) for i in range(count)})
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # PDF extraction
 # ──────────────────────────────────────────────────────────────────────────────
@@ -242,8 +336,7 @@ def _rects_overlap(r1: Tuple, r2: Tuple, tol: float = 5.0) -> bool:
     return not (ax1 < bx0 - tol or bx1 < ax0 - tol or ay1 < by0 - tol or by1 < ay0 - tol)
 
 
-def _table_to_markdown(table) -> str:
-    rows = table.extract()
+def _table_to_markdown(rows: List[List]) -> str:
     if not rows:
         return ""
     lines = []
@@ -255,6 +348,38 @@ def _table_to_markdown(table) -> str:
     return "\n".join(lines)
 
 
+def _table_to_compact(rows: List[List], sep: str = "|") -> str:
+    """
+    Header row followed by one delimiter-joined line per row, with no padding,
+    no separator line and empty trailing cells trimmed. Blank rows are skipped.
+    """
+    if not rows:
+        return ""
+    lines = []
+    for row in rows:
+        cells = [str(c or "").replace("\n", " ").replace(sep, "/").strip() for c in row]
+        while cells and not cells[-1]:
+            cells.pop()
+        if cells:
+            lines.append(sep.join(cells))
+    return "\n".join(lines)
+
+
+def _table_to_tsv(rows: List[List]) -> str:
+    return _table_to_compact(rows, sep="\t")
+
+
+_TABLE_SERIALIZERS = {
+    "markdown": _table_to_markdown,
+    "compact": _table_to_compact,
+    "tsv": _table_to_tsv,
+}
+
+
+def _serialize_table(rows: List[List], table_format: str = TABLE_FORMAT) -> str:
+    return _TABLE_SERIALIZERS.get(table_format, _table_to_markdown)(rows)
+
+
 def _reconstruct_two_column_table(page, col_gap_threshold: float = 40.0) -> Optional[str]:
     """
     Detect and reconstruct two-column info tables (Label | Value)
@@ -335,23 +460,33 @@ def _reconstruct_two_column_table(page, col_gap_threshold: float = 40.0) -> Opti
     return "\n".join(lines) if lines else None
 
 
-def _page_to_text(page) -> str:
+def _page_to_text(
+    page, table_format: str = TABLE_FORMAT, tables_out: Optional[List[Dict[str, Any]]] = None,
+    with_tables: bool = True,
+) -> str:
     """
     Extract text from one page:
-    1. Try find_tables() for bordered tables → Markdown
+    1. Try find_tables() for bordered tables → Markdown (or TABLE_FORMAT)
     2. Try two-column reconstruction for info tables (if no bordered tables)
     3. Fall back to block-ordered plain text
+
+    If tables_out is given, each bordered table's raw rows and serialized text
+    are appended to it for the schedule-table interpreter. with_tables=False
+    skips step 1.
     """
     parts: List[str] = []
     table_rects: List[Tuple] = []
 
     # Bordered tables
     try:
-        tables = page.find_tables()
-        for tbl in tables.tables:
-            md = _table_to_markdown(tbl)
+        tables = page.find_tables() if with_tables else None
+        for tbl in (tables.tables if tables else []):
+            rows = tbl.extract()
+            md = _serialize_table(rows, table_format)
             if md:
                 parts.append(md)
+                if tables_out is not None:
+                    tables_out.append({"rows": rows, "text": md})
             table_rects.append(tbl.bbox)
     except AttributeError:
         pass  # PyMuPDF < 1.23
@@ -377,12 +512,131 @@ def _page_to_text(page) -> str:
     return "\n\n".join(parts)
 
 
+# ──────────────────────────────────────────────────────────────────────────────
+# Extraction tiers
+# ──────────────────────────────────────────────────────────────────────────────
+
+EXTRACTION_TIERS = ("fast", "balanced", "accurate")
+TABLE_DRAWINGS_MIN = 12
+AUTO_FAST_MAX_PAGES = 2
+AUTO_ACCURATE_TABLE_SHARE = 0.5
+# Scanned page: images cover at least this share of the page ...
+IMAGE_PAGE_MIN_COVER = 0.5
+# ... and the text layer's word boxes cover less than this share of the image area
+IMAGE_PAGE_MAX_TEXT_RATIO = 0.05
+
+
+def _page_has_table_lines(page) -> bool:
+    """
+    Cheap table classifier: bordered tables need ruling lines, so count the
+    page's vector drawings (~40x cheaper than find_tables() on testing/).
+    """
+    try:
+        return len(page.get_cdrawings()) >= TABLE_DRAWINGS_MIN
+    except AttributeError:
+        return True
+
+
+def _page_is_image_only(page) -> bool:
+    """
+    Scanned page: images cover most of the page and the text layer covers
+    (almost) none of that image area, so a logo above a heading is not a scan.
+    get_images() only reads the resource dictionary, so text-only pages never
+    pay for the image placement and word passes.
+    """
+    if not page.get_images():
+        return False
+    page_box = tuple(page.rect)
+    page_area = _clipped_area(page_box, page_box)
+    if not page_area:
+        return False
+    image_area = min(page_area, sum(_clipped_area(info["bbox"], page_box) for info in page.get_image_info()))
+    if image_area < IMAGE_PAGE_MIN_COVER * page_area:
+        return False
+    text_area = sum(_clipped_area(w[:4], page_box) for w in page.get_text("words"))
+    return text_area < IMAGE_PAGE_MAX_TEXT_RATIO * image_area
+
+
+def _clipped_area(box: Tuple, clip: Tuple) -> float:
+    """Area of box (x0, y0, x1, y1) inside clip."""
+    width = min(box[2], clip[2]) - max(box[0], clip[0])
+    height = min(box[3], clip[3]) - max(box[1], clip[1])
+    return width * height if width > 0 and height > 0 else 0.0
+
+
+def _select_tier(page_count: int, table_pages: int) -> str:
+    """Automatic tier from page count and how many pages look tabular."""
+    if page_count <= AUTO_FAST_MAX_PAGES and table_pages == 0:
+        return "fast"
+    if page_count and table_pages / page_count >= AUTO_ACCURATE_TABLE_SHARE:
+        return "accurate"
+    return "balanced"
+
+
+def _extract_document(
+    doc, tier: str = EXTRACTION_TIER, table_format: str = TABLE_FORMAT,
+    page_guard: Callable[[], ContextManager] = nullcontext,
+) -> Dict[str, Any]:
+    """
+    Extract every page of an open PDF with one of the tiers:
+    - fast: page.get_text("text") only
+    - balanced: table pass only on pages the drawing classifier flags
+    - accurate: table pass, two-column reconstruction and block ordering everywhere
+    - auto: one of the above, chosen by _select_tier
+
+    Each page runs inside page_guard(); a page that raises PageBudgetExceeded
+    falls back to plain get_text("text") and is listed in degraded_pages.
+    Image-only (scanned) pages skip the layout pipeline; a document with no
+    text layer at all is rejected before any LLM work.
+    """
+    if tier not in EXTRACTION_TIERS and tier != "auto":
+        tier = "accurate"
+    image_only = [_page_is_image_only(page) for page in doc]
+    if image_only and all(image_only):
+        raise ExtractionRejected(
+            "image_only", "PDF has no text layer (scanned document); please upload a text-based PDF"
+        )
+    flagged: List[bool] = []
+    if tier in ("auto", "balanced"):
+        flagged = [_page_has_table_lines(page) for page in doc]
+    if tier == "auto":
+        tier = _select_tier(doc.page_count, sum(flagged))
+
+    full_parts = []
+    pages: List[str] = []
+    tables: List[Dict[str, Any]] = []
+    degraded: List[int] = []
+    for i, page in enumerate(doc, start=1):
+        if tier == "fast" or image_only[i - 1]:
+            page_text = page.get_text("text").strip()
+        else:
+            with_tables = tier == "accurate" or flagged[i - 1]
+            page_tables: List[Dict[str, Any]] = []
+            try:
+                with page_guard():
+                    page_text = _page_to_text(page, table_format, tables_out=page_tables, with_tables=with_tables)
+                tables.extend(page_tables)
+            except PageBudgetExceeded:
+                logger.warning(f"Page {i} exceeded its extraction budget; using plain text")
+                page_text = page.get_text("text").strip()
+                degraded.append(i)
+        pages.append(page_text)
+        if page_text.strip():
+            full_parts.append(f"[PAGE {i}]\n{page_text}")
+
+    return {"full_text": "\n\n".join(full_parts), "pages": pages, "tables": tables,
+            "tier": tier, "page_count": doc.page_count, "degraded_pages": degraded,
+            "image_pages": [i for i, flag in enumerate(image_only, start=1) if flag]}
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Term / semester detection
 # ──────────────────────────────────────────────────────────────────────────────
 
 _TERM_PATTERNS = [
     r"\b(Spring|Fall|Summer|Winter|Autumn)\s+(20\d{2})\b",
+    # "Summer Session I: June 2 – June 20, 2025"
+    r"\b(Spring|Fall|Summer|Winter|Autumn)\s+(?:Session|Term|Semester|Quarter)\b[^\n]{0,60}?\b(20\d{2})\b",
     r"\b(Sp|FA|SU|Wi)\s+(20\d{2})\b",
     r"\b(Sp|FA|SU|Wi)(2[0-9])\b",
 ]
@@ -546,28 +800,13 @@ def _extract_lectures_regex(text: str) -> List[Dict[str, Any]]:
     Extract lecture meeting times. Key pattern for this syllabus:
     "MWF, 9:05-9:55a, or 10:10-11:00a, in 200 Baker Laboratory"
     Also handles "Tuesdays & Thursdays, 2:55-4:10 PM, Olin Hall 155"
+    (scan_lecture_lines is linear-time; locations are left to the LLM)
     """
     lectures: List[Dict[str, Any]] = []
 
-    lecture_line_re = re.compile(
-        r"(?:Lectures?\s*:?\s*)?"
-        r"(MWF|MW|TTh|Tu/?Th|"
-        r"(?:Mon(?:day)?s?(?:\s*[,&/]\s*)?)?(?:Wed(?:nesday)?s?(?:\s*[,&/]\s*)?)?(?:Fri(?:day)?s?)?"
-        r"|Tuesdays?\s*(?:[&and]+\s*Thursdays?)?)"
-        r"[,\s]+"
-        r"([\d:]+\s*[-–]\s*[\d:]+\s*[aApP]\.?[mM]?\.?)"
-        r"(?:\s*(?:,\s*)?(?:or|OR)\s*([\d:]+\s*[-–]\s*[\d:]+\s*[aApP]\.?[mM]?\.?))?"
-        r"(?:[,\s]+(?:in\s+)?([^\n,]{3,50?}))?",
-        re.IGNORECASE | re.MULTILINE,
-    )
-
-    for m in lecture_line_re.finditer(text):
-        day_str = m.group(1).strip()
-        time1 = m.group(2).strip() if m.group(2) else None
-        time2 = m.group(3).strip() if m.group(3) else None
-        location = m.group(4).strip() if m.group(4) else "Not Listed"
-
-        days = _parse_day_string(day_str)
+    for day_str, time1, time2 in scan_lecture_lines(text):
+        location = "Not Listed"
+        days = _parse_day_string(day_str.strip())
         if not days or not time1:
             continue
 
@@ -588,10 +827,8 @@ def _extract_lectures_regex(text: str) -> List[Dict[str, Any]]:
     return lectures
 
 
-def _expand_lectures(gpt_lectures: List[Dict], raw_text: str) -> List[Dict]:
+def _expand_lectures(gpt_lectures: List[Dict], regex_lectures: List[Dict]) -> List[Dict]:
     """Merge GPT lectures with regex-extracted ones, preferring regex for day expansion."""
-    regex_lectures = _extract_lectures_regex(raw_text)
-
     if not gpt_lectures and regex_lectures:
         return regex_lectures
 
@@ -675,10 +912,7 @@ def _extract_assignments_regex(text: str, term: Optional[Tuple[str, int]]) -> Li
     assignments: List[Dict[str, Any]] = []
 
     # "#N (Due M/D)" or "PS #N (Due M/D)"
-    for prefix, n, mm, dd in re.findall(
-        r"\b(PS|HW|Problem\s+Set|Assignment)?\s*#?(\d{1,2})\s*\(?\s*[Dd]ue\s+(\d{1,2})/(\d{1,2})\)?",
-        text,
-    ):
+    for prefix, n, mm, dd in scan_numbered_due(text):
         label = prefix.strip() if prefix.strip() else "Problem Set"
         assignments.append({"description": f"{label} #{n}",
                             "date": _to_date(int(mm), int(dd), year),
@@ -713,21 +947,384 @@ def _extract_assignments_regex(text: str, term: Optional[Tuple[str, int]]) -> Li
     return _dedupe_items(assignments, keys=("description", "date"))
 
 
+# ──────────────────────────────────────────────────────────────────────────────
+# Deterministic relative-date extraction
+# ──────────────────────────────────────────────────────────────────────────────
+
+# Deliverables need a number ("Quiz 2"); exams may stand alone ("Midterm"), but not "Exam review"
+_RELATIVE_ITEM_RE = re.compile(
+    r"\b((?:Problem\s+Set|PS|HW|Homework|Assignment|Quiz|Lab\s+Report|Project|Essay|Paper)\s*#?\s*\d{1,2}"
+    r"|(?:Prelim|Midterm|Exam)(?:\s*#?\s*\d{1,2})?)\b(?!\s+(?:review|prep))",
+    re.IGNORECASE,
+)
+
+
+def _extract_relative_items_regex(
+    text: str, calendar: Optional[SemesterCalendar]
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Lines such as "Week 5 – Tue: Quiz 2" or "HW 4 due Thursday of week 9",
+    resolved against the semester calendar without an LLM round trip.
+    """
+    out: Dict[str, List[Dict[str, Any]]] = {"assignments": [], "exams": []}
+    if not calendar:
+        return out
+    for line in text.splitlines():
+        if not re.search(r"\b(?:week|wk|lecture|class)\b", line, re.IGNORECASE):
+            continue
+        resolved = calendar.resolve(line)
+        if not resolved:
+            continue
+        for m in _RELATIVE_ITEM_RE.finditer(line):
+            name = re.sub(r"\s+", " ", m.group(1)).strip()
+            if _FINAL_EXAM_RE.search(line[max(0, m.start() - 6):m.end()]):
+                continue
+            item = {"description": name, "date": resolved, "time_due": "Not Listed", "confidence": 80}
+            (out["exams"] if _EXAM_WORD_RE.search(name) else out["assignments"]).append(item)
+    out["assignments"] = _dedupe_items(out["assignments"], keys=("description", "date"))
+    out["exams"] = _dedupe_items(out["exams"], keys=("description", "date"))
+    return out
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Deterministic schedule-table extraction
+# ──────────────────────────────────────────────────────────────────────────────
+
+_HEADER_ROLES = [
+    ("date", re.compile(r"\b(?:date|dates|when)\b", re.IGNORECASE)),
+    # Week / class-day numbers: only a date column if its cells actually hold dates
+    ("week", re.compile(r"\b(?:week|wk|day)s?\b", re.IGNORECASE)),
+    ("item", re.compile(r"\b(?:assignments?|deliverables?|due|homework|hw|tasks?|assessments?|work)\b", re.IGNORECASE)),
+    ("reading", re.compile(r"\b(?:readings?|prep(?:aration)?|bibliography|materials?|resources?)\b", re.IGNORECASE)),
+    ("topic", re.compile(r"\b(?:topics?|lectures?|content|subjects?|themes?|sessions?|class|agenda)\b", re.IGNORECASE)),
+]
+
+_CELL_MD_RE = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\b")
+_CELL_MONTH_RE = re.compile(
+    r"\b(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+(\d{1,2})\b", re.IGNORECASE
+)
+_CELL_TIME_RE = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*([aApP])\.?[mM]?\.?(?![a-zA-Z])")
+_EXAM_WORD_RE = re.compile(r"\b(?:exam|prelim|midterm)\b", re.IGNORECASE)
+_FINAL_EXAM_RE = re.compile(r"\bfinal\s+exam", re.IGNORECASE)
+_DUE_WORD_RE = re.compile(r"\bdue\b", re.IGNORECASE)
+# Deliverables named in a topic cell without "due" ("Intro; Quiz 1", "Graphs / Lab report")
+_DELIVERABLE_WORD_RE = re.compile(
+    r"\b(?:quiz(?:zes)?|projects?|papers?|labs?|presentations?|essays?|homework|hw\s*\d+|problem\s+sets?)\b",
+    re.IGNORECASE,
+)
+
+SCHEDULE_DATE_RATIO = 0.8
+
+
+def _clean_cell(cell: Any) -> str:
+    return re.sub(r"\s+", " ", str(cell or "")).strip()
+
+
+def _cell_date(cell: str, year: Optional[int], calendar: Optional[SemesterCalendar] = None) -> Optional[str]:
+    """
+    First calendar date in a table cell ("Tue, Sep 19", "Thurs 2/12", ...), or
+    a relative reference ("Week 5 Tue", "Lecture 12") resolved by the calendar.
+    """
+    m = _CELL_MD_RE.search(cell)
+    if m:
+        mm, dd = int(m.group(1)), int(m.group(2))
+        yr = int(m.group(3)) if m.group(3) else year
+        if yr and yr < 100:
+            yr += 2000
+        if 1 <= mm <= 12 and 1 <= dd <= 31:
+            return _to_date(mm, dd, yr)
+    m = _CELL_MONTH_RE.search(cell)
+    if m and 1 <= int(m.group(2)) <= 31:
+        return _to_date(_MONTH_MAP[m.group(1).lower()[:3]], int(m.group(2)), year)
+    if calendar:
+        return calendar.resolve(cell)
+    return None
+
+
+def _cell_time(cell: str) -> str:
+    m = _CELL_TIME_RE.search(cell)
+    if not m:
+        return "Not Listed"
+    h, mn = int(m.group(1)), int(m.group(2) or 0)
+    if h > 12 or mn > 59:
+        return "Not Listed"
+    if m.group(3).lower() == "p" and h != 12:
+        h += 12
+    if m.group(3).lower() == "a" and h == 12:
+        h = 0
+    return f"{h:02d}:{mn:02d}"
+
+
+def _detect_column_roles(
+    rows: List[List[str]], year: Optional[int], calendar: Optional[SemesterCalendar] = None
+) -> Tuple[Dict[int, str], bool]:
+    """
+    Assign a role (date / week / item / reading / topic) to each column from the
+    header row, falling back to content when there is no recognisable header
+    (e.g. a schedule continued from the previous page). The column whose cells
+    are mostly dates is the date column, whatever its header says. Returns
+    (roles, has_header).
+    """
+    n_cols = max(len(r) for r in rows)
+    header = rows[0] + [""] * (n_cols - len(rows[0]))
+    roles: Dict[int, str] = {}
+    for i, cell in enumerate(header):
+        for role, pattern in _HEADER_ROLES:
+            if cell and pattern.search(cell) and role not in roles.values():
+                roles[i] = role
+                break
+    has_header = bool(roles) and not any(_cell_date(c, year) for c in header if c)
+    if not has_header:
+        roles = {}
+
+    # The date column is whichever column is mostly dates; a "Due" or "Week"
+    # header over dates is a date column. A "Date" header over cells that are
+    # not dates keeps the role only when no column holds dates.
+    body = rows[1:] if has_header else rows
+    ratios: Dict[int, float] = {}
+    for i in range(n_cols):
+        cells = [r[i] for r in body if i < len(r) and r[i]]
+        if cells:
+            ratios[i] = sum(1 for c in cells if _cell_date(c, year, calendar)) / len(cells)
+    best_col = max(ratios, key=lambda i: (ratios[i], -i), default=None)
+    if best_col is not None and ratios[best_col] >= SCHEDULE_DATE_RATIO:
+        header_date = next((i for i, role in roles.items() if role == "date"), None)
+        if header_date is None or ratios.get(header_date, 0.0) < SCHEDULE_DATE_RATIO:
+            if header_date is not None:
+                del roles[header_date]
+            roles[best_col] = "date"
+
+    # Without a header, the remaining non-empty columns are read as topics
+    if not has_header:
+        for i in range(n_cols):
+            if i not in roles and any(i < len(r) and r[i] for r in body):
+                roles[i] = "topic"
+    return roles, has_header
+
+
+def _interpret_schedule_table(
+    rows: List[List[Any]], term: Optional[Tuple[str, int]], calendar: Optional[SemesterCalendar] = None
+) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    """
+    Read assignments and exams straight out of a bordered schedule table
+    (Date / Topic / Reading / Due). Returns {"assignments", "exams", "handled"}
+    when the table is confidently a dated schedule, otherwise None. "handled"
+    is True only when every non-empty topic and item cell was turned into an
+    item; otherwise (lecture topics, undated rows) the table stays in the
+    prompt so the LLM still sees what the interpreter skipped.
+    """
+    year = term[1] if term else None
+    if not year:
+        return None
+    rows = [[_clean_cell(c) for c in r] for r in rows or []]
+    rows = [r for r in rows if any(r)]
+    if len(rows) < 2:
+        return None
+
+    roles, has_header = _detect_column_roles(rows, year, calendar)
+    date_cols = [i for i, role in roles.items() if role == "date"]
+    if not date_cols:
+        return None
+    date_col = date_cols[0]
+    body = rows[1:] if has_header else rows
+
+    dated = [r for r in body if date_col < len(r) and r[date_col]]
+    if len(dated) < 2:
+        return None
+    if sum(1 for r in dated if _cell_date(r[date_col], year, calendar)) / len(dated) < SCHEDULE_DATE_RATIO:
+        return None
+
+    assignments: List[Dict[str, Any]] = []
+    exams: List[Dict[str, Any]] = []
+    handled = True
+
+    def emit(description: str, row_date: str, date_cell: str):
+        description = description.strip(" -–:;,.")
+        if not description or _FINAL_EXAM_RE.search(description):
+            return
+        item = {"description": description[:255], "date": row_date,
+                "time_due": _cell_time(date_cell), "confidence": 90}
+        (exams if _EXAM_WORD_RE.search(description) else assignments).append(item)
+
+    for row in body:
+        date_cell = row[date_col] if date_col < len(row) else ""
+        row_date = _cell_date(date_cell, year, calendar)
+        for i, role in roles.items():
+            cell = row[i] if i < len(row) else ""
+            if not cell or i == date_col or role not in ("item", "topic"):
+                continue
+            if not row_date:
+                handled = False
+                continue
+            if role == "item":
+                # An item cell may carry its own due date ("PS 3 due 2/14")
+                own_date = _cell_date(cell, year, calendar)
+                description = _CELL_MONTH_RE.sub("", _CELL_MD_RE.sub("", cell)) if own_date else cell
+                emit(" ".join(_DUE_WORD_RE.sub("", description).split()), own_date or row_date,
+                     cell if own_date else date_cell)
+                continue
+            for part in re.split(r"\s*[/;]\s*", cell):
+                if not part.strip(" -–:;,."):
+                    continue
+                if _EXAM_WORD_RE.search(part):
+                    emit(part, row_date, date_cell)
+                elif _DUE_WORD_RE.search(part) or _DELIVERABLE_WORD_RE.search(part):
+                    emit(_DUE_WORD_RE.sub("", part), row_date, date_cell)
+                else:
+                    handled = False  # a lecture topic: only the LLM can use it
+
+    return {"assignments": _dedupe_items(assignments, keys=("description", "date")),
+            "exams": _dedupe_items(exams, keys=("description", "date")),
+            "handled": handled}
+
+
+def _extract_schedule_tables(
+    tables: List[Dict[str, Any]], term: Optional[Tuple[str, int]],
+    calendar: Optional[SemesterCalendar] = None,
+) -> Dict[str, Any]:
+    """Run the interpreter over every bordered table; collect items and the handled tables' text."""
+    out: Dict[str, Any] = {"assignments": [], "exams": [], "handled_text": []}
+    for tbl in tables:
+        items = _interpret_schedule_table(tbl["rows"], term, calendar)
+        if items is None:
+            continue
+        out["assignments"].extend(items["assignments"])
+        out["exams"].extend(items["exams"])
+        if items["handled"]:
+            out["handled_text"].append(tbl["text"])
+    return out
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Dedup / merge helpers
 # ──────────────────────────────────────────────────────────────────────────────
 
+_DESC_ALIASES = {
+    "ps": "problem set", "pset": "problem set", "psets": "problem set",
+    "hw": "homework", "hws": "homework", "prelim": "exam", "prelims": "exam",
+    "midterm": "exam", "midterms": "exam", "exams": "exam", "quizzes": "quiz",
+}
+_DESC_STOPWORDS = {"the", "a", "an", "no", "number", "num", "due", "on", "deliverable"}
+_DESC_TOKEN_RE = re.compile(r"[a-z]+|\d+")
+_NOT_LISTED = ("", "not listed", "none")
+
+
+def _description_signature(desc: Any) -> Tuple[frozenset, frozenset]:
+    """
+    Normalised (words, numbers) of an item description:
+    "PS #3" and "Problem Set 3" → ({problem, set}, {3}); "HW3" → ({homework}, {3}).
+    """
+    words, nums = set(), set()
+    for tok in _DESC_TOKEN_RE.findall(str(desc or "").lower()):
+        if tok.isdigit():
+            nums.add(str(int(tok)))
+            continue
+        for w in _DESC_ALIASES.get(tok, tok).split():
+            if w not in _DESC_STOPWORDS:
+                words.add(w)
+    return frozenset(words), frozenset(nums)
+
+
+def _similar_descriptions(a: Tuple[frozenset, frozenset], b: Tuple[frozenset, frozenset]) -> bool:
+    (a_words, a_nums), (b_words, b_nums) = a, b
+    if a_nums and b_nums and a_nums != b_nums:
+        return False
+    if not a_words or not b_words:
+        return False  # nothing but numbers / stopwords: only an exact match is a duplicate
+    common = a_words & b_words
+    if common == a_words or common == b_words:
+        return True
+    return len(common) / len(a_words | b_words) >= 0.5
+
+
+def _is_listed(value: Any) -> bool:
+    return str(value or "").strip().lower() not in _NOT_LISTED
+
+
+def _times_compatible(a: Dict, b: Dict) -> bool:
+    ta, tb = a.get("time_due"), b.get("time_due")
+    return not (_is_listed(ta) and _is_listed(tb)) or str(ta).strip() == str(tb).strip()
+
+
+def _fill_missing(target: Dict, source: Dict) -> None:
+    """Copy fields the kept item lacks from its near-duplicate; keep the higher confidence."""
+    for k, v in source.items():
+        if k == "confidence":
+            if isinstance(v, (int, float)) and v > (target.get(k) or 0):
+                target[k] = v
+        elif not _is_listed(target.get(k)) and _is_listed(v):
+            target[k] = v
+
+
+class _ItemIndex:
+    """
+    Near-duplicate index for dated items. Candidates are blocked by normalised
+    date and then by item number, so a lookup only compares descriptions that
+    could match ("PS 3" never scans the "PS 4" entries of the same date).
+
+    An unnumbered entry ("Quiz") may absorb one numbered item ("Quiz 4") and
+    takes its more specific description; once it has, other numbers ("Quiz 5")
+    are kept as items of their own.
+    """
+
+    def __init__(self):
+        # date -> numbers -> [words, numbers, item, number claimed by an unnumbered entry]
+        self._buckets: Dict[str, Dict[frozenset, List[list]]] = {}
+
+    def find(self, item: Dict) -> Optional[Dict]:
+        words, nums = _description_signature(item.get("description"))
+        bucket = self._buckets.get(self._date_key(item))
+        if not bucket:
+            return None
+        # Unnumbered descriptions may match any number, and vice versa
+        groups = bucket.values() if not nums else (bucket.get(nums, ()), bucket.get(frozenset(), ()))
+        for group in groups:
+            for entry in group:
+                other_words, other_nums, other, claimed = entry
+                if not _similar_descriptions((words, nums), (other_words, other_nums)):
+                    continue
+                if not _times_compatible(item, other):
+                    continue
+                if nums and not other_nums:
+                    if claimed is not None and claimed != nums:
+                        continue
+                    entry[3] = nums
+                    other["description"] = item.get("description")
+                return other
+        return None
+
+    def add(self, item: Dict) -> None:
+        words, nums = _description_signature(item.get("description"))
+        self._buckets.setdefault(self._date_key(item), {}).setdefault(nums, []).append([words, nums, item, None])
+
+    @staticmethod
+    def _date_key(item: Dict) -> str:
+        return str(item.get("date") or "").strip().lower()
+
+
+def _exact_key(item: Dict, keys: Tuple[str, ...]) -> Tuple[str, ...]:
+    return tuple(str(item.get(key) or "").strip().lower() for key in keys)
+
+
 def _dedupe_items(items: Any, keys: Tuple[str, ...] = ("description", "date", "time_due")) -> List[Dict]:
     if not isinstance(items, list):
         return []
+    fuzzy = "description" in keys
+    index = _ItemIndex()
     seen: set = set()
     out = []
     for it in items:
         if not isinstance(it, dict):
             continue
-        k = tuple(str(it.get(key) or "").strip().lower() for key in keys)
+        k = _exact_key(it, keys)
         if k in seen:
             continue
+        if fuzzy:
+            dup = index.find(it)
+            if dup is not None:
+                _fill_missing(dup, it)
+                continue
+            index.add(it)
         seen.add(k)
         out.append(it)
     return out
@@ -738,12 +1335,26 @@ def _merge_items(
     keys: Tuple[str, ...] = ("description", "date"),
 ) -> List[Dict]:
     gpt = gpt or []
-    existing = {tuple(str(e.get(k) or "").strip().lower() for k in keys) for e in gpt}
+    fuzzy = "description" in keys
+    index = _ItemIndex()
+    existing = set()
+    for e in gpt:
+        existing.add(_exact_key(e, keys))
+        if fuzzy:
+            index.add(e)
     merged = list(gpt)
     for item in regex:
-        k = tuple(str(item.get(k) or "").strip().lower() for k in keys)
-        if k not in existing:
-            merged.append(item)
+        k = _exact_key(item, keys)
+        if k in existing:
+            continue
+        if fuzzy:
+            dup = index.find(item)
+            if dup is not None:
+                _fill_missing(dup, item)
+                continue
+            index.add(item)
+        existing.add(k)
+        merged.append(item)
     return merged
 
 
@@ -762,6 +1373,136 @@ def _normalize_item_dates(items: List[Dict], year: Optional[int]) -> List[Dict]:
     return items
 
 
+# ──────────────────────────────────────────────────────────────────────────────
+# Compact response expansion
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _expand_compact(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Expand a CompactSyllabusData dump into the SyllabusData shape."""
+    course_start = data.get("sd") or "Not Listed"
+    course_end = data.get("ed") or "Not Listed"
+
+    lectures = []
+    for lec in data.get("lec") or []:
+        for day in lec.get("d") or []:
+            lectures.append({
+                "day": day,
+                "start_time": lec.get("s"),
+                "end_time": lec.get("e"),
+                "start_date": lec.get("sd") or course_start,
+                "end_date": lec.get("ed") or course_end,
+                "location": lec.get("loc"),
+                "type": lec.get("t"),
+            })
+
+    def items(key: str) -> List[Dict[str, Any]]:
+        return [
+            {"description": it.get("n"), "date": it.get("d"),
+             "time_due": it.get("t"), "confidence": it.get("c")}
+            for it in data.get(key) or []
+        ]
+
+    grading = None
+    gr = data.get("gr")
+    if gr:
+        grading = {
+            "categories": [
+                {"name": c.get("n"), "weight": c.get("w"), "description": c.get("d")}
+                for c in gr.get("cats") or []
+            ],
+            "confidence": gr.get("c"),
+        }
+
+    return {
+        "course_name": data.get("course"),
+        "instructor": data.get("instr"),
+        "summary": data.get("summary"),
+        "lectures": lectures,
+        "assignments": items("hw"),
+        "exams": items("ex"),
+        "grading": grading,
+    }
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Field groups (grouped LLM mode)
+# ──────────────────────────────────────────────────────────────────────────────
+
+METADATA_CHAR_LIMIT = 6_000  # course name, instructor and description sit at the top
+
+_MEETING_LINE_RE = re.compile(
+    r"\b(?:lectures?|class(?:es)?|sections?|labs?|discussions?|recitations?|meet(?:s|ings?)?|"
+    r"room|hall|location)\b|\d{1,2}:\d{2}",
+    re.IGNORECASE,
+)
+_DELIVERABLE_LINE_RE = re.compile(
+    r"\b(?:due|deadlines?|exams?|prelims?|midterms?|finals?|quiz(?:zes)?|homework|hw\d*|assignments?|"
+    r"problem sets?|ps\d*|projects?|labs?|reports?|papers?|essays?|presentations?|submi\w*)\b|"
+    r"\b\d{1,2}/\d{1,2}\b|\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+\d{1,2}\b",
+    re.IGNORECASE,
+)
+_GRADING_LINE_RE = re.compile(
+    r"\b(?:grad(?:e|es|ing)|weight(?:ed|s|ing)?|points?|percent|curve|participation|late)\b|\d\s*%",
+    re.IGNORECASE,
+)
+
+# name: (response schema, fields spec, line pattern or None for the document head, context lines)
+_FIELD_GROUPS = {
+    "metadata": (MetadataGroup, METADATA_FIELDS_SPEC, None, 0),
+    "meetings": (MeetingsGroup, MEETINGS_FIELDS_SPEC, _MEETING_LINE_RE, 2),
+    "deliverables": (DeliverablesGroup, DELIVERABLES_FIELDS_SPEC, _DELIVERABLE_LINE_RE, 2),
+    "grading": (GradingGroup, GRADING_FIELDS_SPEC, _GRADING_LINE_RE, 3),
+}
+
+# Stand-ins for a group that was skipped (no relevant lines) or failed
+_GROUP_DEFAULTS = {
+    "metadata": {"course_name": "Not Listed", "instructor": "Not Listed", "summary": "Not Listed"},
+    "meetings": {"lectures": []},
+    "deliverables": {"assignments": [], "exams": []},
+    "grading": {"grading": None},
+}
+
+
+def _select_lines(text: str, pattern: re.Pattern, context: int) -> str:
+    """
+    Lines matching pattern plus `context` lines either side, in document order.
+    Page markers are kept for orientation and gaps collapse to "...". Returns ""
+    when nothing matches.
+    """
+    lines = text.splitlines()
+    keep = bytearray(len(lines))
+    matched = False
+    for i, line in enumerate(lines):
+        if line.startswith("[PAGE "):
+            keep[i] = 1
+        elif pattern.search(line):
+            matched = True
+            lo, hi = max(0, i - context), min(len(lines), i + context + 1)
+            keep[lo:hi] = b"\x01" * (hi - lo)
+    if not matched:
+        return ""
+
+    out: List[str] = []
+    gap = False
+    for line, kept in zip(lines, keep):
+        if not kept:
+            gap = True
+            continue
+        if gap and out:
+            out.append("...")
+        out.append(line)
+        gap = False
+    return "\n".join(out)
+
+
+def _group_text(text: str, group: str) -> str:
+    """The slice of the prompt text a field group's call gets to see."""
+    _, _, pattern, context = _FIELD_GROUPS[group]
+    if pattern is None:
+        return text[:METADATA_CHAR_LIMIT]
+    return _select_lines(text, pattern, context)
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Chunking
 # ──────────────────────────────────────────────────────────────────────────────
@@ -792,6 +1533,128 @@ def _chunk_text(text: str, max_chars: int) -> List[str]:
     return chunks or [text]
 
 
+# ──────────────────────────────────────────────────────────────────────────────
+# Document context
+# ──────────────────────────────────────────────────────────────────────────────
+
+FieldCallback = Callable[[str, Any], None]
+ResultCallback = Callable[[Dict[str, Any]], None]
+
+# LLM output with nothing in it: merged with the regex / table results it gives
+# the deterministic-only result (provisional phase, LLM-down fallback)
+_EMPTY_LLM_RESULT = {
+    "course_name": "Not Listed", "instructor": "Not Listed", "summary": "",
+    "lectures": [], "assignments": [], "exams": [], "grading": None,
+}
+
+# Compact-schema keys published under their SyllabusData names; the rest only
+# make sense after expansion, so they are not published early
+_COMPACT_EARLY_FIELDS = {"course": "course_name", "instr": "instructor", "summary": "summary"}
+
+
+class DocumentContext:
+    """
+    Per-parse analysis state, created once after extraction. Derived facts
+    (term, semester bounds, calendar, regex and table matches, token counts)
+    are computed on first use and memoized, so every stage reads the same
+    values without rescanning full_text. Stage timings accumulate in `timings`
+    (seconds).
+    """
+
+    def __init__(self, full_text: str, pages: Optional[List[str]] = None,
+                 tables: Optional[List[Dict[str, Any]]] = None, tier: Optional[str] = None):
+        self.full_text = full_text
+        self.pages = pages or []
+        self.tables = tables or []
+        self.tier = tier
+        self.prompt_text = full_text
+        self.timings: Dict[str, float] = {}
+        self.on_field: Optional[FieldCallback] = None  # early publishing of completed LLM fields
+        self.on_retry: Optional[RetryCallback] = None
+        self.deadline: Optional[Deadline] = None  # LLM budget of this parse
+        self.llm_retries: List[Dict[str, Any]] = []
+        self.route: Optional[Dict[str, Any]] = None  # model / completion budget chosen for this document
+        self.llm_usage = {"prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+        self.llm_calls = 0
+        self.llm_cache_hits = 0  # calls that read part of the prompt from the provider's cache
+        self.llm_batch: Optional[Dict[str, Any]] = None  # set when the LLM result came from a batched request
+
+    @contextmanager
+    def timed(self, stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started)
+
+    def record(self, stage: str, seconds: float) -> None:
+        self.timings[stage] = round(self.timings.get(stage, 0.0) + seconds, 4)
+
+    @cached_property
+    def term(self) -> Optional[Tuple[str, int]]:
+        return _detect_term_year(self.full_text)
+
+    @property
+    def year(self) -> Optional[int]:
+        return self.term[1] if self.term else None
+
+    @property
+    def term_str(self) -> str:
+        return f"{self.term[0]} {self.term[1]}" if self.term else "Unknown"
+
+    @cached_property
+    def semester_bounds(self) -> Tuple[Optional[str], Optional[str]]:
+        return _detect_semester_bounds(self.full_text, self.year)
+
+    @cached_property
+    def regex_lectures(self) -> List[Dict[str, Any]]:
+        return _extract_lectures_regex(self.full_text)
+
+    @cached_property
+    def calendar(self) -> Optional[SemesterCalendar]:
+        """Week/lecture-number lookup anchored on the detected semester bounds."""
+        start_date, end_date = self.semester_bounds
+        meeting_days = tuple(l["day"] for l in self.regex_lectures if l.get("type") == "lecture")
+        return get_semester_calendar(start_date, end_date, meeting_days,
+                                     find_breaks(self.full_text, start_date), numbers_break_weeks(self.full_text))
+
+    @cached_property
+    def regex_exams(self) -> List[Dict[str, Any]]:
+        return _extract_exams_regex(self.full_text, self.term)
+
+    @cached_property
+    def regex_assignments(self) -> List[Dict[str, Any]]:
+        return _extract_assignments_regex(self.full_text, self.term)
+
+    @cached_property
+    def relative_items(self) -> Dict[str, List[Dict[str, Any]]]:
+        return _extract_relative_items_regex(self.full_text, self.calendar)
+
+    @cached_property
+    def table_items(self) -> Dict[str, Any]:
+        return _extract_schedule_tables(self.tables, self.term, self.calendar)
+
+    @cached_property
+    def full_text_tokens(self) -> int:
+        return estimate_tokens(self.full_text)
+
+    @property
+    def prompt_tokens(self) -> int:
+        return estimate_tokens(self.prompt_text)
+
+    @property
+    def detected_items(self) -> int:
+        """Items the regex / table scanners found; a proxy for the LLM output length."""
+        return (len(self.regex_lectures) + len(self.regex_exams) + len(self.regex_assignments)
+                + len(self.relative_items["exams"]) + len(self.relative_items["assignments"])
+                + len(self.table_items["exams"]) + len(self.table_items["assignments"]))
+
+
+def _fresh(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Shallow copies, so merging never mutates memoized context results."""
+    return [dict(it) for it in items]
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Parser class
 # ──────────────────────────────────────────────────────────────────────────────
@@ -799,36 +1662,140 @@ def _chunk_text(text: str, max_chars: int) -> List[str]:
 class Parser:
     """Parser for syllabus data"""
 
-    def __init__(self):
+    def __init__(self, tier: str = EXTRACTION_TIER, llm_mode: str = LLM_CALL_MODE, stream: bool = LLM_STREAM):
+        self.tier = tier
+        self.llm_mode = llm_mode
+        self.stream = stream
         self.openai_key = OPENAI_API_KEY
         self._client = OpenAI(api_key=self.openai_key) if self.openai_key else None
 
-    async def parse_syllabus(self, file_url: str) -> dict:
+    async def parse_syllabus(self, file_url: str, on_field: Optional[FieldCallback] = None,
+                             on_provisional: Optional[ResultCallback] = None,
+                             on_retry: Optional[RetryCallback] = None) -> dict:
+        """
+        Parse the PDF at a GCS URL. Callbacks let callers show results early:
+
+        - on_provisional(parsed): the regex / table result, right after
+          extraction and before any LLM call
+        - on_field(name, value): each top-level LLM field as soon as it is
+          complete (raw model output, before merging)
+        - on_retry(attempt, reason, delay): an LLM call failed transiently and
+          is retried after delay seconds
+
+        If the LLM fails, the result is the deterministic one with
+        "degraded" set to the LLM error, not a failure.
+        """
+        return await self._parse(lambda: self._extract_text(file_url), on_field, on_provisional, on_retry)
+
+    async def parse_pdf(self, content: bytes, on_field: Optional[FieldCallback] = None,
+                        on_provisional: Optional[ResultCallback] = None,
+                        on_retry: Optional[RetryCallback] = None) -> dict:
+        """parse_syllabus for PDF bytes already in hand (local files, golden suite)."""
+        async def extract() -> dict:
+            return extract_pdf(content, self.tier)
+        return await self._parse(extract, on_field, on_provisional, on_retry)
+
+    async def _parse(self, extract: Callable[[], Awaitable[dict]], on_field: Optional[FieldCallback] = None,
+                     on_provisional: Optional[ResultCallback] = None,
+                     on_retry: Optional[RetryCallback] = None) -> dict:
+        # The batcher only holds a batch open while other parses are in progress
+        batcher = get_batcher()
+        with batcher.parsing() if batcher else nullcontext():
+            return await self._parse_document(extract, on_field, on_provisional, on_retry)
+
+    async def _parse_document(self, extract: Callable[[], Awaitable[dict]], on_field: Optional[FieldCallback] = None,
+                              on_provisional: Optional[ResultCallback] = None,
+                              on_retry: Optional[RetryCallback] = None) -> dict:
         try:
-            extracted = await self._extract_text(file_url)
-            full_text = extracted["full_text"]
-            term = extracted["term"]
-
-            chunks = _chunk_text(full_text, CHUNK_CHAR_LIMIT)
-            if len(chunks) == 1:
-                raw_result = await self._gpt_parse(chunks[0], term, full_text)
-            else:
-                raw_result = await self._gpt_parse_chunked(chunks, term, full_text)
-
+            started = time.perf_counter()
+            extracted = await extract()
+            ctx = DocumentContext(extracted["full_text"], extracted["pages"], extracted["tables"],
+                                  tier=extracted["tier"])
+            ctx.record("extract", time.perf_counter() - started)
+            full_text = ctx.full_text
+
+            with ctx.timed("provisional"):
+                provisional = self._deterministic_result(ctx)
+            if on_provisional:
+                try:
+                    on_provisional(provisional)
+                except Exception as e:
+                    logger.warning(f"Provisional result callback failed: {e}")
+
+            with ctx.timed("prompt"):
+                prompt_text = self._suppress_boilerplate(full_text)
+                for handled in ctx.table_items["handled_text"]:
+                    prompt_text = prompt_text.replace(handled, "", 1)
+                ctx.prompt_text = prompt_text
+                chunks = _chunk_text(prompt_text, CHUNK_CHAR_LIMIT)
+                ctx.route = choose_route(get_routing_table(), ctx.prompt_tokens, ctx.detected_items, len(chunks))
+
+            ctx.deadline = Deadline(LLM_PARSE_BUDGET_S)
+            ctx.on_retry = on_retry
+            with ctx.timed("llm"):
+                if len(chunks) == 1:
+                    # Per-chunk fields are not final (later chunks merge in), so only single-chunk publishes
+                    ctx.on_field = on_field
+                    raw_result = await self._gpt_parse(chunks[0], ctx)
+                else:
+                    raw_result = await self._gpt_parse_chunked(chunks, ctx)
+            self._record_route(ctx)
+
+            degraded = degraded_class = None
             if "error" in raw_result:
-                return {"success": False, "error": raw_result["error"],
-                        "text": full_text[:500] + ("..." if len(full_text) > 500 else "")}
-
-            validated = self._validate_and_merge(raw_result, full_text, term)
-            if "error" in validated:
-                return {"success": False, "error": validated["error"],
-                        "text": full_text[:500] + ("..." if len(full_text) > 500 else "")}
-
-            return {"success": True,
-                    "text": full_text[:500] + ("..." if len(full_text) > 500 else ""),
-                    "parsed": validated}
+                degraded = raw_result["error"]
+                degraded_class = raw_result.get("error_class", "LLMError")
+            else:
+                with ctx.timed("merge"):
+                    validated = self._validate_and_merge(raw_result, ctx)
+                if "error" in validated:
+                    degraded = validated["error"]
+                    degraded_class = "InvalidLLMOutput"
+            if degraded:
+                # LLM down, timed out or unusable: fall back to the deterministic result
+                logger.warning(f"LLM stage failed, returning regex / table results only: {degraded}")
+                get_metrics().incr("parse_degraded_total")
+                validated = provisional
+
+            ctx.record("total", time.perf_counter() - started)
+            result = {"success": True,
+                      "text": full_text[:500] + ("..." if len(full_text) > 500 else ""),
+                      "parsed": validated,
+                      "timings": ctx.timings,
+                      "tier": ctx.tier,
+                      "llm": {"retries": ctx.llm_retries,
+                              "budget_left_s": round(ctx.deadline.remaining(), 1),
+                              "route": ctx.route,
+                              "usage": ctx.llm_usage,
+                              "calls": ctx.llm_calls,
+                              "cache_hits": ctx.llm_cache_hits,
+                              "batch": ctx.llm_batch}}
+            if degraded:
+                result["degraded"] = degraded
+                result["error_class"] = degraded_class
+            self._index_boilerplate(full_text)
+            return result
+        except ExtractionRejected as e:
+            return {"success": False, "error": str(e), "rejected": e.reason, "error_class": e.reason}
         except Exception as e:
-            return {"success": False, "error": str(e)}
+            return {"success": False, "error": str(e), "error_class": type(e).__name__}
+
+    @staticmethod
+    def _record_route(ctx: DocumentContext) -> None:
+        """Per-route LLM time and tokens, for tuning the routing table on latency and cost."""
+        route = ctx.route["route"]
+        metrics = get_metrics()
+        metrics.incr("llm_route_total", route=route)
+        metrics.observe("parse_llm_seconds", ctx.timings.get("llm", 0.0), route=route)
+        for kind, tokens in ctx.llm_usage.items():
+            metrics.incr("llm_tokens_total", tokens, route=route, kind=kind)
+        logger.info(f"LLM route {route} model={ctx.route['model']} max_tokens={ctx.route['max_tokens']} "
+                    f"prompt_tokens~{ctx.route['prompt_tokens']} items={ctx.route['items']} "
+                    f"chunks={ctx.route['chunks']} llm={ctx.timings.get('llm', 0.0):.2f}s")
+
+    def _deterministic_result(self, ctx: DocumentContext) -> dict:
+        """Regex and table results alone, in the merged output shape."""
+        return self._validate_and_merge(copy.deepcopy(_EMPTY_LLM_RESULT), ctx)
 
     async def _extract_text(self, gcs_url: str) -> dict:
         if "storage.googleapis.com" not in gcs_url:
@@ -840,40 +1807,137 @@ class Parser:
 
         client = storage.Client()
         content = client.bucket(bucket_name).blob(blob_name).download_as_bytes()
-        doc = fitz.open(stream=BytesIO(content), filetype="pdf")
-
-        full_parts = []
-        for i, page in enumerate(doc, start=1):
-            page_text = _page_to_text(page)
-            if page_text.strip():
-                full_parts.append(f"[PAGE {i}]\n{page_text}")
-        doc.close()
-
-        full_text = "\n\n".join(full_parts)
-        return {"full_text": full_text, "term": _detect_term_year(full_text)}
+        return extract_pdf(content, self.tier)
+
+    def _suppress_boilerplate(self, full_text: str) -> str:
+        """Strip corpus-wide boilerplate from the prompt text (see _index_boilerplate)."""
+        if BOILERPLATE_MODE == "off":
+            return full_text
+        prompt_text, _ = get_shingle_index().suppress(full_text, collapse=BOILERPLATE_MODE != "drop")
+        return prompt_text
+
+    @staticmethod
+    def _index_boilerplate(full_text: str) -> None:
+        """Add a successfully parsed document to the boilerplate index."""
+        if BOILERPLATE_MODE == "off":
+            return
+        try:
+            get_shingle_index().add_document(full_text)
+        except Exception as e:
+            logger.warning(f"Could not add document to the boilerplate index: {e}")
 
-    async def _gpt_parse(self, text: str, term: Optional[Tuple[str, int]], full_text: str) -> dict:
-        if not self.openai_key or not self._client:
+    async def _gpt_parse(self, text: str, ctx: DocumentContext) -> dict:
+        if (not self.openai_key or not self._client) and not get_replay_store().replaying:
             return {"error": "OpenAI API key not configured"}
-
-        year = term[1] if term else None
-        start_date, end_date = _detect_semester_bounds(full_text, year)
-        prompt = USER_PROMPT_TEMPLATE.format(
-            term_str=f"{term[0]} {term[1]}" if term else "Unknown",
+        if self.llm_mode == "grouped":
+            return await self._gpt_parse_grouped(text, ctx)
+
+        schema_name = RESPONSE_SCHEMA if RESPONSE_SCHEMA in _RESPONSE_SCHEMAS else "full"
+        if self._batchable(ctx):
+            data = await get_batcher().submit((ctx.route["model"], schema_name), (text, ctx),
+                                              ctx.route["prompt_tokens"], self._run_batch)
+            if data is not None:
+                # Same publishing / expansion as a single-document _run_llm, in this job's own loop
+                publish = self._field_publisher(schema_name, ctx.on_field)
+                if publish:
+                    for name, value in data.items():
+                        publish(name, value)
+                return _expand_compact(data) if schema_name == "compact" else data
+        fields = _RESPONSE_SCHEMAS.get(RESPONSE_SCHEMA, _RESPONSE_SCHEMAS["full"])[1]
+        return await self._run_llm(self._build_prompt(text, ctx, fields), ctx=ctx)
+
+    def _batchable(self, ctx: DocumentContext) -> bool:
+        """Small single-chunk documents that do not stream fields may share a request."""
+        route = ctx.route
+        return (get_batcher() is not None and route is not None and route["chunks"] == 1
+                and route["prompt_tokens"] <= LLM_BATCH_MAX_DOC_TOKENS
+                and not (self.stream and ctx.on_field))
+
+    async def _run_batch(self, documents: List[Tuple[str, DocumentContext]]) -> List[Optional[dict]]:
+        """One request for several documents; raw per-document results in order (None = missing)."""
+        schema_name = RESPONSE_SCHEMA if RESPONSE_SCHEMA in _RESPONSE_SCHEMAS else "full"
+        keys = [f"doc_{i}" for i in range(len(documents))]
+        sections = []
+        for key, (text, ctx) in zip(keys, documents):
+            start_date, end_date = ctx.semester_bounds
+            sections.append(BATCH_DOCUMENT_TEMPLATE.format(
+                key=key, term_str=ctx.term_str, start_date=start_date or "Not Listed",
+                end_date=end_date or "Not Listed", text=text,
+            ))
+        prompt = BATCH_PROMPT_TEMPLATE.format(fields=_RESPONSE_SCHEMAS[schema_name][1],
+                                              documents="\n".join(sections))
+        route = {**documents[0][1].route, "route": "batch",
+                 "max_tokens": min(LLM_BATCH_MAX_COMPLETION, sum(ctx.route["max_tokens"] for _, ctx in documents))}
+        usage: Dict[str, int] = {}
+        # Bounded by the member with the least LLM budget left
+        deadlines = [ctx.deadline for _, ctx in documents if ctx.deadline]
+        data = await self._run_llm(prompt, schema_name=f"batch.{schema_name}",
+                                   response_format=_batch_schema(schema_name, len(documents)), route=route,
+                                   usage_out=usage,
+                                   deadline=min(deadlines, key=Deadline.remaining) if deadlines else None)
+        if "error" in data:
+            raise RuntimeError(data["error"])
+        # Each member is charged the shared call's tokens in proportion to its prompt size
+        total_prompt = sum(ctx.route["prompt_tokens"] for _, ctx in documents) or 1
+        results = []
+        for key, (_, ctx) in zip(keys, documents):
+            doc = data.get(key)
+            if not isinstance(doc, dict):
+                results.append(None)
+                continue
+            ctx.llm_batch = {"size": len(documents), "key": key}
+            share = ctx.route["prompt_tokens"] / total_prompt
+            for kind in ctx.llm_usage:
+                ctx.llm_usage[kind] += round(usage.get(kind, 0) * share)
+            ctx.llm_calls += 1
+            ctx.llm_cache_hits += 1 if usage.get("cached_tokens") else 0
+            results.append(doc)
+        return results
+
+    def _build_prompt(self, text: str, ctx: DocumentContext, fields: str) -> str:
+        start_date, end_date = ctx.semester_bounds
+        return USER_PROMPT_TEMPLATE.format(
+            term_str=ctx.term_str,
             start_date=start_date or "Not Listed",
             end_date=end_date or "Not Listed",
+            fields=fields,
             text=text,
         )
-        return await self._run_llm(prompt)
 
-    async def _gpt_parse_chunked(
-        self, chunks: List[str], term: Optional[Tuple[str, int]], full_text: str
-    ) -> dict:
-        results = []
-        for chunk in chunks:
-            r = await self._gpt_parse(chunk, term, full_text)
-            if "error" not in r:
-                results.append(r)
+    async def _gpt_parse_grouped(self, text: str, ctx: DocumentContext) -> dict:
+        """
+        One concurrent call per field group, each with its own small schema and
+        only the lines relevant to it, merged into the SyllabusData shape.
+        Wall time tracks the slowest group instead of the sum of all fields.
+        """
+        async def run(group: str) -> dict:
+            group_text = _group_text(text, group)
+            if not group_text.strip():
+                return copy.deepcopy(_GROUP_DEFAULTS[group])
+            started = time.perf_counter()
+            fields = _FIELD_GROUPS[group][1]
+            result = await self._run_llm(self._build_prompt(group_text, ctx, fields), schema_name=group, ctx=ctx)
+            ctx.record(f"llm.{group}", time.perf_counter() - started)
+            return result
+
+        results = await asyncio.gather(*(run(group) for group in _FIELD_GROUPS))
+        merged: Dict[str, Any] = {}
+        failed = []
+        for group, result in zip(_FIELD_GROUPS, results):
+            if "error" in result:
+                failed.append(f"{group}: {result['error']}")
+                result = copy.deepcopy(_GROUP_DEFAULTS[group])
+            merged.update(result)
+        if len(failed) == len(_FIELD_GROUPS):
+            return {"error": "; ".join(failed)}
+        if failed:
+            logger.warning(f"Field groups failed, using defaults: {'; '.join(failed)}")
+        return merged
+
+    async def _gpt_parse_chunked(self, chunks: List[str], ctx: DocumentContext) -> dict:
+        # Chunks run concurrently (the adaptive limiter decides how many are in flight); merged in order
+        responses = await asyncio.gather(*(self._gpt_parse(chunk, ctx) for chunk in chunks))
+        results = [r for r in responses if "error" not in r]
         if not results:
             return {"error": "All chunks failed to parse"}
         merged = results[0]
@@ -887,41 +1951,260 @@ class Parser:
                     merged[field] = subsequent[field]
         return merged
 
-    async def _run_llm(self, prompt: str) -> dict:
+    async def _run_llm(self, prompt: str, schema_name: Optional[str] = None,
+                       ctx: Optional[DocumentContext] = None, response_format: Any = None,
+                       route: Optional[Dict[str, Any]] = None, usage_out: Optional[Dict[str, int]] = None,
+                       deadline: Optional[Deadline] = None) -> dict:
+        """
+        One structured call; schema_name is a response schema or a field group
+        (or any label, given an explicit response_format and route: batches).
+        Token counts go to ctx, or into usage_out for calls without one.
+        The LLM deadline is ctx's unless one is given (a batch passes its
+        members' tightest); with neither, a fresh LLM_PARSE_BUDGET_S.
+        Live calls go through call_with_retries: timeouts clamped to the
+        parse's LLM deadline, jittered retries, and the shared circuit breaker;
+        with LLM_HEDGE each attempt is hedged once it runs slow.
+        ctx.on_field gets each top-level field as it completes: mid-stream
+        with LLM_STREAM, otherwise all at once when the response arrives.
+        """
+        if schema_name is None:
+            schema_name = RESPONSE_SCHEMA if RESPONSE_SCHEMA in _RESPONSE_SCHEMAS else "full"
+        if response_format is None:
+            response_format = (_RESPONSE_SCHEMAS.get(schema_name) or _FIELD_GROUPS[schema_name])[0]
+        route = route or (ctx.route if ctx else None)
+        model = route["model"] if route else DEFAULT_MODEL
+        max_tokens = route["max_tokens"] if route else MAX_TOKENS
+        store = get_replay_store()
+        key = fingerprint(model, schema_name, max_tokens, SYSTEM_PROMPT, prompt)
+        publish = self._field_publisher(schema_name, ctx.on_field if ctx else None)
+        streamed = False
+        sink: Optional[FirstPublisher] = None
+        metrics = get_metrics()
         try:
-            response = self._client.beta.chat.completions.parse(
-                model=DEFAULT_MODEL,
-                messages=[
+            if store.replaying:
+                data, recorded_usage = await store.replay(key)
+                # Prompt / cached tokens from the offline prefix-cache model, completion as recorded
+                usage_counts = store.prompt_cache.account(_prompt_cache_text(response_format, prompt))
+                usage_counts["completion_tokens"] = recorded_usage.get("completion_tokens") or 0
+            else:
+                messages = [
                     {"role": "system", "content": SYSTEM_PROMPT},
                     {"role": "user", "content": prompt},
-                ],
-                response_format=SyllabusData,
-                max_completion_tokens=MAX_TOKENS,
-            )
-            result = response.choices[0].message.parsed
-            return result.model_dump() if result else {"error": "No parsed result returned"}
+                ]
+                streamed = bool(self.stream and publish)
+
+                async def request(timeout: float, cancel: Optional[threading.Event] = None,
+                                  attempt_sink: Optional[FirstPublisher] = None):
+                    # Sync client in a worker thread, so grouped calls overlap
+                    if streamed:
+                        # A cancelled await (deadline, lost hedge) must also stop the reading thread
+                        cancel = cancel or threading.Event()
+                        try:
+                            return await asyncio.to_thread(self._stream_llm, messages, response_format,
+                                                           attempt_sink.bind(cancel), timeout, cancel,
+                                                           model, max_tokens)
+                        except asyncio.CancelledError:
+                            cancel.set()
+                            raise
+                    return await asyncio.to_thread(
+                        self._client.beta.chat.completions.parse,
+                        model=model,
+                        messages=messages,
+                        response_format=response_format,
+                        max_completion_tokens=max_tokens,
+                        timeout=timeout,
+                    )
+
+                async def call(timeout: float):
+                    # Each attempt's streams (the request and its hedge) share one publisher
+                    nonlocal sink
+                    sink = FirstPublisher(publish) if streamed else None
+                    attempt_sink = sink
+                    if hedger is None:
+                        return await request(timeout, attempt_sink=attempt_sink)
+                    return await hedger.run(lambda cancel: request(timeout, cancel, attempt_sink), schema_name,
+                                            gate=hedge_gate)
+
+                def on_retry(attempt: int, reason: str, delay: float) -> None:
+                    if ctx is None:
+                        return
+                    ctx.llm_retries.append({"call": schema_name, "attempt": attempt, "reason": reason,
+                                            "delay_s": round(delay, 2)})
+                    if ctx.on_retry:
+                        ctx.on_retry(attempt, reason, delay)
+
+                # Reserve prompt + completion cap against the shared budget; unused tokens are refunded,
+                # and a failed attempt gives its whole reservation back before the next one reserves
+                limiter = get_rate_limiter()
+                estimate = estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(prompt) + max_tokens
+                reserved = 0.0
+
+                async def acquire() -> None:
+                    nonlocal reserved
+                    if reserved:
+                        limiter.release(reserved, 0)
+                        reserved = 0.0
+                    reserved = await limiter.acquire(estimate)
+
+                # A hedge is only sent if the budget has room right now; its reservation is refunded
+                # once the call is over (the winner's usage is settled against the primary's)
+                hedger = get_hedger()
+                hedge_reserved: List[float] = []
+
+                async def hedge_gate() -> bool:
+                    if limiter is None:
+                        return True
+                    taken = await limiter.try_acquire(estimate)
+                    if taken is None:
+                        return False
+                    hedge_reserved.append(taken)
+                    return True
+
+                deadline = deadline or (ctx.deadline if ctx and ctx.deadline else Deadline(LLM_PARSE_BUDGET_S))
+                started = time.perf_counter()
+                try:
+                    response = await call_with_retries(call, deadline, LLM_TIMEOUT_S, on_retry=on_retry,
+                                                       label=schema_name, acquire=acquire if limiter else None,
+                                                       concurrency=get_concurrency_limiter())
+                except BaseException:
+                    if limiter and reserved:
+                        limiter.release(reserved, 0)
+                    raise
+                finally:
+                    for taken in hedge_reserved:
+                        limiter.release(taken, 0)
+                latency = time.perf_counter() - started
+                usage = getattr(response, "usage", None)
+                if limiter:
+                    limiter.release(reserved, getattr(usage, "total_tokens", None))
+                usage_counts = {
+                    "prompt_tokens": getattr(usage, "prompt_tokens", None),
+                    "cached_tokens": getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None),
+                    "completion_tokens": getattr(usage, "completion_tokens", None),
+                }
+                logger.info(
+                    f"LLM call schema={schema_name} model={model} "
+                    f"latency={latency:.2f}s "
+                    f"prompt_tokens={usage_counts['prompt_tokens']} "
+                    f"cached_tokens={usage_counts['cached_tokens']} "
+                    f"completion_tokens={usage_counts['completion_tokens']}"
+                )
+                result = response.choices[0].message.parsed
+                if not result:
+                    return {"error": "No parsed result returned"}
+                data = result.model_dump()
+                if store.recording:
+                    store.record(
+                        key, data, latency,
+                        usage=usage_counts,
+                        meta={"model": model, "schema": schema_name},
+                    )
+            if ctx:
+                for kind in ctx.llm_usage:
+                    ctx.llm_usage[kind] += usage_counts.get(kind) or 0
+                ctx.llm_calls += 1
+                ctx.llm_cache_hits += 1 if usage_counts.get("cached_tokens") else 0
+            if usage_out is not None:
+                usage_out.update({kind: count or 0 for kind, count in usage_counts.items()})
+            metrics.incr("llm_prompt_tokens_total", usage_counts.get("prompt_tokens") or 0, call=schema_name)
+            metrics.incr("llm_cached_tokens_total", usage_counts.get("cached_tokens") or 0, call=schema_name)
+            if publish:
+                # Whatever the winning request did not stream (all of it, unstreamed)
+                for name, value in data.items():
+                    if sink is None or name not in sink.published:
+                        publish(name, value)
+            metrics.incr("llm_calls_total", call=schema_name, outcome="ok")
+            return _expand_compact(data) if schema_name == "compact" else data
+        except ReplayMiss as e:
+            return {"error": f"Replay miss: {e}", "error_class": "ReplayMiss"}
+        except CircuitOpen as e:
+            metrics.incr("llm_calls_total", call=schema_name, outcome="circuit_open")
+            return {"error": str(e), "error_class": "CircuitOpen"}
+        except DeadlineExceeded as e:
+            metrics.incr("llm_calls_total", call=schema_name, outcome="deadline")
+            return {"error": str(e), "error_class": "DeadlineExceeded"}
+        except LengthFinishReasonError as e:
+            metrics.incr("llm_calls_total", call=schema_name, outcome="length")
+            # Truncated at the route's cap: once more on the next route up
+            bigger = escalate_route(get_routing_table(), route) if route and "escalated_from" not in route else None
+            if bigger is None:
+                return {"error": f"GPT error: {str(e)}", "error_class": type(e).__name__}
+            metrics.incr("llm_route_escalations_total", route=route["route"])
+            logger.warning(f"LLM call {schema_name} hit max_tokens={max_tokens} on route {route['route']}, "
+                           f"retrying on {bigger['route']} (max_tokens={bigger['max_tokens']})")
+            if ctx and ctx.route is route:
+                ctx.route = bigger
+            return await self._run_llm(prompt, schema_name, ctx, response_format, bigger, usage_out, deadline)
         except Exception as e:
-            return {"error": f"GPT error: {str(e)}"}
-
-    def _validate_and_merge(
-        self, data: dict, full_text: str, term: Optional[Tuple[str, int]]
-    ) -> dict:
+            metrics.incr("llm_calls_total", call=schema_name, outcome="error")
+            return {"error": f"GPT error: {str(e)}", "error_class": type(e).__name__}
+
+    @staticmethod
+    def _field_publisher(schema_name: str, on_field: Optional[FieldCallback]) -> Optional[FieldCallback]:
+        """on_field wrapped to rename / filter compact keys and to never break the parse."""
+        if on_field is None:
+            return None
+
+        def publish(name: str, value: Any) -> None:
+            if schema_name == "compact":
+                if name not in _COMPACT_EARLY_FIELDS:
+                    return
+                name = _COMPACT_EARLY_FIELDS[name]
+            try:
+                on_field(name, value)
+            except Exception as e:
+                logger.warning(f"Field callback failed for {name}: {e}")
+        return publish
+
+    def _stream_llm(self, messages: List[Dict[str, str]], response_format: Any, publish: FieldCallback,
+                    timeout: float = LLM_TIMEOUT_S, cancel: Optional[threading.Event] = None,
+                    model: str = DEFAULT_MODEL, max_tokens: int = MAX_TOKENS):
+        """
+        Streamed structured call (worker thread); publishes fields as they
+        complete. Stops and closes the stream once `cancel` is set (a lost hedge).
+        """
+        fields = FieldStream()
+        with self._client.beta.chat.completions.stream(
+            model=model,
+            messages=messages,
+            response_format=response_format,
+            max_completion_tokens=max_tokens,
+            stream_options={"include_usage": True},
+            timeout=timeout,
+        ) as stream:
+            for event in stream:
+                if cancel is not None and cancel.is_set():
+                    return None
+                if event.type == "content.delta":
+                    for name, value in fields.feed(event.delta):
+                        publish(name, value)
+            return stream.get_final_completion()
+
+    def _validate_and_merge(self, data: dict, ctx: DocumentContext) -> dict:
         if not isinstance(data, dict):
             return {"error": "Parsed data is not a dictionary"}
 
-        year = term[1] if term else None
+        year = ctx.year
 
         # Normalize dates GPT returned (catches "2/14", "Feb 14", etc.)
         data["assignments"] = _normalize_item_dates(data.get("assignments") or [], year)
         data["exams"] = _normalize_item_dates(data.get("exams") or [], year)
         data["lectures"] = _normalize_item_dates(data.get("lectures") or [], year)
 
+        # Schedule-table items were removed from the prompt, so add them back
+        data["exams"] = _merge_items(data["exams"], _fresh(ctx.table_items["exams"]))
+        data["assignments"] = _merge_items(data["assignments"], _fresh(ctx.table_items["assignments"]))
+
         # Regex fallbacks fill in what GPT missed
-        data["exams"] = _merge_items(data["exams"], _extract_exams_regex(full_text, term))
-        data["assignments"] = _merge_items(data["assignments"], _extract_assignments_regex(full_text, term))
+        data["exams"] = _merge_items(data["exams"], _fresh(ctx.regex_exams))
+        data["assignments"] = _merge_items(data["assignments"], _fresh(ctx.regex_assignments))
+
+        # "Week 5 – Tue: Quiz 2" style references resolved against the semester calendar
+        data["exams"] = _merge_items(data["exams"], _fresh(ctx.relative_items["exams"]))
+        data["assignments"] = _merge_items(data["assignments"], _fresh(ctx.relative_items["assignments"]))
 
         # Lecture expansion (MWF → Mon+Wed+Fri entries, etc.)
-        data["lectures"] = _expand_lectures(data.get("lectures") or [], full_text)
+        data["lectures"] = _expand_lectures(data.get("lectures") or [], _fresh(ctx.regex_lectures))
 
         # Final dedup
         data["exams"] = _dedupe_items(data["exams"], keys=("description", "date", "time_due"))
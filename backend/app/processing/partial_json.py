@@ -0,0 +1,78 @@
+"""
+partial_json.py — incremental parsing of a streamed JSON object
+
+A structured-output stream arrives as arbitrary text fragments of one JSON
+object. FieldStream scans each fragment once, tracking string / escape state
+and nesting depth, and emits a top-level member as soon as the comma or
+closing brace after it arrives:
+
+    {"course_name": "CS 4670", "summary": "...", "lectures": [ ...
+                              ^ course_name emitted here
+
+Each member's text is decoded with json.loads exactly once, so the total cost
+is linear in the response length however it is fragmented.
+"""
+
+import json
+import re
+from typing import Any, List, Tuple
+
+_STRUCTURAL_RE = re.compile(r'["\\{}\[\],]')  # the only chars that change scanner state
+
+
+class FieldStream:
+    """Feed fragments of one JSON object; get back its completed top-level members."""
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escape = False       # the previous fragment ended on a backslash inside a string
+        self._member: List[str] = []  # pieces of the current top-level member
+        self._in_member = False
+        self.done = False
+
+    def feed(self, fragment: str) -> List[Tuple[str, Any]]:
+        """Scan one fragment; returns the (key, value) members it completed, in order."""
+        completed: List[Tuple[str, Any]] = []
+        start = 0  # where the current member's text begins within this fragment
+        i = 0
+        if self._escape and fragment:
+            self._escape = False
+            i = 1
+        while not self.done:
+            m = _STRUCTURAL_RE.search(fragment, i)
+            if m is None:
+                break
+            i = m.end()
+            c = m.group()
+            if self._in_string:
+                if c == "\\":
+                    if i == len(fragment):
+                        self._escape = True
+                    i += 1
+                elif c == '"':
+                    self._in_string = False
+            elif c == '"':
+                self._in_string = True
+            elif c in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._in_member, self._member, start = True, [], i
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit(fragment[start:i - 1], completed)
+                    self._in_member = False
+                    self.done = True
+            elif c == "," and self._depth == 1:
+                self._emit(fragment[start:i - 1], completed)
+                self._member, start = [], i
+        if self._in_member and not self.done:
+            self._member.append(fragment[start:])
+        return completed
+
+    def _emit(self, tail: str, completed: List[Tuple[str, Any]]) -> None:
+        member = "".join(self._member) + tail
+        self._member = []
+        if member.strip():
+            completed.extend(json.loads("{" + member + "}").items())
@@ -0,0 +1,244 @@
+"""
+ratelimit.py — shared request / token budget for LLM calls
+
+Every parse job fires its LLM calls as soon as it reaches them, so a burst of
+uploads hits the provider's rate limits together and every parse slows down
+behind 429 retries. The limiter keeps two token buckets, requests per minute
+and estimated tokens per minute, and a call waits until both can pay for it.
+
+- Fairness: waiters take a ticket and are served strictly in ticket order, so
+  a big request at the head is not starved by a stream of small ones behind it
+- Estimates: a call reserves its prompt estimate plus the completion cap; once
+  the response reports usage, the unused part is refunded
+- LocalRateLimiter: buckets in this process (one API worker)
+- PostgresRateLimiter: buckets in a row of llm_rate_buckets, updated under
+  SELECT ... FOR UPDATE, so every process shares one budget. Ordering is FIFO
+  within a process; across processes the head waiters queue on the row lock.
+  Existing databases need scripts/add_rate_limit_table.py once
+
+Waiting is an asyncio sleep, never a blocked thread: jobs run in separate event
+loops (one asyncio.run per background task), so only the ticket counter and
+buckets are shared, under a threading lock.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Optional, Tuple
+
+from sqlalchemy import text
+
+from .config import LLM_RATE_LIMITER, LLM_RPM, LLM_TPM
+from .metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITERS = ("off", "local", "postgres")
+POLL_S = 0.05  # how often a waiter behind the head re-checks its turn
+
+
+class TokenBuckets:
+    """Requests and tokens buckets, each refilling continuously at its per-minute rate."""
+
+    def __init__(self, rpm: float, tpm: float):
+        self.rpm = rpm
+        self.tpm = tpm
+
+    def clamp(self, tokens: float) -> float:
+        """A request larger than the whole bucket could never be served; charge it a full bucket."""
+        return min(tokens, self.tpm)
+
+    def refill(self, requests: float, tokens: float, updated: float, now: float) -> Tuple[float, float]:
+        elapsed = max(0.0, now - updated)
+        return (min(self.rpm, requests + elapsed * self.rpm / 60),
+                min(self.tpm, tokens + elapsed * self.tpm / 60))
+
+    def wait_for(self, requests: float, tokens: float, need: float) -> float:
+        """Seconds until both buckets can pay for one request of `need` tokens (0 = now)."""
+        wait_requests = max(0.0, 1 - requests) * 60 / self.rpm
+        wait_tokens = max(0.0, need - tokens) * 60 / self.tpm
+        return max(wait_requests, wait_tokens)
+
+
+class _FairLimiter:
+    """Ticketed FIFO queue in front of a bucket store (_try_take / _refund)."""
+
+    blocking_store = False  # _try_take does I/O and runs in a worker thread
+
+    def __init__(self, rpm: float = LLM_RPM, tpm: float = LLM_TPM):
+        self.buckets = TokenBuckets(rpm, tpm)
+        self._lock = threading.Lock()
+        self._next_ticket = 0
+        self._serving = 0
+        self._abandoned = set()
+
+    def _try_take(self, tokens: float) -> float:
+        """Take one request and `tokens` if both are available; else seconds to wait."""
+        raise NotImplementedError
+
+    def _refund(self, tokens: float) -> None:
+        raise NotImplementedError
+
+    def _advance(self) -> None:
+        self._serving += 1
+        while self._serving in self._abandoned:
+            self._abandoned.discard(self._serving)
+            self._serving += 1
+
+    async def acquire(self, tokens: float) -> float:
+        """Wait for this call's turn and budget; returns the tokens actually reserved."""
+        tokens = self.buckets.clamp(tokens)
+        with self._lock:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+        metrics = get_metrics()
+        started = time.monotonic()
+        try:
+            while True:
+                with self._lock:
+                    is_head = ticket == self._serving
+                    queued = self._next_ticket - self._serving
+                if is_head:
+                    if self.blocking_store:
+                        wait = await asyncio.to_thread(self._try_take, tokens)
+                    else:
+                        wait = self._try_take(tokens)
+                    if wait <= 0:
+                        with self._lock:
+                            self._advance()
+                        break
+                    await asyncio.sleep(wait)
+                else:
+                    metrics.set_gauge("llm_rate_limit_queue", queued)
+                    await asyncio.sleep(POLL_S)
+        except BaseException:
+            with self._lock:
+                if ticket == self._serving:
+                    self._advance()
+                elif ticket > self._serving:
+                    self._abandoned.add(ticket)
+            raise
+        waited = time.monotonic() - started
+        metrics.observe("llm_rate_limit_wait_seconds", waited)
+        if waited > 1:
+            logger.info(f"LLM call waited {waited:.1f}s for rate limit budget ({tokens:.0f} tokens)")
+        return tokens
+
+    async def try_acquire(self, tokens: float) -> Optional[float]:
+        """Take budget only if nobody is queued and it is available now; None otherwise."""
+        tokens = self.buckets.clamp(tokens)
+        with self._lock:
+            if self._next_ticket != self._serving:
+                return None
+        if self.blocking_store:
+            wait = await asyncio.to_thread(self._try_take, tokens)
+        else:
+            wait = self._try_take(tokens)
+        return tokens if wait <= 0 else None
+
+    def release(self, reserved: float, used: Optional[float]) -> None:
+        """Refund the part of a reservation the response did not use."""
+        if used is not None and used < reserved:
+            self._refund(reserved - used)
+
+
+class LocalRateLimiter(_FairLimiter):
+    """Buckets held in this process."""
+
+    def __init__(self, rpm: float = LLM_RPM, tpm: float = LLM_TPM):
+        super().__init__(rpm, tpm)
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+
+    def _try_take(self, tokens: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._requests, self._tokens = self.buckets.refill(self._requests, self._tokens, self._updated, now)
+            self._updated = now
+            wait = self.buckets.wait_for(self._requests, self._tokens, tokens)
+            if wait <= 0:
+                self._requests -= 1
+                self._tokens -= tokens
+            return wait
+
+    def _refund(self, tokens: float) -> None:
+        with self._lock:
+            self._tokens = min(self.buckets.tpm, self._tokens + tokens)
+
+
+class PostgresRateLimiter(_FairLimiter):
+    """Buckets in one llm_rate_buckets row, shared by every process on the database."""
+
+    blocking_store = True
+
+    def __init__(self, rpm: float = LLM_RPM, tpm: float = LLM_TPM, name: str = "openai", engine=None):
+        super().__init__(rpm, tpm)
+        self.name = name
+        self._engine = engine
+        self._ready = False
+
+    def _get_engine(self):
+        if self._engine is None:
+            from app.database.db import get_engine
+            self._engine = get_engine()
+        return self._engine
+
+    def _ensure_row(self) -> None:
+        """Seed this limiter's bucket row (the table comes from scripts/add_rate_limit_table.py)."""
+        if self._ready:
+            return
+        with self._get_engine().begin() as conn:
+            conn.execute(text(
+                "INSERT INTO llm_rate_buckets (name, requests, tokens, updated_at)"
+                " VALUES (:name, :requests, :tokens, EXTRACT(EPOCH FROM clock_timestamp()))"
+                " ON CONFLICT (name) DO NOTHING"
+            ), {"name": self.name, "requests": self.buckets.rpm, "tokens": self.buckets.tpm})
+        self._ready = True
+
+    def _try_take(self, tokens: float) -> float:
+        self._ensure_row()
+        with self._get_engine().begin() as conn:
+            row = conn.execute(text(
+                "SELECT requests, tokens, updated_at, EXTRACT(EPOCH FROM clock_timestamp())"
+                " FROM llm_rate_buckets WHERE name = :name FOR UPDATE"
+            ), {"name": self.name}).one()
+            now = float(row[3])
+            requests, available = self.buckets.refill(float(row[0]), float(row[1]), float(row[2]), now)
+            wait = self.buckets.wait_for(requests, available, tokens)
+            if wait <= 0:
+                requests -= 1
+                available -= tokens
+            conn.execute(text(
+                "UPDATE llm_rate_buckets SET requests = :requests, tokens = :tokens, updated_at = :now"
+                " WHERE name = :name"
+            ), {"requests": requests, "tokens": available, "now": now, "name": self.name})
+            return wait
+
+    def _refund(self, tokens: float) -> None:
+        try:
+            with self._get_engine().begin() as conn:
+                conn.execute(text(
+                    "UPDATE llm_rate_buckets SET tokens = LEAST(:cap, tokens + :refund) WHERE name = :name"
+                ), {"cap": self.buckets.tpm, "refund": tokens, "name": self.name})
+        except Exception as e:
+            logger.warning(f"Rate limit refund failed: {e}")
+
+
+_limiter: Optional[_FairLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> Optional[_FairLimiter]:
+    """Get or create the process-wide limiter (None when LLM_RATE_LIMITER=off)"""
+    global _limiter
+    if LLM_RATE_LIMITER == "off":
+        return None
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                if LLM_RATE_LIMITER not in RATE_LIMITERS:
+                    raise ValueError(f"Unknown LLM_RATE_LIMITER {LLM_RATE_LIMITER!r}")
+                _limiter = PostgresRateLimiter() if LLM_RATE_LIMITER == "postgres" else LocalRateLimiter()
+    return _limiter
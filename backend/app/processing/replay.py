@@ -0,0 +1,177 @@
+"""
+replay.py — record / replay of LLM responses
+
+End-to-end runs of Parser.parse_syllabus need a live model, so neither
+accuracy nor latency is reproducible. This layer sits under Parser._run_llm:
+
+- record: call the model as usual, then store the response under a fingerprint
+  of everything that determines it (model, schema, token cap, both prompts)
+- replay: serve the stored response without any network access; a prompt
+  with no recording is an error, so prompt drift shows up instead of hiding
+- off: pass-through (the default)
+
+Recordings are one JSON file per fingerprint, holding the structured response
+(before compact expansion), the observed latency and the token usage. With
+LLM_REPLAY_LATENCY set, replay sleeps for the recorded latency so stage
+timings stay comparable to a live run.
+
+Replay also runs each prompt through PromptCacheSimulator, a model of the
+provider's prefix cache, so cached vs uncached prompt tokens and the
+stability of the shared prompt prefix can be checked without network access.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from .config import LLM_REPLAY_DIR, LLM_REPLAY_LATENCY, LLM_REPLAY_MODE
+from .tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+REPLAY_MODES = ("off", "record", "replay")
+
+
+class ReplayMiss(Exception):
+    """Replay mode found no recording for a request fingerprint."""
+
+
+def fingerprint(model: str, schema: str, max_tokens: int, system_prompt: str, user_prompt: str) -> str:
+    """Stable hash of the request fields that determine the response."""
+    payload = json.dumps(
+        {"model": model, "schema": schema, "max_tokens": max_tokens,
+         "system": system_prompt, "user": user_prompt},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# Provider prefix caching: prompts of at least CACHE_MIN_TOKENS, cached in CACHE_BLOCK_TOKENS steps
+CACHE_MIN_TOKENS = 1024
+CACHE_BLOCK_TOKENS = 128
+
+
+def _common_prefix_len(a: str, b: str) -> int:
+    """Length of the common prefix; binary search over slice compares (C speed on long prompts)."""
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+class PromptCacheSimulator:
+    """
+    Offline stand-in for provider-side prompt caching: a prompt's cached
+    tokens are its longest prefix shared with a recent prompt, rounded down to
+    whole blocks and only from the minimum cacheable length. The prompt text
+    should be everything the provider prefixes with: schema, system, user.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self._recent: Deque[str] = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def account(self, prompt: str) -> Dict[str, int]:
+        with self._lock:
+            shared = max((_common_prefix_len(prompt, p) for p in self._recent), default=0)
+            self._recent.append(prompt)
+        total = estimate_tokens(prompt)
+        shared_tokens = estimate_tokens(prompt[:shared])
+        cached = shared_tokens // CACHE_BLOCK_TOKENS * CACHE_BLOCK_TOKENS if shared_tokens >= CACHE_MIN_TOKENS else 0
+        return {"prompt_tokens": total, "cached_tokens": min(cached, total)}
+
+
+class ReplayStore:
+    """Directory of recorded responses, one <fingerprint>.json per request."""
+
+    def __init__(self, mode: str = LLM_REPLAY_MODE, directory: str = LLM_REPLAY_DIR,
+                 simulate_latency: bool = LLM_REPLAY_LATENCY):
+        if mode not in REPLAY_MODES:
+            raise ValueError(f"Unknown LLM replay mode {mode!r} (expected one of {', '.join(REPLAY_MODES)})")
+        self.mode = mode
+        self.directory = directory
+        self.simulate_latency = simulate_latency
+        self.hits = 0
+        self.misses = 0
+        self.prompt_cache = PromptCacheSimulator()
+        self._lock = threading.Lock()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key), encoding="utf-8") as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return None
+
+    async def replay(self, key: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """The recorded (response data, usage) for key; sleeps for its latency when simulating."""
+        entry = self.load(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if entry is None:
+            raise ReplayMiss(f"No recorded LLM response for fingerprint {key[:12]}")
+        if self.simulate_latency:
+            await asyncio.sleep(entry.get("latency_s", 0.0))
+        return entry["response"], entry.get("usage") or {}
+
+    def record(self, key: str, response: Dict[str, Any], latency_s: float,
+               usage: Optional[Dict[str, Any]] = None, meta: Optional[Dict[str, Any]] = None) -> None:
+        entry = {
+            "fingerprint": key,
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "latency_s": round(latency_s, 3),
+            "usage": usage or {},
+            **(meta or {}),
+            "response": response,
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(entry, fh, indent=2, ensure_ascii=False)
+        os.replace(tmp, self._path(key))
+        logger.info(f"Recorded LLM response {key[:12]} ({latency_s:.2f}s)")
+
+
+_store: Optional[ReplayStore] = None
+_store_lock = threading.Lock()
+
+
+def get_replay_store() -> ReplayStore:
+    """Get or create the process-wide replay store"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ReplayStore()
+    return _store
+
+
+def set_replay_store(store: ReplayStore) -> None:
+    """Swap the process-wide store (golden suite, benchmarks)."""
+    global _store
+    with _store_lock:
+        _store = store
@@ -0,0 +1,287 @@
+"""
+resilience.py — deadlines, retries and a circuit breaker for LLM calls
+
+A provider brown-out used to turn straight into failed or hung jobs: one
+exception ended the call, and nothing bounded how long a call could take.
+
+- Deadline: the LLM budget of one parse; every call's timeout is clamped to
+  what is left, so a parse cannot outlive its budget however many calls it makes
+- retries: 408 / 409 / 429 / 5xx, connection errors and timeouts are retried
+  with full-jitter exponential backoff (Retry-After wins when it is longer),
+  but never past the deadline
+- CircuitBreaker: after N consecutive transient failures the breaker opens and
+  calls fail immediately for a cooldown; then one trial call is let through
+  (half-open) and its outcome closes or re-opens the breaker; a non-retryable
+  error (a 400, say) does neither and just frees the trial slot
+
+Outcomes are counted in metrics.py; retries are reported through an
+on_retry callback so the job status can say what is happening.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from .concurrency import AdaptiveLimiter
+from .config import (
+    LLM_BREAKER_COOLDOWN_S, LLM_BREAKER_THRESHOLD, LLM_MAX_RETRIES, LLM_RETRY_BASE_S, LLM_RETRY_MAX_S,
+)
+from .metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}  # gauge values
+
+
+class DeadlineExceeded(Exception):
+    """The parse's LLM budget ran out before or during a call."""
+
+
+class CircuitOpen(Exception):
+    """The breaker is open; the call was not attempted."""
+
+
+class Deadline:
+    """A fixed point in time with helpers to clamp per-call timeouts to it."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self._expires = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self._expires - time.monotonic())
+
+    def clamp(self, timeout: float) -> float:
+        """timeout, shortened to the time left; DeadlineExceeded if none is left."""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"LLM budget of {self.seconds:g}s exhausted")
+        return min(timeout, remaining)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Error classification
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        code = getattr(getattr(exc, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Transient provider trouble: rate limits, 5xx, timeouts, dropped connections."""
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    code = _status_code(exc)
+    if code is not None:
+        return code in RETRYABLE_STATUS
+    # openai.APIConnectionError / APITimeoutError carry no status code
+    return type(exc).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def error_reason(exc: BaseException) -> str:
+    """Short label for metrics and status messages."""
+    code = _status_code(exc)
+    if code is not None:
+        return str(code)
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError)) or type(exc).__name__ == "APITimeoutError":
+        return "timeout"
+    if isinstance(exc, ConnectionError) or type(exc).__name__ == "APIConnectionError":
+        return "connection"
+    return type(exc).__name__
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    try:
+        return float(headers.get("retry-after")) if headers else None
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = LLM_RETRY_BASE_S, cap: float = LLM_RETRY_MAX_S) -> float:
+    """Full jitter: uniform in [0, min(cap, base * 2^attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Circuit breaker
+# ──────────────────────────────────────────────────────────────────────────────
+
+class CircuitBreaker:
+    """Consecutive-failure breaker shared by every parse in the process."""
+
+    def __init__(self, name: str = "llm", threshold: int = LLM_BREAKER_THRESHOLD,
+                 cooldown: float = LLM_BREAKER_COOLDOWN_S):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == "open" and time.monotonic() - self._opened_at >= self.cooldown:
+            self._transition("half_open")
+        return self._state
+
+    def _transition(self, state: str) -> None:
+        if state != self._state:
+            logger.warning(f"Circuit breaker {self.name}: {self._state} -> {state}")
+            get_metrics().incr("llm_breaker_transitions_total", to=state)
+            self._state = state
+        get_metrics().set_gauge("llm_breaker_state", BREAKER_STATES[state])
+
+    def before_call(self) -> None:
+        """Raise CircuitOpen unless a call may go ahead now."""
+        with self._lock:
+            state = self._current_state()
+            if state == "open":
+                retry_in = self.cooldown - (time.monotonic() - self._opened_at)
+                raise CircuitOpen(f"LLM circuit open, retry in {retry_in:.0f}s")
+            if state == "half_open":
+                if self._trial_in_flight:
+                    raise CircuitOpen("LLM circuit half-open, trial call in flight")
+                self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            self._transition("closed")
+
+    def release_trial(self) -> None:
+        """A half-open trial that never reached the provider gives its slot back."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == "half_open" or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+                self._transition("open")
+
+
+_breaker: Optional[CircuitBreaker] = None
+_breaker_lock = threading.Lock()
+
+
+def get_breaker() -> CircuitBreaker:
+    """Get or create the process-wide LLM circuit breaker"""
+    global _breaker
+    if _breaker is None:
+        with _breaker_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker()
+    return _breaker
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Resilient call
+# ──────────────────────────────────────────────────────────────────────────────
+
+RetryCallback = Callable[[int, str, float], None]  # (attempt number, reason, delay seconds)
+
+
+async def call_with_retries(
+    call: Callable[[float], Awaitable[T]],
+    deadline: Deadline,
+    call_timeout: float,
+    max_retries: int = LLM_MAX_RETRIES,
+    breaker: Optional[CircuitBreaker] = None,
+    on_retry: Optional[RetryCallback] = None,
+    label: str = "llm",
+    acquire: Optional[Callable[[], Awaitable[None]]] = None,
+    concurrency: Optional[AdaptiveLimiter] = None,
+) -> T:
+    """
+    Await call(timeout) under the deadline, breaker and retry policy. The
+    timeout passed in is the per-call limit clamped to the deadline; the
+    await itself is also bounded by it, so a stalled stream cannot hang.
+    Each attempt first waits for a concurrency slot, which it holds while it
+    runs and then reports back (latency, or whether it failed from overload),
+    and then for acquire() (rate limiting), so tokens are only reserved once
+    the call can go out. Both waits count against the deadline but not
+    against the per-call timeout.
+
+    The outer wait_for only abandons the await: a sync client call running
+    in asyncio.to_thread keeps its worker thread until the client's own
+    timeout fires, so call() must pass the timeout on to the client (and a
+    streamed call should stop reading once its await is cancelled).
+    """
+    breaker = breaker or get_breaker()
+    metrics = get_metrics()
+    attempt = 0
+    while True:
+        breaker.before_call()
+        try:
+            if concurrency:
+                try:
+                    await asyncio.wait_for(concurrency.acquire(), deadline.clamp(deadline.seconds))
+                except asyncio.TimeoutError:
+                    raise DeadlineExceeded(
+                        f"LLM budget of {deadline.seconds:g}s exhausted waiting for a concurrency slot")
+            try:
+                if acquire:
+                    try:
+                        await asyncio.wait_for(acquire(), deadline.clamp(deadline.seconds))
+                    except asyncio.TimeoutError:
+                        raise DeadlineExceeded(
+                            f"LLM budget of {deadline.seconds:g}s exhausted waiting for rate limit")
+                timeout = deadline.clamp(call_timeout)
+                started = time.perf_counter()
+                result = await asyncio.wait_for(call(timeout), timeout)
+            except BaseException as e:
+                if concurrency:
+                    overload = isinstance(e, Exception) and not isinstance(e, DeadlineExceeded) and is_retryable(e)
+                    concurrency.release(label, None, "overload" if overload else "neutral")
+                raise
+            if concurrency:
+                concurrency.release(label, time.perf_counter() - started, "ok")
+        except (DeadlineExceeded, asyncio.CancelledError):
+            breaker.release_trial()  # the provider was never asked
+            raise
+        except Exception as e:
+            retryable = is_retryable(e)
+            reason = error_reason(e)
+            if retryable:
+                breaker.record_failure()
+            else:
+                breaker.release_trial()  # the provider answered a bad request; says nothing about its health
+            metrics.incr("llm_attempts_total", call=label, outcome=reason)
+            if not retryable or attempt >= max_retries:
+                raise
+            delay = max(backoff_delay(attempt), _retry_after(e) or 0.0)
+            if delay >= deadline.remaining():
+                raise DeadlineExceeded(
+                    f"LLM budget of {deadline.seconds:g}s exhausted after {attempt + 1} attempts ({reason})"
+                ) from e
+            attempt += 1
+            metrics.incr("llm_retries_total", call=label, reason=reason)
+            logger.warning(f"LLM call {label} failed ({reason}), retry {attempt}/{max_retries} in {delay:.2f}s")
+            if on_retry:
+                on_retry(attempt, reason, delay)
+            await asyncio.sleep(delay)
+            continue
+
+        breaker.record_success()
+        metrics.incr("llm_attempts_total", call=label, outcome="ok")
+        metrics.observe("llm_latency_seconds", time.perf_counter() - started, call=label)
+        return result
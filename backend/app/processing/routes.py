@@ -3,12 +3,17 @@ from sqlalchemy.orm import Session
 from sqlalchemy.sql import func
 from app.database.db import get_db, get_session_local
 from app.database.models import File, Summary, Assignment, Exam, Lectures
+from .hedging import get_hedger
+from .ledger import ParseRunRecorder, parse_run_stats
+from .metrics import get_metrics
 from .parser import Parser
-from typing import List, Dict, Any
+from .resilience import get_breaker
+from typing import List, Dict, Any, Optional
 from datetime import time, date
 import asyncio
 import json
 import os
+import threading
 import uuid
 
 import logging
@@ -16,20 +21,42 @@ import logging
 router = APIRouter(prefix="/processing", tags=["processing"])
 
 _parsing_status = {}
+# Jobs run in BackgroundTasks threads and publish partial fields from their own event loops
+_status_lock = threading.Lock()
+_TERMINAL_STATUSES = ("completed", "failed", "rejected", "cancelled")
 
 def _status_key(file_id: str) -> str:
     return f"parse_status:{file_id}"
 
 def _get_status(file_id: str) -> dict:
-    """Get parsing status from memory"""
-    return _parsing_status.get(_status_key(file_id), {})
-
-def _set_status(file_id: str, status: str, message: str):
-    """Set parsing status in memory"""
-    _parsing_status[_status_key(file_id)] = {
+    """Get a snapshot of the parsing status from memory"""
+    with _status_lock:
+        entry = dict(_parsing_status.get(_status_key(file_id), {}))
+        if "partial" in entry:
+            entry["partial"] = dict(entry["partial"])
+    return entry
+
+def _set_status(file_id: str, status: str, message: str, **extra):
+    """Set parsing status in memory (early LLM fields carry over until the job is re-queued)"""
+    key = _status_key(file_id)
+    entry = {
         "status": status,
-        "message": message
+        "message": message,
+        **extra
     }
+    if status in _TERMINAL_STATUSES:
+        get_metrics().incr("parse_jobs_total", status=status)
+    with _status_lock:
+        partial = _parsing_status.get(key, {}).get("partial")
+        if partial and status != "queued":
+            entry["partial"] = partial
+        _parsing_status[key] = entry
+
+def _set_partial(file_id: str, field: str, value: Any):
+    """Publish one completed top-level LLM field under the status's "partial" dict"""
+    with _status_lock:
+        entry = _parsing_status.setdefault(_status_key(file_id), {})
+        entry.setdefault("partial", {})[field] = value
 
 async def _start_parsing(file_id: str, background_tasks: BackgroundTasks, db: Session) -> bool:
     """Core parsing logic"""
@@ -60,13 +87,119 @@ async def parse_syllabus(file_id: str, background_tasks: BackgroundTasks, db: Se
     
     return {"status": "processing", "file_id": file_id}
 
+def _store_parsed(db: Session, file_uuid: uuid.UUID, parsed_data: dict) -> None:
+    """Replace a file's summary, lectures, assignments and exams with parsed data (caller commits)."""
+    # Summary
+    ai_summary = parsed_data.get("summary")
+    if ai_summary:
+        grading_breakdown = parsed_data.get("grading")
+        
+        existing_summary = db.query(Summary).filter(Summary.file_id == file_uuid).first()
+        if existing_summary:
+            existing_summary.summary = ai_summary
+            existing_summary.grading_breakdown = grading_breakdown
+            existing_summary.updated_at = func.now()
+        else:
+            db.add(Summary(
+                file_id=file_uuid, 
+                summary=ai_summary, 
+                grading_breakdown=grading_breakdown,
+            ))
+
+    # Lectures
+    if parsed_data.get("lectures"):
+        db.query(Lectures).filter(Lectures.file_id == file_uuid).delete()
+        for lecture_data in parsed_data["lectures"]:
+            try:
+                day = lecture_data.get("day")
+                if isinstance(day, str):
+                    day_map = {"monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4, "saturday": 5, "sunday": 6}
+                    day = day_map.get(day.lower(), 0)
+                start_time = _parse_time(lecture_data.get("start_time", "09:00"))
+                end_time = _parse_time(lecture_data.get("end_time", "10:30"))
+                start_date = _parse_date(lecture_data.get("start_date", "2024-01-15"))
+                end_date = _parse_date(lecture_data.get("end_date", "2024-05-15"))
+                db.add(Lectures(
+                    file_id=file_uuid,
+                    day=day,
+                    start_time=start_time,
+                    end_time=end_time,
+                    start_date=start_date,
+                    end_date=end_date,
+                    location=lecture_data.get("location", ""),
+                    type=lecture_data.get("type", "lecture")
+                ))
+            except Exception:
+                continue
+
+    # Assignments
+    if parsed_data.get("assignments"):
+        db.query(Assignment).filter(Assignment.file_id == file_uuid).delete()
+        for assignment_data in parsed_data["assignments"]:
+            try:
+                date = _parse_date(assignment_data.get("date", "2024-01-15"))
+                time_due = None
+                if assignment_data.get("time_due"):
+                    time_due = _parse_time(assignment_data.get("time_due"))
+                
+                db.add(Assignment(
+                    file_id=file_uuid,
+                    date=date,
+                    time_due=time_due,
+                    description=assignment_data.get("description", ""),
+                    confidence=assignment_data.get("confidence", 0)
+                ))
+            except Exception:
+                continue
+
+    # Exams
+    if parsed_data.get("exams"):
+        db.query(Exam).filter(Exam.file_id == file_uuid).delete()
+        for exam_data in parsed_data["exams"]:
+            try:
+                date = _parse_date(exam_data.get("date", "2024-01-15"))
+                # Parse time if provided
+                time_due = None
+                if exam_data.get("time_due"):
+                    time_due = _parse_time(exam_data.get("time_due"))
+                
+                db.add(Exam(
+                    file_id=file_uuid,
+                    date=date,
+                    time_due=time_due,
+                    description=exam_data.get("description", ""),
+                    confidence=exam_data.get("confidence", 0)
+                ))
+            except Exception:
+                continue
+
+def _mark_stage(file: File, stage: str) -> None:
+    """Record which pipeline stage the stored rows come from (caller commits)."""
+    file.parse_stage = stage
+    file.parse_version = (file.parse_version or 0) + 1
+
+def _discard_provisional(db: Session, file_uuid: uuid.UUID) -> None:
+    """A job that failed after storing provisional rows: drop them and mark the file failed."""
+    try:
+        db.rollback()
+        file = db.query(File).filter(File.id == file_uuid).first()
+        if not file:
+            return
+        for model in (Assignment, Exam, Lectures, Summary):
+            db.query(model).filter(model.file_id == file_uuid).delete()
+        _mark_stage(file, "failed")
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logging.getLogger(__name__).error(f"Could not clear provisional results for file {file_uuid}: {e}")
+
 def _run_parse_and_store(file_id: str) -> None:
     """Parses file, stores to DB, and updates status."""
     logger = logging.getLogger(__name__)
     logger.info(f"Starting parse and store for file {file_id}")
     
-    def set_status(status: str, message: str):
-        _set_status(file_id, status, message)
+    def set_status(status: str, message: str, **extra):
+        _set_status(file_id, status, message, **extra)
     
     def check_cancelled() -> bool:
         """Check if parsing has been cancelled or file has been deleted."""
@@ -86,10 +219,15 @@ def _run_parse_and_store(file_id: str) -> None:
         set_status("started", "Starting parse")
     SessionLocal = get_session_local()
     db = SessionLocal()
+    # One parse_runs row per job, whatever its outcome
+    run = ParseRunRecorder(file_id)
+    result: Optional[dict] = None
+    provisional_stored = False
     try:
         # Check for cancellation before starting
         if check_cancelled():
             logger.info(f"Parsing cancelled for file {file_id}")
+            run.record("cancelled")
             return
             
         file_uuid = uuid.UUID(file_id)
@@ -97,6 +235,7 @@ def _run_parse_and_store(file_id: str) -> None:
         if not file:
             logger.error(f"File {file_id} not found in database")
             set_status("failed", "File not found")
+            run.record("failed", error_class="FileNotFound")
             return
 
         logger.info(f"Processing file {file_id}: {file.filename}")
@@ -106,116 +245,81 @@ def _run_parse_and_store(file_id: str) -> None:
         # Check for cancellation before AI processing
         if check_cancelled():
             logger.info(f"Parsing cancelled for file {file_id} before AI processing")
+            run.record("cancelled")
             return
             
-        result = asyncio.run(parser.parse_syllabus(file.file_path))
+        def store_provisional(parsed: dict) -> None:
+            """Phase 1: regex / table results, visible while the LLM runs."""
+            nonlocal provisional_stored
+            if check_cancelled():
+                return
+            try:
+                _store_parsed(db, file_uuid, parsed)
+                _mark_stage(file, "provisional")
+                db.commit()
+                provisional_stored = True
+            except Exception:
+                db.rollback()
+                raise
+            set_status("provisional", "Preliminary results available, refining with AI")
+
+        result = asyncio.run(parser.parse_syllabus(
+            file.file_path,
+            on_field=lambda field, value: _set_partial(file_id, field, value),
+            on_provisional=store_provisional,
+            on_retry=lambda attempt, reason, delay: set_status(
+                "retrying", f"AI call failed ({reason}), retry {attempt} in {delay:.1f}s"
+            ),
+        ))
+        if result.get("rejected"):
+            logger.warning(f"Extraction rejected for file {file_id} ({result['rejected']}): {result.get('error')}")
+            set_status("rejected", f"File rejected: {result.get('error')}")
+            run.record("rejected", result)
+            return
         if not result.get("success"):
             logger.error(f"Parsing failed for file {file_id}: {result.get('error', 'Unknown error')}")
+            if provisional_stored:
+                _discard_provisional(db, file_uuid)
             set_status("failed", f"Parsing failed: {result.get('error', 'Unknown error')}")
+            run.record("failed", result)
             return
         parsed_data = result.get("parsed", {})
         logger.info(f"Parsing completed for file {file_id}, extracted data: {list(parsed_data.keys())}")
+        logger.info(f"Parse timings for file {file_id} (tier={result.get('tier')}): {result.get('timings')}")
 
         # Check for cancellation before saving
         if check_cancelled():
             logger.info(f"Parsing cancelled for file {file_id} before saving")
+            run.record("cancelled", result)
             return
             
         set_status("saving", "Saving parsed data")
 
-        # Summary
-        ai_summary = parsed_data.get("summary")
-        if ai_summary:
-            grading_breakdown = parsed_data.get("grading")
-            
-            existing_summary = db.query(Summary).filter(Summary.file_id == file_uuid).first()
-            if existing_summary:
-                existing_summary.summary = ai_summary
-                existing_summary.grading_breakdown = grading_breakdown
-                existing_summary.updated_at = func.now()
-            else:
-                db.add(Summary(
-                    file_id=file_uuid, 
-                    summary=ai_summary, 
-                    grading_breakdown=grading_breakdown,
-                ))
-
-        # Lectures
-        if parsed_data.get("lectures"):
-            db.query(Lectures).filter(Lectures.file_id == file_uuid).delete()
-            for lecture_data in parsed_data["lectures"]:
-                try:
-                    day = lecture_data.get("day")
-                    if isinstance(day, str):
-                        day_map = {"monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4, "saturday": 5, "sunday": 6}
-                        day = day_map.get(day.lower(), 0)
-                    start_time = _parse_time(lecture_data.get("start_time", "09:00"))
-                    end_time = _parse_time(lecture_data.get("end_time", "10:30"))
-                    start_date = _parse_date(lecture_data.get("start_date", "2024-01-15"))
-                    end_date = _parse_date(lecture_data.get("end_date", "2024-05-15"))
-                    db.add(Lectures(
-                        file_id=file_uuid,
-                        day=day,
-                        start_time=start_time,
-                        end_time=end_time,
-                        start_date=start_date,
-                        end_date=end_date,
-                        location=lecture_data.get("location", ""),
-                        type=lecture_data.get("type", "lecture")
-                    ))
-                except Exception:
-                    continue
-
-        # Assignments
-        if parsed_data.get("assignments"):
-            db.query(Assignment).filter(Assignment.file_id == file_uuid).delete()
-            for assignment_data in parsed_data["assignments"]:
-                try:
-                    date = _parse_date(assignment_data.get("date", "2024-01-15"))
-                    time_due = None
-                    if assignment_data.get("time_due"):
-                        time_due = _parse_time(assignment_data.get("time_due"))
-                    
-                    db.add(Assignment(
-                        file_id=file_uuid,
-                        date=date,
-                        time_due=time_due,
-                        description=assignment_data.get("description", ""),
-                        confidence=assignment_data.get("confidence", 0)
-                    ))
-                except Exception:
-                    continue
-
-        # Exams
-        if parsed_data.get("exams"):
-            db.query(Exam).filter(Exam.file_id == file_uuid).delete()
-            for exam_data in parsed_data["exams"]:
-                try:
-                    date = _parse_date(exam_data.get("date", "2024-01-15"))
-                    # Parse time if provided
-                    time_due = None
-                    if exam_data.get("time_due"):
-                        time_due = _parse_time(exam_data.get("time_due"))
-                    
-                    db.add(Exam(
-                        file_id=file_uuid,
-                        date=date,
-                        time_due=time_due,
-                        description=exam_data.get("description", ""),
-                        confidence=exam_data.get("confidence", 0)
-                    ))
-                except Exception:
-                    continue
-
+        # Phase 2: the LLM-merged result, or the regex-only one if the LLM failed
+        degraded = result.get("degraded")
+        _store_parsed(db, file_uuid, parsed_data)
+        _mark_stage(file, "regex_only" if degraded else "final")
         db.commit()
 
-        set_status("completed", "Parsing completed")
+        llm = {**result.get("llm", {}), "breaker": get_breaker().state}
+        if degraded:
+            logger.warning(f"LLM unavailable for file {file_id}, stored regex-only results: {degraded}")
+            get_metrics().incr("parse_jobs_total", status="degraded")
+            set_status("completed", "Parsing completed (AI unavailable, showing pattern-matched results only)",
+                       degraded=degraded, llm=llm)
+            run.record("degraded", result)
+        else:
+            set_status("completed", "Parsing completed", llm=llm)
+            run.record("completed", result)
     except Exception as e:
         try:
             db.rollback()
         except Exception:
             pass
+        if provisional_stored:
+            _discard_provisional(db, file_uuid)
         set_status("failed", f"Error: {str(e)}")
+        run.record("failed", result, error_class=type(e).__name__)
     finally:
         try:
             db.close()
@@ -230,12 +334,26 @@ async def get_parsing_status(file_id: str):
         return {"status": "unknown", "message": "No status found"}
     return data
 
+@router.get("/metrics")
+async def get_processing_metrics():
+    """LLM call / retry / breaker / hedge counters and latency percentiles for this process."""
+    hedger = get_hedger()
+    return {**get_metrics().snapshot(), "breaker": get_breaker().state,
+            "hedging": hedger.stats() if hedger else None}
+
+@router.get("/runs/stats")
+async def get_parse_run_stats(days: int = 30, db: Session = Depends(get_db)):
+    """Parse runs per day and model from the parse_runs ledger: outcomes, p50/p95 latency and tokens, cost."""
+    if days < 1 or days > 366:
+        raise HTTPException(status_code=400, detail="days must be between 1 and 366")
+    return {"days": days, "stats": parse_run_stats(db, days)}
+
 @router.post("/parse/{file_id}/cancel")
 async def cancel_parsing(file_id: str, db: Session = Depends(get_db)):
     """Cancel parsing for a file by setting status to cancelled and delete the file."""
     status_data = _get_status(file_id)
     current_status = status_data.get("status")
-    if not current_status or current_status in ["completed", "failed", "cancelled"]:
+    if not current_status or current_status in _TERMINAL_STATUSES:
         return {"status": "error", "message": "Cannot cancel: parsing not in progress"}
     
     _set_status(file_id, "cancelled", "Parsing cancelled by user")
@@ -558,6 +676,8 @@ async def get_all_syllabus_data(file_id: str, db: Session = Depends(get_db)):
         payload = {
             "file_id": file_id,
             "filename": getattr(file, 'filename', ''),
+            "parse_stage": file.parse_stage,
+            "parse_version": file.parse_version,
             "summary": summary_payload,
             "exams": exams_payload,
             "assignments": assignments_payload,
@@ -0,0 +1,109 @@
+"""
+routing.py — per-document choice of LLM model and completion budget
+
+One model with one completion cap for everything overpays on a one-page lab
+handout and can truncate the output for a 90-page course pack. The parser
+routes each document by what is known before the first LLM call:
+
+- prompt_tokens: estimated tokens of the prompt text (after boilerplate and
+  handled tables are removed)
+- items: dates / lectures / deliverables the regex and table scanners found,
+  a proxy for how long the structured output will be
+- chunks: number of prompt chunks (each is its own call)
+
+The routing table is an ordered list of rules; the first rule whose limits
+all hold wins. LLM_ROUTING_TABLE overrides the default, as JSON or a path to
+a JSON file:
+
+    [{"name": "small", "max_prompt_tokens": 3000, "max_items": 20,
+      "model": "gpt-5-nano", "max_tokens": 3000},
+     {"name": "default", "model": "gpt-5-mini", "max_tokens": 8000}]
+
+A rule without limits matches everything; a table without one gets the
+"default" route (DEFAULT_MODEL, MAX_TOKENS) appended. The chosen route is
+returned with the parse result and counted in llm_route_total, so latency and
+token usage can be compared per route.
+
+The items proxy can undershoot, so a call cut off at its route's completion
+cap (LengthFinishReasonError) is retried once on the next rule with a larger
+cap (escalate_route), counted in llm_route_escalations_total.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from .config import DEFAULT_MODEL, LLM_ROUTING_TABLE, MAX_TOKENS
+
+logger = logging.getLogger(__name__)
+
+LIMIT_KEYS = ("max_prompt_tokens", "max_items", "max_chunks")
+
+# The standard route keeps the model and cap every document used before routing
+DEFAULT_ROUTES: List[Dict[str, Any]] = [
+    {"name": "small", "max_prompt_tokens": 4000, "max_items": 30, "max_chunks": 1,
+     "model": DEFAULT_MODEL, "max_tokens": 4000},
+    {"name": "standard", "max_prompt_tokens": 12000, "max_items": 120, "max_chunks": 1,
+     "model": DEFAULT_MODEL, "max_tokens": MAX_TOKENS},
+    {"name": "large", "model": DEFAULT_MODEL, "max_tokens": 10000},
+]
+
+
+def load_routing_table(spec: Optional[str]) -> List[Dict[str, Any]]:
+    """Parse and check a routing table (JSON text or file path); None gives the default."""
+    if not spec:
+        return [dict(rule) for rule in DEFAULT_ROUTES]
+    if os.path.isfile(spec):
+        with open(spec, encoding="utf-8") as fh:
+            spec = fh.read()
+    table = json.loads(spec)
+    if not isinstance(table, list) or not table:
+        raise ValueError("LLM_ROUTING_TABLE must be a non-empty JSON list of rules")
+    for i, rule in enumerate(table):
+        if not isinstance(rule, dict) or not rule.get("model") or not isinstance(rule.get("max_tokens"), int):
+            raise ValueError(f"Routing rule {i} needs a model and an integer max_tokens: {rule!r}")
+        unknown = set(rule) - set(LIMIT_KEYS) - {"name", "model", "max_tokens"}
+        if unknown:
+            raise ValueError(f"Routing rule {i} has unknown keys {sorted(unknown)}")
+        rule.setdefault("name", f"rule{i}")
+    if any(k in table[-1] for k in LIMIT_KEYS):
+        table.append({"name": "default", "model": DEFAULT_MODEL, "max_tokens": MAX_TOKENS})
+    return table
+
+
+def choose_route(table: List[Dict[str, Any]], prompt_tokens: int, items: int, chunks: int) -> Dict[str, Any]:
+    """First rule whose limits all hold, with the inputs it was chosen on."""
+    measured = {"max_prompt_tokens": prompt_tokens, "max_items": items, "max_chunks": chunks}
+    for rule in table:
+        if all(measured[k] <= rule[k] for k in LIMIT_KEYS if k in rule):
+            break
+    return {"route": rule["name"], "model": rule["model"], "max_tokens": rule["max_tokens"],
+            "prompt_tokens": prompt_tokens, "items": items, "chunks": chunks}
+
+
+def escalate_route(table: List[Dict[str, Any]], route: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """route moved to the next rule with a larger completion cap; None past the end or for ad-hoc routes."""
+    names = [rule["name"] for rule in table]
+    if route["route"] not in names:
+        return None
+    for rule in table[names.index(route["route"]) + 1:]:
+        if rule["max_tokens"] > route["max_tokens"]:
+            return {**route, "route": rule["name"], "model": rule["model"], "max_tokens": rule["max_tokens"],
+                    "escalated_from": route["route"]}
+    return None
+
+
+_table: Optional[List[Dict[str, Any]]] = None
+_table_lock = threading.Lock()
+
+
+def get_routing_table() -> List[Dict[str, Any]]:
+    """Get or load the process-wide routing table"""
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = load_routing_table(LLM_ROUTING_TABLE)
+    return _table
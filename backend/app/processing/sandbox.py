@@ -0,0 +1,215 @@
+"""
+sandbox.py — resource-bounded PDF extraction
+
+A malformed or huge upload can pin a worker for minutes inside fitz.open() or
+find_tables(). Extraction therefore runs in a short-lived child process with
+hard limits, and cheap byte-level checks reject obvious junk before the child
+is even started.
+
+- Pre-check (in process): size cap, empty file, %PDF- magic in the first 1 KiB
+- Child: address-space limit, encrypted / page-count checks right after open
+- Per-page budget: a page whose table pass overruns is re-read as plain text
+- Per-document budget: the parent kills the child and reports a timeout
+
+Every violation raises ExtractionRejected with a short reason code, which the
+job runner reports as a "rejected" status instead of a generic failure.
+"""
+
+import logging
+import multiprocessing
+import re
+import resource
+import signal
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator
+
+from .config import (
+    EXTRACT_ISOLATION, EXTRACT_MEMORY_MB, EXTRACT_PAGE_TIMEOUT_S, EXTRACT_TIMEOUT_S,
+    MAX_PDF_BYTES, MAX_PDF_PAGES,
+)
+
+logger = logging.getLogger(__name__)
+
+WORKER_PRELOAD = ["app.processing.parser"]
+PDF_MAGIC = b"%PDF-"
+MAGIC_WINDOW = 1024  # the header may follow junk bytes, but only within the first KiB
+_OOM_RE = re.compile(r"out of memory|malloc.*failed", re.IGNORECASE)
+
+
+class ExtractionRejected(Exception):
+    """A document was refused or aborted by the extraction guards."""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class PageBudgetExceeded(Exception):
+    """Raised inside a page guard when one page overruns its time budget."""
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Guards
+# ──────────────────────────────────────────────────────────────────────────────
+
+def precheck(content: bytes, max_bytes: int = MAX_PDF_BYTES) -> None:
+    """Byte-level checks that need no PDF parsing."""
+    if not content:
+        raise ExtractionRejected("empty", "File is empty")
+    if len(content) > max_bytes:
+        raise ExtractionRejected(
+            "too_large", f"File is {len(content) / 1e6:.1f} MB (limit {max_bytes / 1e6:.0f} MB)"
+        )
+    if PDF_MAGIC not in content[:MAGIC_WINDOW]:
+        raise ExtractionRejected("not_pdf", "File is not a PDF")
+
+
+def check_document(doc, max_pages: int = MAX_PDF_PAGES) -> None:
+    """Checks on an opened document, before any page is rendered."""
+    if doc.needs_pass:
+        raise ExtractionRejected("encrypted", "PDF is password protected")
+    if not doc.is_pdf:
+        raise ExtractionRejected("not_pdf", "File is not a PDF")
+    if doc.page_count > max_pages:
+        raise ExtractionRejected("too_many_pages", f"PDF has {doc.page_count} pages (limit {max_pages})")
+
+
+@contextmanager
+def page_budget(seconds: float) -> Iterator[None]:
+    """
+    Raise PageBudgetExceeded if the body runs longer than seconds. Uses
+    SIGALRM, so it only arms in the main thread (the sandbox child); elsewhere
+    it is a no-op and the per-document budget is the only bound.
+    """
+    if seconds <= 0 or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    expired = []
+
+    def _expired(signum, frame):
+        expired.append(True)
+        raise PageBudgetExceeded(f"page exceeded {seconds:g}s")
+
+    previous = signal.signal(signal.SIGALRM, _expired)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    except PageBudgetExceeded:
+        raise
+    except Exception as e:
+        # Raised from inside a MuPDF callback, the alarm surfaces as SystemError
+        if expired:
+            raise PageBudgetExceeded(f"page exceeded {seconds:g}s") from e
+        raise
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Extraction
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _extract_bytes(content: bytes, tier: str, page_timeout: float) -> Dict[str, Any]:
+    import fitz  # PyMuPDF
+    from .parser import _extract_document
+
+    try:
+        doc = fitz.open(stream=content, filetype="pdf")
+    except Exception as e:
+        raise ExtractionRejected("unreadable", f"PDF could not be opened: {e}")
+    try:
+        check_document(doc)
+        guard = (lambda: page_budget(page_timeout)) if page_timeout > 0 else nullcontext
+        return _extract_document(doc, tier, page_guard=guard)
+    finally:
+        doc.close()
+
+
+def _worker(conn, content: bytes, tier: str, page_timeout: float, memory_mb: int) -> None:
+    """Child process entry point: apply limits, extract, send one message back."""
+    if memory_mb > 0:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    try:
+        conn.send(("ok", _extract_bytes(content, tier, page_timeout)))
+    except ExtractionRejected as e:
+        conn.send(("rejected", (e.reason, str(e))))
+    except MemoryError:
+        conn.send(("rejected", ("memory_limit", f"Extraction exceeded {memory_mb} MB")))
+    except Exception as e:
+        if _OOM_RE.search(str(e)):  # MuPDF allocation failures surface as RuntimeError
+            conn.send(("rejected", ("memory_limit", f"Extraction exceeded {memory_mb} MB")))
+        else:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+_context = None
+_context_lock = threading.Lock()
+
+
+def _worker_context():
+    """
+    Forkserver context with the parser preloaded: children fork from a
+    single-threaded server that already imported fitz, so each document costs
+    a fork rather than a fresh interpreter.
+    """
+    global _context
+    if _context is None:
+        with _context_lock:
+            if _context is None:
+                ctx = multiprocessing.get_context("forkserver")
+                ctx.set_forkserver_preload(WORKER_PRELOAD)
+                _context = ctx
+    return _context
+
+
+def extract_pdf(
+    content: bytes,
+    tier: str,
+    timeout: float = EXTRACT_TIMEOUT_S,
+    page_timeout: float = EXTRACT_PAGE_TIMEOUT_S,
+    memory_mb: int = EXTRACT_MEMORY_MB,
+    isolation: str = EXTRACT_ISOLATION,
+) -> Dict[str, Any]:
+    """
+    Extract PDF bytes under the configured guards. Returns the
+    _extract_document result or raises ExtractionRejected.
+    """
+    precheck(content)
+    if isolation == "inline":
+        return _extract_bytes(content, tier, page_timeout)
+
+    ctx = _worker_context()
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    proc = ctx.Process(
+        target=_worker, args=(child_conn, content, tier, page_timeout, memory_mb), daemon=True
+    )
+    started = time.perf_counter()
+    proc.start()
+    child_conn.close()
+    try:
+        # Receive before join: a large result would otherwise block the child on the pipe
+        if not parent_conn.poll(timeout):
+            raise ExtractionRejected("timeout", f"Extraction exceeded {timeout:g}s")
+        status, payload = parent_conn.recv()
+    except EOFError:
+        proc.join(1)
+        raise ExtractionRejected("crashed", f"Extraction worker died (exit code {proc.exitcode})")
+    finally:
+        if proc.is_alive():
+            proc.kill()
+        proc.join()
+        parent_conn.close()
+
+    logger.info(f"Sandboxed extraction {status} in {time.perf_counter() - started:.2f}s")
+    if status == "rejected":
+        raise ExtractionRejected(*payload)
+    if status == "error":
+        raise RuntimeError(payload)
+    return payload
@@ -0,0 +1,148 @@
+"""
+scanners.py — linear-time matchers for lecture and due-date lines
+
+The lecture pattern ("MWF, 9:05-9:55a, or 10:10-11:00a") and the
+"#N (Due M/D)" assignment pattern used to be single regexes whose day / prefix
+parts could match the empty string. re.finditer then started a match attempt
+at every whitespace position and re-scanned the rest of the run each time,
+which is quadratic on the long space / comma runs PDF extraction produces.
+
+These scanners find literal anchors first (time ranges, the word "due") in one
+pass, then read the surrounding fields:
+
+- backwards: separator runs are skipped once; the day expression is matched
+  inside a fixed-size window that ends where the separators begin
+- forwards: fixed sub-patterns anchored with .match() at a known position
+
+Each run of whitespace, separators or digits is touched by at most the two
+anchors around it, so total cost is linear in the input. Results reproduce the
+old regexes (including their non-overlapping finditer semantics);
+`scripts/bench_parser.py redos` checks both properties.
+"""
+
+import re
+from typing import Callable, List, Optional, Tuple
+
+DAY_WINDOW = 80  # longest day expression ("Mondays, Wednesdays, Fridays") with room to spare
+
+_DIGIT_RUN_RE = re.compile(r"[\d:]+")
+_TIME_RANGE_RE = re.compile(r"[\d:]+\s*[-–]\s*[\d:]+\s*[aApP]\.?[mM]?\.?")
+_OR_RE = re.compile(r"\s*(?:,\s*)?or\s*", re.IGNORECASE)
+_WORD_CHAR_RE = re.compile(r"\w")
+
+# Same alternatives as the old lecture pattern; the Mon/Wed/Fri branch must be
+# non-empty here because an empty day is handled by the caller
+_DAY_TAIL_RE = re.compile(
+    r"(?:MWF|MW|TTh|Tu/?Th|"
+    r"(?=Mon|Wed|Fri)(?:Mon(?:day)?s?(?:\s*[,&/]\s*)?)?(?:Wed(?:nesday)?s?(?:\s*[,&/]\s*)?)?(?:Fri(?:day)?s?)?"
+    r"|Tuesdays?\s*(?:[&and]+\s*Thursdays?)?)\Z",
+    re.IGNORECASE,
+)
+
+_DUE_RE = re.compile(r"[Dd]ue")
+_DUE_DATE_RE = re.compile(r"\s+(\d{1,2})/(\d{1,2})\)?")
+_DUE_PREFIXES = ("PS", "HW", "Assignment")
+
+
+def _is_word_char(text: str, i: int) -> bool:
+    return 0 <= i < len(text) and _WORD_CHAR_RE.match(text, i) is not None
+
+
+def _is_sep(c: str) -> bool:
+    return c == "," or c.isspace()
+
+
+def _skip_back(text: str, i: int, pred: Callable[[str], bool]) -> int:
+    """Start of the run of chars satisfying pred that ends just before i."""
+    while i > 0 and pred(text[i - 1]):
+        i -= 1
+    return i
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Lectures
+# ──────────────────────────────────────────────────────────────────────────────
+
+def scan_lecture_lines(text: str) -> List[Tuple[str, str, Optional[str]]]:
+    """
+    (day string, time range, alternative time range or None) for every
+    "<days>[, ]<time range>[, or <time range>]" occurrence. Day strings are
+    "" where a time range follows a separator but no day expression.
+    """
+    found: List[Tuple[str, str, Optional[str]]] = []
+    consumed = 0
+    for run in _DIGIT_RUN_RE.finditer(text):
+        start = run.start()
+        if start < consumed or start == 0 or not _is_sep(text[start - 1]):
+            continue
+        time1 = _TIME_RANGE_RE.match(text, start)
+        if not time1:
+            continue
+
+        day_end = _skip_back(text, start, _is_sep)
+        day_from = max(consumed, day_end - DAY_WINDOW)
+        day = _DAY_TAIL_RE.search(text, day_from, day_end) if day_end > day_from else None
+
+        end = time1.end()
+        time2 = None
+        alt = _OR_RE.match(text, end)
+        if alt:
+            m2 = _TIME_RANGE_RE.match(text, alt.end())
+            if m2:
+                time2 = m2.group(0)
+                end = m2.end()
+
+        found.append((day.group(0) if day else "", time1.group(0), time2))
+        consumed = end
+    return found
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# "#N (Due M/D)" assignments
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _due_prefix(text: str, end: int, floor: int) -> Optional[str]:
+    """PS / HW / Assignment / Problem Set ending at `end`, starting on a word boundary."""
+    for prefix in _DUE_PREFIXES:
+        start = end - len(prefix)
+        if start >= floor and text.startswith(prefix, start) and not _is_word_char(text, start - 1):
+            return prefix
+    if text.startswith("Set", end - 3):
+        gap = _skip_back(text, end - 3, str.isspace)
+        start = gap - len("Problem")
+        if (gap < end - 3 and start >= floor and text.startswith("Problem", start)
+                and not _is_word_char(text, start - 1)):
+            return text[start:end]
+    return None
+
+
+def scan_numbered_due(text: str) -> List[Tuple[str, str, str, str]]:
+    """
+    (prefix, number, month, day) for every "[PS|HW|Problem Set|Assignment] #N
+    (Due M/D)" occurrence; prefix is "" when absent.
+    """
+    found: List[Tuple[str, str, str, str]] = []
+    consumed = 0
+    for due in _DUE_RE.finditer(text):
+        date = _DUE_DATE_RE.match(text, due.end())
+        if not date:
+            continue
+
+        # Walk back over "\s*\(?\s*" to the item number
+        i = _skip_back(text, due.start(), str.isspace)
+        if i > 0 and text[i - 1] == "(":
+            i = _skip_back(text, i - 1, str.isspace)
+        num_start = _skip_back(text, i, str.isdecimal)
+        if not 1 <= i - num_start <= 2 or num_start < consumed:
+            continue
+
+        hash_start = num_start - 1 if num_start > 0 and text[num_start - 1] == "#" else num_start
+        prefix = _due_prefix(text, _skip_back(text, hash_start, str.isspace), consumed)
+        if prefix is None:
+            if _is_word_char(text, num_start - 1):
+                continue
+            prefix = ""
+
+        found.append((prefix, text[num_start:i], date.group(1), date.group(2)))
+        consumed = date.end()
+    return found
@@ -0,0 +1,206 @@
+"""
+semester.py — week-number and relative-date resolution
+
+Schedules say "Week 5 – Tue: Quiz 2", "Thursday of week 9" or "Lecture 12"
+instead of a calendar date. SemesterCalendar anchors those references on the
+detected semester start (week 1 is the Monday–Sunday week containing it) and
+precomputes a lookup table per semester, so resolution is a dict hit.
+
+- (week, weekday) → date for every week of the term
+- "Lecture N" / "Class N" → Nth meeting date, when meeting days are known
+- Breaks: find_breaks() reads "Spring Break: March 16-20" style dates.
+  Meetings inside a break are not counted. A break covering most of a week
+  (3+ weekdays) is left out of the week numbering, so "Week 9" is the week
+  after it, unless the schedule numbers the break week itself ("Week 8:
+  Spring Break"). Breaks named without a date are not detected, so then
+  later week numbers may be one week early.
+"""
+
+import re
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_TERM_WEEKS = 16
+MAX_TERM_WEEKS = 20
+
+_WEEKDAYS = {"mon": 0, "tue": 1, "wed": 2, "thu": 3, "fri": 4, "sat": 5, "sun": 6}
+# Day names and their usual abbreviations only ("Monitoring" and "Sunk" are not days)
+_DAY = (r"\b(Mon(?:day)?|Tue(?:s(?:day)?)?|Tu|Wed(?:nesday)?|Thu(?:rs?(?:day)?)?|Th|Fri(?:day)?|"
+        r"Sat(?:urday)?|Sun(?:day)?)\b\.?")
+_DAY_ABBREVIATIONS = {"tu": 1, "th": 3}
+
+_DAY_OF_WEEK_RE = re.compile(_DAY + r"\s*(?:,\s*|\s+of\s+|\s+)?(?:week|wk)\s*#?\s*(\d{1,2})\b", re.IGNORECASE)
+_WEEK_DAY_RE = re.compile(r"\b(?:week|wk)\s*#?\s*(\d{1,2})\s*[-–—,:(]?\s*" + _DAY, re.IGNORECASE)
+_LECTURE_N_RE = re.compile(r"\b(?:Lecture|Class|Session|Meeting)\s*#?\s*(\d{1,3})\b", re.IGNORECASE)
+
+_MONTHS = {m: i for i, m in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), 1)}
+_MONTH = r"(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?"
+_BREAK_RE = re.compile(r"\b(?:spring|fall|autumn|winter|thanksgiving|mid-?term|reading|february|october)\s+"
+                       r"(?:break|recess|vacation)\b", re.IGNORECASE)
+_BREAK_RANGE_RES = (
+    # March 16-20, Mar 30 - Apr 3
+    re.compile(_MONTH + r"\s+(\d{1,2})(?:\s*(?:-|–|—|to|through)\s*(?:" + _MONTH + r"\s+)?(\d{1,2}))?",
+               re.IGNORECASE),
+    # 3/16-3/20, 3/16 - 20
+    re.compile(r"\b(\d{1,2})/(\d{1,2})(?:\s*(?:-|–|—|to|through)\s*(?:(\d{1,2})/)?(\d{1,2}))?\b"),
+)
+_NUMBERED_BREAK_RE = re.compile(r"\b(?:week|wk)\s*#?\s*\d{1,2}\b[^\n]{0,40}?\b(?:break|recess)\b",
+                                re.IGNORECASE)
+BREAK_WINDOW = 60      # characters after a break name searched for its dates
+FULL_WEEK_WEEKDAYS = 3  # weekdays of break that take a week out of the numbering
+
+
+def _parse_iso(value: Optional[str]) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _weekday(name: str) -> int:
+    name = name.lower().rstrip(".")
+    return _DAY_ABBREVIATIONS.get(name, _WEEKDAYS.get(name[:3], 0))
+
+
+def _break_date(month: int, day: int, start: date) -> Optional[date]:
+    try:
+        d = date(start.year, month, day)
+    except ValueError:
+        return None
+    if d < start - timedelta(days=14):  # fall term running into January
+        d = d.replace(year=d.year + 1)
+    return d
+
+
+def find_breaks(text: str, start_date: Optional[str]) -> Tuple[Tuple[str, str], ...]:
+    """
+    (first, last) ISO dates of each dated break named in text, e.g.
+    "Spring Break: March 16-20". A single date is a one-day break.
+    """
+    start = _parse_iso(start_date)
+    if not start:
+        return ()
+    breaks = []
+    for m in _BREAK_RE.finditer(text):
+        window = text[m.end():m.end() + BREAK_WINDOW]
+        month_range, slash_range = (r.search(window) for r in _BREAK_RANGE_RES)
+        if month_range and (not slash_range or month_range.start() <= slash_range.start()):
+            month = _MONTHS[month_range.group(1).lower()[:3]]
+            end_month = _MONTHS[month_range.group(3).lower()[:3]] if month_range.group(3) else month
+            first = _break_date(month, int(month_range.group(2)), start)
+            last = _break_date(end_month, int(month_range.group(4) or month_range.group(2)), start)
+        elif slash_range:
+            month = int(slash_range.group(1))
+            end_month = int(slash_range.group(3) or month)
+            first = _break_date(month, int(slash_range.group(2)), start) if 1 <= month <= 12 else None
+            last = (_break_date(end_month, int(slash_range.group(4) or slash_range.group(2)), start)
+                    if 1 <= end_month <= 12 else None)
+        else:
+            continue
+        if first and last and first <= last <= first + timedelta(days=16):
+            breaks.append((first.isoformat(), last.isoformat()))
+    return tuple(sorted(set(breaks)))
+
+
+def numbers_break_weeks(text: str) -> bool:
+    """Does the schedule give the break its own week number ("Week 8: Spring Break")?"""
+    return bool(_NUMBERED_BREAK_RE.search(text))
+
+
+class SemesterCalendar:
+    """Precomputed date lookups for one semester."""
+
+    def __init__(self, start: date, end: Optional[date] = None, meeting_days: Tuple[int, ...] = (),
+                 breaks: Tuple[Tuple[date, date], ...] = (), number_breaks: bool = False):
+        self.start = start
+        self.end = end if end and end > start else start + timedelta(weeks=DEFAULT_TERM_WEEKS)
+        self.week1_monday = start - timedelta(days=start.weekday())
+        n_calendar_weeks = (self.end - self.week1_monday).days // 7 + 1
+
+        off_days = {first + timedelta(days=i) for first, last in breaks for i in range((last - first).days + 1)}
+        # Calendar weeks (0-based offsets from week 1) that drop out of the numbering
+        skipped = set()
+        if not number_breaks:
+            for offset in range(n_calendar_weeks):
+                monday = self.week1_monday + timedelta(weeks=offset)
+                if sum(1 for day in range(5) if monday + timedelta(days=day) in off_days) >= FULL_WEEK_WEEKDAYS:
+                    skipped.add(offset)
+
+        # Instruction week number -> calendar week offset
+        self._week_offsets: Dict[int, int] = {}
+        week = 0
+        for offset in range(n_calendar_weeks):
+            if offset in skipped:
+                continue
+            week += 1
+            if week > MAX_TERM_WEEKS:
+                break
+            self._week_offsets[week] = offset
+        self._by_week_day: Dict[Tuple[int, int], str] = {
+            (week, day): (self.week1_monday + timedelta(weeks=offset, days=day)).isoformat()
+            for week, offset in self._week_offsets.items()
+            for day in range(7)
+        }
+        self._meetings: List[str] = []
+        if meeting_days:
+            d = start
+            while d <= self.end:
+                if d.weekday() in meeting_days and d not in off_days:
+                    self._meetings.append(d.isoformat())
+                d += timedelta(days=1)
+
+    @property
+    def n_weeks(self) -> int:
+        return max(self._week_offsets)
+
+    def week_day(self, week: int, weekday: int) -> Optional[str]:
+        return self._by_week_day.get((week, weekday))
+
+    def meeting(self, n: int) -> Optional[str]:
+        return self._meetings[n - 1] if 1 <= n <= len(self._meetings) else None
+
+    def week_of(self, iso_date: str) -> Optional[int]:
+        d = _parse_iso(iso_date)
+        if not d:
+            return None
+        offset = (d - self.week1_monday).days // 7
+        for week, week_offset in self._week_offsets.items():
+            if week_offset == offset:
+                return week
+        return None
+
+    def resolve(self, text: str) -> Optional[str]:
+        """Resolve the first relative date reference in text to YYYY-MM-DD, or None."""
+        m = _WEEK_DAY_RE.search(text)
+        if m:
+            return self.week_day(int(m.group(1)), _weekday(m.group(2)))
+        m = _DAY_OF_WEEK_RE.search(text)
+        if m:
+            return self.week_day(int(m.group(2)), _weekday(m.group(1)))
+        m = _LECTURE_N_RE.search(text)
+        if m:
+            return self.meeting(int(m.group(1)))
+        return None
+
+
+@lru_cache(maxsize=256)
+def _cached_calendar(start: date, end: Optional[date], meeting_days: Tuple[int, ...],
+                     breaks: Tuple[Tuple[date, date], ...], number_breaks: bool) -> SemesterCalendar:
+    return SemesterCalendar(start, end, meeting_days, breaks, number_breaks)
+
+
+def get_semester_calendar(
+    start_date: Optional[str], end_date: Optional[str], meeting_days: Tuple[int, ...] = (),
+    breaks: Tuple[Tuple[str, str], ...] = (), number_breaks: bool = False,
+) -> Optional[SemesterCalendar]:
+    """Shared calendar for a semester, or None when the start date is unknown."""
+    start = _parse_iso(start_date)
+    if not start:
+        return None
+    parsed_breaks = tuple((_parse_iso(first), _parse_iso(last)) for first, last in breaks)
+    return _cached_calendar(start, _parse_iso(end_date), tuple(sorted(set(meeting_days))),
+                            tuple(b for b in parsed_breaks if b[0] and b[1]), number_breaks)
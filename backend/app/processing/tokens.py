@@ -0,0 +1,42 @@
+"""
+tokens.py — prompt token estimation
+
+Uses tiktoken when it is installed and its encoding can be loaded; otherwise
+falls back to a BPE-shaped heuristic (one token per short word, number group,
+punctuation mark, tab or newline run) that tracks real counts closely enough
+for budgeting and for comparing prompt layouts against each other.
+"""
+
+import re
+from typing import Optional
+
+_PIECE_RE = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]|\t|\n+")
+
+_encoder = None
+_encoder_loaded = False
+
+
+def _get_encoder():
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        _encoder_loaded = True
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoder = None
+    return _encoder
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Estimate the number of model tokens in text."""
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    count = 0
+    for piece in _PIECE_RE.findall(text):
+        # Long words split into several BPE tokens
+        count += 1 + len(piece) // 8 if piece[0].isalpha() else 1
+    return count
@@ -39,3 +39,59 @@ class SyllabusData(BaseModel):
     assignments: List[Assignment]
     exams: List[Exam]
     grading: Optional[Grading]
+
+# Compact response schema: short keys, one lecture entry per meeting pattern.
+# Expanded back into SyllabusData by the parser before validation.
+
+class CompactLecture(BaseModel):
+    d: List[int]  # days, 0=monday ... 6=sunday
+    s: str  # start time HH:MM
+    e: str  # end time HH:MM
+    sd: Optional[str]  # start date YYYY-MM-DD, null = course start date
+    ed: Optional[str]  # end date YYYY-MM-DD, null = course end date
+    loc: str
+    t: str  # 'lecture', 'lab', 'discussion'
+
+class CompactItem(BaseModel):
+    n: str  # description
+    d: str  # date YYYY-MM-DD or "Not Listed"
+    t: str  # time due HH:MM or "Not Listed"
+    c: int  # confidence 0-100
+
+class CompactGradingCategory(BaseModel):
+    n: str  # name
+    w: float  # weight
+    d: str  # description
+
+class CompactGrading(BaseModel):
+    cats: List[CompactGradingCategory]
+    c: int  # confidence 0-100
+
+class CompactSyllabusData(BaseModel):
+    course: str
+    instr: str
+    summary: str
+    sd: str  # course start date YYYY-MM-DD or "Not Listed"
+    ed: str  # course end date YYYY-MM-DD or "Not Listed"
+    lec: List[CompactLecture]
+    hw: List[CompactItem]
+    ex: List[CompactItem]
+    gr: Optional[CompactGrading]
+
+# Field-group schemas (grouped LLM mode): one small response per group, keys as
+# in SyllabusData so the parser can merge them with dict.update.
+
+class MetadataGroup(BaseModel):
+    course_name: str
+    instructor: str
+    summary: str
+
+class MeetingsGroup(BaseModel):
+    lectures: List[Lecture]
+
+class DeliverablesGroup(BaseModel):
+    assignments: List[Assignment]
+    exams: List[Exam]
+
+class GradingGroup(BaseModel):
+    grading: Optional[Grading]
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Create the parse_runs ledger table in an existing database. Fresh databases
+(reset_db.py, create_new_tables.py) get it from create_all() already; this
+only creates it when it is missing.
+"""
+
+import os
+import sys
+
+# Add the parent directory to the Python path so we can import from app
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.database.db import get_engine
+from app.database.models import ParseRun
+
+def add_table():
+    """Create parse_runs and its indexes if they are missing"""
+    engine = get_engine()
+    ParseRun.__table__.create(engine, checkfirst=True)
+    print("✅ parse_runs is in place")
+
+if __name__ == "__main__":
+    print("🚀 Adding parse_runs table")
+    add_table()
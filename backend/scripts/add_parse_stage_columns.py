@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Add the files.parse_stage / files.parse_version columns to an existing database.
+create_all() only creates missing tables, so existing `files` tables need this
+once; fresh databases (reset_db.py, create_new_tables.py) already have them.
+"""
+
+import os
+import sys
+from sqlalchemy import text
+
+# Add the parent directory to the Python path so we can import from app
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.database.db import get_engine
+
+STATEMENTS = [
+    "ALTER TABLE files ADD COLUMN IF NOT EXISTS parse_stage VARCHAR(20)",
+    "ALTER TABLE files ADD COLUMN IF NOT EXISTS parse_version INTEGER NOT NULL DEFAULT 0",
+]
+
+def add_columns():
+    """Add the parse stage columns if they are missing"""
+    engine = get_engine()
+    with engine.begin() as conn:
+        for statement in STATEMENTS:
+            print(f"  {statement}")
+            conn.execute(text(statement))
+    print("✅ files.parse_stage and files.parse_version are in place")
+
+if __name__ == "__main__":
+    print("🚀 Adding parse stage columns")
+    add_columns()
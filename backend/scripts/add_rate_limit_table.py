@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Create the llm_rate_buckets table (LLM_RATE_LIMITER=postgres) in an existing
+database. Fresh databases (reset_db.py, create_new_tables.py) get it from
+create_all() already; this only creates it when it is missing. The limiter
+adds its own bucket row on first use.
+"""
+
+import os
+import sys
+
+# Add the parent directory to the Python path so we can import from app
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.database.db import get_engine
+from app.database.models import LLMRateBucket
+
+def add_table():
+    """Create llm_rate_buckets if it is missing"""
+    engine = get_engine()
+    LLMRateBucket.__table__.create(engine, checkfirst=True)
+    print("✅ llm_rate_buckets is in place")
+
+if __name__ == "__main__":
+    print("🚀 Adding llm_rate_buckets table")
+    add_table()
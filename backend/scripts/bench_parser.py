@@ -0,0 +1,910 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for the syllabus parser.
+
+Runs against the PDFs in testing/ (no GCS, database or OpenAI access needed).
+
+Usage:
+    python scripts/bench_parser.py boilerplate  # shared policy statements suppressed, shared course text kept
+    python scripts/bench_parser.py schedule   # schedule-table interpreter: Week | Date case + items per PDF
+    python scripts/bench_parser.py tables     # prompt tokens per table serialization
+    python scripts/bench_parser.py schema     # tokens / LLM latency per PDF: full vs compact schema vs grouped
+    python scripts/bench_parser.py tiers      # extraction time / output per extraction tier
+    python scripts/bench_parser.py redos      # scanner fuzz vs the old regexes + adversarial time bounds
+    python scripts/bench_parser.py groups     # prompt / completion tokens per field group vs one prompt
+    python scripts/bench_parser.py prefix     # static prompt prefix per call kind + simulated prefix-cache hits
+    python scripts/bench_parser.py routes     # model / completion budget route chosen per PDF (LLM_ROUTING_TABLE)
+    python scripts/bench_parser.py ratelimit  # burst of jobs through the LLM rate limiter (simulated calls)
+    python scripts/bench_parser.py batch      # cross-document batching of tiny documents (simulated calls)
+    python scripts/bench_parser.py hedge      # tail latency with / without hedged requests (simulated calls)
+    python scripts/bench_parser.py concurrency  # adaptive vs fixed LLM concurrency against a simulated provider
+    python scripts/bench_parser.py scale      # time / memory curves on synthetic syllabi (synthetic_syllabus.py)
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import logging
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import nullcontext
+
+# Add the parent directory to the Python path so we can import from app
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import fitz  # PyMuPDF
+
+from app.processing.parser import (
+    USER_PROMPT_TEMPLATE, _RESPONSE_SCHEMAS, _prompt_cache_text,
+    CHUNK_CHAR_LIMIT, EXTRACTION_TIERS, FULL_FIELDS_SPEC, _FIELD_GROUPS, _TABLE_SERIALIZERS, DocumentContext,
+    Parser, _chunk_text, _group_text, _extract_assignments_regex, _extract_document, _extract_exams_regex, _extract_lectures_regex,
+    _page_to_text, _parse_day_string, _reconstruct_two_column_table, _detect_column_roles,
+    _interpret_schedule_table,
+)
+from app.processing import parser as parser_module
+from app.processing.batching import Batcher
+from app.processing.boilerplate import ShingleIndex
+from app.processing.concurrency import AdaptiveLimiter
+from app.processing.config import RESPONSE_SCHEMA
+from app.processing.hedging import Hedger
+from app.processing.metrics import percentile
+from app.processing.replay import CACHE_MIN_TOKENS, PromptCacheSimulator, ReplayStore, set_replay_store
+from app.processing.ratelimit import LocalRateLimiter, PostgresRateLimiter
+from app.processing.resilience import CircuitBreaker, Deadline, call_with_retries
+from app.processing.routing import choose_route, load_routing_table
+from app.processing.scanners import scan_lecture_lines, scan_numbered_due
+from app.processing.tokens import estimate_tokens
+from app.processing.types import SyllabusData
+
+from golden_parse import RECORDINGS_DIR, FixtureClient
+from synthetic_syllabus import generate as generate_syllabus
+
+TESTING_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'testing')
+
+
+def _pdf_paths(pattern: str):
+    return sorted(glob.glob(os.path.join(TESTING_DIR, pattern)))
+
+
+def _extract(path: str, **page_kwargs) -> str:
+    doc = fitz.open(path)
+    parts = []
+    for i, page in enumerate(doc, start=1):
+        page_text = _page_to_text(page, **page_kwargs)
+        if page_text.strip():
+            parts.append(f"[PAGE {i}]\n{page_text}")
+    doc.close()
+    return "\n\n".join(parts)
+
+
+_COURSE_DESCRIPTION = (
+    "This course introduces the principles of structural design for buildings, covering loads, "
+    "material behavior, beams, columns and lateral systems. Students develop intuition through "
+    "hand calculations, physical models and studio critiques, and complete a final design project."
+)
+_INTEGRITY_STATEMENT = (
+    "Each student in this course is expected to abide by the Code of Academic Integrity. Any work "
+    "submitted by a student in this course for academic credit will be the student's own work. "
+    "Plagiarism and unauthorized collaboration will be reported to the academic integrity board."
+)
+
+
+def bench_boilerplate(args):
+    """
+    Sections of one course share their description as well as the policy
+    statements; once the index has seen them, only the policy statement may
+    be collapsed, never the course description.
+    """
+    index = ShingleIndex(min_docs=args.min_docs)
+    for section in range(args.min_docs + 1):
+        index.add_document(f"[PAGE 1]\nARCH 2613 Section {section + 1}\n\n{_COURSE_DESCRIPTION}\n\n"
+                           f"{_INTEGRITY_STATEMENT}\n\nOffice hours: room {100 + section}")
+    text = f"[PAGE 1]\nARCH 2613 Section 9\n\n{_COURSE_DESCRIPTION}\n\n{_INTEGRITY_STATEMENT}"
+    started = time.perf_counter()
+    suppressed, omitted = index.suppress(text)
+    elapsed = time.perf_counter() - started
+    print(f"{index.document_count} documents indexed, {omitted} paragraph(s) omitted in {elapsed * 1000:.2f} ms")
+    print(suppressed)
+    assert _COURSE_DESCRIPTION in suppressed, "the shared course description was suppressed"
+    assert _INTEGRITY_STATEMENT not in suppressed and "[Standard academic integrity statement omitted]" in suppressed, \
+        "the shared integrity statement was kept"
+    print("✅ shared course description kept, integrity statement collapsed")
+
+
+# Week numbers next to the dates, deliverables with "due" in their own cell
+_WEEK_DATE_TABLE = [
+    ["Week", "Date", "Topic", "Assignment Due"],
+    ["1", "9/2", "Introduction", ""],
+    ["1", "9/4", "Linear models", "PS 1 due 9/5"],
+    ["2", "9/9", "Regularization", ""],
+    ["2", "9/11", "Prelim 1", "PS 2 due 9/12"],
+]
+
+
+def bench_schedule(args):
+    """
+    Schedule-table interpreter: a Week | Date | Topic | Assignment Due table,
+    then every bordered table in testing/ with the items it yields.
+    """
+    roles, _ = _detect_column_roles(_WEEK_DATE_TABLE, 2025)
+    items = _interpret_schedule_table(_WEEK_DATE_TABLE, ("Fall", 2025))
+    print(f"Week | Date table: roles {roles}")
+    assert roles.get(1) == "date" and roles.get(0) == "week", "the Date column did not get the date role"
+    found = [(i["description"], i["date"]) for i in items["assignments"] + items["exams"]]
+    print(f"  items {found}")
+    assert ("PS 1", "2025-09-05") in found and ("PS 2", "2025-09-12") in found and ("Prelim 1", "2025-09-11") in found, \
+        "expected PS 1, PS 2 (without \"due\") and Prelim 1"
+
+    total = 0
+    print(f"\n{'pdf':<28}{'tables':>7}{'read':>6}{'items':>7}  handled")
+    for path in _pdf_paths(args.pattern):
+        doc = fitz.open(path)
+        extracted = _extract_document(doc, "accurate")
+        doc.close()
+        ctx = DocumentContext(extracted["full_text"], extracted["pages"], extracted["tables"])
+        results = [r for r in (_interpret_schedule_table(t["rows"], ctx.term, ctx.calendar)
+                               for t in extracted["tables"]) if r is not None]
+        count = sum(len(r["assignments"]) + len(r["exams"]) for r in results)
+        total += count
+        print(f"{os.path.basename(path):<28}{len(extracted['tables']):>7}{len(results):>6}{count:>7}  "
+              f"{sum(1 for r in results if r['handled'])}")
+        for r in results:
+            for item in r["assignments"] + r["exams"]:
+                print(f"    {item['date']} {item['time_due'] or '':>5}  {item['description']}")
+    assert total, "no schedule table in testing/ yielded an item"
+    print(f"✅ {total} items read from schedule tables in testing/")
+
+
+def bench_tables(args):
+    """Compare prompt token counts for each table serialization."""
+    formats = list(_TABLE_SERIALIZERS)
+    print(f"{'file':<28}" + "".join(f"{f:>12}" for f in formats))
+    totals = {f: 0 for f in formats}
+    for path in _pdf_paths(args.pattern):
+        row = f"{os.path.basename(path):<28}"
+        for fmt in formats:
+            tokens = estimate_tokens(_extract(path, table_format=fmt))
+            totals[fmt] += tokens
+            row += f"{tokens:>12}"
+        print(row)
+    base = totals[formats[0]] or 1
+    print(f"{'TOTAL':<28}" + "".join(f"{totals[f]:>12}" for f in formats))
+    print(f"{'vs ' + formats[0]:<28}" + "".join(f"{totals[f] / base:>11.1%} " for f in formats))
+
+
+def _sample_syllabus() -> dict:
+    """A typical one-course result: MWF lecture (two time options), TTh sections, weekly lab."""
+    term = {"start_date": "2025-01-21", "end_date": "2025-05-06"}
+    lectures = []
+    for start, end in (("09:05", "09:55"), ("10:10", "11:00")):
+        for day in (0, 2, 4):
+            lectures.append({"day": day, "start_time": start, "end_time": end, **term,
+                             "location": "200 Baker Laboratory", "type": "lecture"})
+    for day in (1, 3):
+        lectures.append({"day": day, "start_time": "14:55", "end_time": "16:10", **term,
+                         "location": "Olin Hall 155", "type": "discussion"})
+    lectures.append({"day": 2, "start_time": "13:25", "end_time": "16:25", **term,
+                     "location": "Phillips 318", "type": "lab"})
+    assignments = [{"description": f"Problem Set #{n}", "date": f"2025-{2 + n // 4:02d}-{1 + (n * 7) % 28:02d}",
+                    "time_due": "23:59", "confidence": 90} for n in range(1, 13)]
+    exams = [{"description": f"Prelim {n}", "date": d, "time_due": "19:30", "confidence": 95}
+             for n, d in enumerate(("2025-02-12", "2025-03-17", "2025-04-23"), start=1)]
+    grading = {"categories": [{"name": n, "weight": w, "description": ""} for n, w in
+                              (("Problem Sets", 25.0), ("Prelims", 45.0), ("Labs", 15.0), ("Participation", 15.0))],
+               "confidence": 90}
+    return {"course_name": "CHEM 2090: Engineering General Chemistry",
+            "instructor": "Prof. A. Example (ae123@cornell.edu)",
+            "summary": "Covers basic chemical concepts, such as reactivity and bonding of molecules, "
+                       "introductory quantum mechanics, and electrochemistry.",
+            "lectures": lectures, "assignments": assignments, "exams": exams, "grading": grading}
+
+
+def bench_schema(args):
+    """
+    Parse every PDF once per response variant (full schema, compact schema,
+    grouped calls) through Parser.parse_pdf and compare LLM tokens and
+    latency per document. Answers come from FixtureClient with its latency
+    model, or with --llm replay from the recordings at their recorded latency.
+    """
+    variants = {"full": ("full", "single"), "compact": ("compact", "single"), "grouped": ("full", "grouped")}
+    paths = _pdf_paths(args.pattern)
+    fixture = args.llm == "fixture"
+    results = {}
+    for variant, (schema, mode) in variants.items():
+        parser_module.RESPONSE_SCHEMA = schema
+        store = ReplayStore(mode="off" if fixture else "replay", directory=args.recordings, simulate_latency=True)
+        set_replay_store(store)
+        parser = Parser(llm_mode=mode)
+        if fixture:
+            parser.openai_key, parser._client = "fixture", FixtureClient(args.ttft, args.decode_tps)
+        for path in paths:
+            with open(path, "rb") as fh:
+                content = fh.read()
+            results[variant, path] = asyncio.run(parser.parse_pdf(content))
+    parser_module.RESPONSE_SCHEMA = RESPONSE_SCHEMA
+    set_replay_store(None)
+
+    print(f"{'pdf':<28}" + "".join(f"{v + ' prompt':>16}{'compl':>7}{'llm s':>7}" for v in variants))
+    totals = {v: {"prompt_tokens": 0, "completion_tokens": 0, "llm": 0.0} for v in variants}
+    for path in paths:
+        cells = []
+        for variant in variants:
+            result = results[variant, path]
+            if not result.get("success") or result.get("degraded"):
+                cells.append(f"{'no answer':>30}")
+                continue
+            usage = result["llm"]["usage"]
+            llm = result["timings"].get("llm", 0.0)
+            totals[variant]["prompt_tokens"] += usage["prompt_tokens"]
+            totals[variant]["completion_tokens"] += usage["completion_tokens"]
+            totals[variant]["llm"] += llm
+            cells.append(f"{usage['prompt_tokens']:>16}{usage['completion_tokens']:>7}{llm:>7.2f}")
+        print(f"{os.path.basename(path)[:27]:<28}" + "".join(cells))
+    print(f"{'TOTAL':<28}" + "".join(f"{t['prompt_tokens']:>16}{t['completion_tokens']:>7}{t['llm']:>7.2f}"
+                                    for t in totals.values()))
+
+    base = totals["full"]
+    for variant in ("compact", "grouped"):
+        t = totals[variant]
+        print(f"{variant} vs full: completion {t['completion_tokens'] / (base['completion_tokens'] or 1):.0%}, "
+              f"prompt {t['prompt_tokens'] / (base['prompt_tokens'] or 1):.0%}, "
+              f"llm time {t['llm'] / (base['llm'] or 1):.0%}")
+    if not fixture:
+        return
+    # The fixture gives both schemas the same answer, so the compact one must expand back to it
+    for path in paths:
+        full, compact = results["full", path], results["compact", path]
+        assert compact.get("success") and compact["parsed"] == full["parsed"], \
+            f"{os.path.basename(path)}: compact result differs from full after expansion"
+    assert totals["compact"]["completion_tokens"] < base["completion_tokens"], "compact schema saved no tokens"
+    print("✅ compact results expand to the full-schema results on every PDF")
+
+
+def bench_groups(args):
+    """Input tokens each field-group call sees, and completion tokens per group on the sample result."""
+    parser = Parser()
+    names = list(_FIELD_GROUPS)
+    print(f"{'pdf':<28}{'single':>9}" + "".join(f"{n:>14}" for n in names))
+    for path in _pdf_paths(args.pattern):
+        doc = fitz.open(path)
+        extracted = _extract_document(doc, "balanced")
+        doc.close()
+        ctx = DocumentContext(extracted["full_text"], extracted["pages"], extracted["tables"])
+        text = ctx.full_text
+        for handled in ctx.table_items["handled_text"]:
+            text = text.replace(handled, "", 1)
+        single = estimate_tokens(parser._build_prompt(text, ctx, FULL_FIELDS_SPEC))
+        cells = []
+        for name in names:
+            group_text = _group_text(text, name)
+            tokens = estimate_tokens(parser._build_prompt(group_text, ctx, _FIELD_GROUPS[name][1])) if group_text else 0
+            cells.append(f"{tokens:>8} ({tokens / single:>3.0%})")
+        print(f"{os.path.basename(path)[:27]:<28}{single:>9}" + "".join(cells))
+
+    sample = SyllabusData.model_validate(_sample_syllabus()).model_dump()
+    completion = {n: estimate_tokens(json.dumps(_FIELD_GROUPS[n][0].model_validate(sample).model_dump(),
+                                                separators=(",", ":"))) for n in names}
+    total = estimate_tokens(json.dumps(sample, separators=(",", ":")))
+    print(f"\nsample completion tokens: single {total}, per group "
+          + ", ".join(f"{n} {t}" for n, t in completion.items()))
+    print(f"decode-bound wall time ≈ slowest group: {max(completion.values()) / total:.0%} of the single call")
+
+
+def bench_prefix(args):
+    """
+    For each call kind, render every PDF's prompt as the provider sees it
+    (schema + system + user) and check that they all start with the same
+    static text, which must end where the per-document content starts.
+    Then replay them in order through the prefix-cache model.
+    """
+    parser = Parser()
+    contexts = []
+    for path in _pdf_paths(args.pattern):
+        doc = fitz.open(path)
+        extracted = _extract_document(doc, "balanced")
+        doc.close()
+        ctx = DocumentContext(extracted["full_text"], extracted["pages"], extracted["tables"])
+        text = ctx.full_text
+        for handled in ctx.table_items["handled_text"]:
+            text = text.replace(handled, "", 1)
+        contexts.append((ctx, text))
+
+    static_user = USER_PROMPT_TEMPLATE.split("SEMESTER: {term_str}")[0]
+    kinds = {name: (schema, spec, None) for name, (schema, spec) in _RESPONSE_SCHEMAS.items()}
+    kinds.update({name: (group[0], group[1], name) for name, group in _FIELD_GROUPS.items()})
+    print(f"{len(contexts)} PDFs; the provider caches prompts of {CACHE_MIN_TOKENS}+ tokens in 128-token blocks\n")
+    print(f"{'call':<14}{'static prefix':>14}{'avg prompt':>12}{'cached (sim)':>14}  prefix")
+    unstable = 0
+    for name, (schema, spec, group) in kinds.items():
+        expected = _prompt_cache_text(schema, static_user.format(fields=spec))
+        prompts = [_prompt_cache_text(schema, parser._build_prompt(_group_text(text, group) if group else text,
+                                                                   ctx, spec))
+                   for ctx, text in contexts]
+        stable = all(p.startswith(expected) for p in prompts)
+        unstable += not stable
+        cache = PromptCacheSimulator()
+        usage = [cache.account(p) for p in prompts]
+        prompt_tokens = sum(u["prompt_tokens"] for u in usage)
+        cached = sum(u["cached_tokens"] for u in usage)
+        print(f"{name:<14}{estimate_tokens(expected):>14}{prompt_tokens // len(prompts):>12}"
+              f"{cached / prompt_tokens:>14.1%}  {'✅ stable' if stable else '❌ per-document text in prefix'}")
+    if unstable:
+        sys.exit(1)
+
+
+def bench_routes(args):
+    """Routing inputs and the route the table picks for each PDF."""
+    table = load_routing_table(args.table or os.getenv("LLM_ROUTING_TABLE"))
+    print(f"{'pdf':<28}{'prompt tok':>11}{'items':>7}{'chunks':>7}  route")
+    for path in _pdf_paths(args.pattern):
+        doc = fitz.open(path)
+        extracted = _extract_document(doc, "balanced")
+        doc.close()
+        ctx = DocumentContext(extracted["full_text"], extracted["pages"], extracted["tables"])
+        text = ctx.full_text
+        for handled in ctx.table_items["handled_text"]:
+            text = text.replace(handled, "", 1)
+        ctx.prompt_text = text
+        chunks = len(_chunk_text(text, CHUNK_CHAR_LIMIT))
+        route = choose_route(table, ctx.prompt_tokens, ctx.detected_items, chunks)
+        print(f"{os.path.basename(path)[:27]:<28}{route['prompt_tokens']:>11}{route['items']:>7}{chunks:>7}  "
+              f"{route['route']} ({route['model']}, max_tokens {route['max_tokens']})")
+
+
+def bench_tiers(args):
+    """Extraction time, prompt tokens and schedule-table items for each tier."""
+    tiers = list(EXTRACTION_TIERS) + ["auto"]
+    print(f"{'file':<28}{'pages':>6}" + "".join(f"{t:>16}" for t in tiers) + f"{'auto →':>10}")
+    totals = {t: 0.0 for t in tiers}
+    for path in _pdf_paths(args.pattern):
+        doc = fitz.open(path)
+        row = f"{os.path.basename(path):<28}{doc.page_count:>6}"
+        chosen = ""
+        for tier in tiers:
+            started = time.perf_counter()
+            extracted = _extract_document(doc, tier)
+            elapsed = time.perf_counter() - started
+            totals[tier] += elapsed
+            ctx = DocumentContext(extracted["full_text"], extracted["pages"], extracted["tables"])
+            found = len(ctx.table_items["assignments"]) + len(ctx.table_items["exams"])
+            row += f"{elapsed * 1000:>8.0f}ms{ctx.full_text_tokens / 1000:>5.1f}k{found:>2}"
+            chosen = extracted["tier"]
+        print(row + f"{chosen:>10}")
+        doc.close()
+    print(f"{'TOTAL':<34}" + "".join(f"{totals[t] * 1000:>8.0f}ms{'':>8}" for t in tiers))
+    print("\nColumns per tier: extraction time, prompt tokens, deterministic table items.")
+
+
+# The backtracking patterns scanners.py replaced, kept as the reference for `redos`
+_LEGACY_LECTURE_RE = re.compile(
+    r"(?:Lectures?\s*:?\s*)?"
+    r"(MWF|MW|TTh|Tu/?Th|"
+    r"(?:Mon(?:day)?s?(?:\s*[,&/]\s*)?)?(?:Wed(?:nesday)?s?(?:\s*[,&/]\s*)?)?(?:Fri(?:day)?s?)?"
+    r"|Tuesdays?\s*(?:[&and]+\s*Thursdays?)?)"
+    r"[,\s]+"
+    r"([\d:]+\s*[-–]\s*[\d:]+\s*[aApP]\.?[mM]?\.?)"
+    r"(?:\s*(?:,\s*)?(?:or|OR)\s*([\d:]+\s*[-–]\s*[\d:]+\s*[aApP]\.?[mM]?\.?))?"
+    r"(?:[,\s]+(?:in\s+)?([^\n,]{3,50?}))?",
+    re.IGNORECASE | re.MULTILINE,
+)
+_LEGACY_DUE_RE = re.compile(
+    r"\b(PS|HW|Problem\s+Set|Assignment)?\s*#?(\d{1,2})\s*\(?\s*[Dd]ue\s+(\d{1,2})/(\d{1,2})\)?"
+)
+
+
+def _legacy_lectures(text):
+    return [(_parse_day_string(m.group(1).strip()), m.group(2), m.group(3)) for m in _LEGACY_LECTURE_RE.finditer(text)]
+
+
+def _scanned_lectures(text):
+    return [(_parse_day_string(d.strip()), t1, t2) for d, t1, t2 in scan_lecture_lines(text)]
+
+
+def _fuzz_line(rnd: random.Random) -> str:
+    """Schedule-shaped text: lecture lines, numbered due items, separators and noise."""
+    c = rnd.choice
+    sep = lambda: c(["", " ", "  ", ", ", ",", "\n", "\xa0", " \t ", " , "])
+    time_range = lambda: (c(["9:05", "10", "1:30", "12:00"]) + c(["", " "]) + c(["-", "–"]) + c(["", " "])
+                          + c(["9:55", "11:00", "2", "3:45"]) + c(["", " "])
+                          + c(["a", "p", "am", "PM", "a.m.", "P.M", "x"]))
+    day = lambda: c(["MWF", "MW", "TTh", "Tu/Th", "TuTh", "Mon", "Mondays", "Mon, Wed", "Mon/Wed/Fri",
+                     "Wednesdays & Fridays", "Tuesdays & Thursdays", "Tuesday and Thursday", "common",
+                     "Lecture: MWF", "Lectures MW", "", "x", "Thursday", "Mon &", "Wed,"])
+    lecture = lambda: (day() + sep() + time_range()
+                       + c(["", sep() + c(["or", "OR", "Or"]) + sep() + time_range()]) + c(["", ", in Olin Hall"]))
+    due = lambda: (c(["", "PS", "HW", "Problem Set", "Problem  Set", "Assignment", "xHW", "Lab", "PS#"])
+                   + c(["", " ", "\n"]) + c(["", "#"]) + c(["1", "12", "123"]) + c(["", " ", "  "])
+                   + c(["", "(", " ("]) + c(["", " "]) + c(["due", "Due", "DUE", "overdue"]) + c([" ", ""])
+                   + c(["3/4", "12/25", "123/4", "3/456"]) + c(["", ")"]))
+    noise = lambda: c(["", " ", "text", "\n", "1", "due", "2/3"])
+    return "".join(c([lecture, due, noise, sep])() for _ in range(rnd.randint(1, 8)))
+
+
+_ADVERSARIAL = {
+    "space run": lambda n: "1" + " " * n + "x",
+    "separator runs": lambda n: ("," + " " * 500 + "1") * (n // 502),
+    "day + spaces": lambda n: "Mon" + " " * n + "x",
+    "item + spaces": lambda n: "HW 1" + " " * n + "( x",
+    "digit run": lambda n: "1" * n,
+    "near-miss lectures": lambda n: "MWF, 9:05-9:55 " * (n // 15),
+    "near-miss dues": lambda n: "PS #1 (due 3/" * (n // 13),
+    "prelim + spaces": lambda n: "Prelims:" + " " * n + "7",
+    "keyword soup": lambda n: "Exam 1 Prelim Midterm HW 1 due Mon " * (n // 35),
+}
+
+
+def bench_redos(args):
+    """Differential fuzz of scanners.py against the old regexes, then adversarial time bounds."""
+    texts = []
+    for path in _pdf_paths(args.pattern):
+        doc = fitz.open(path)
+        texts += [_extract_document(doc, tier)["full_text"] for tier in ("fast", "accurate")]
+        doc.close()
+    rnd = random.Random(args.seed)
+    texts += [_fuzz_line(rnd) for _ in range(args.fuzz)]
+    mismatches = 0
+    for text in texts:
+        if (_legacy_lectures(text) != _scanned_lectures(text)
+                or _LEGACY_DUE_RE.findall(text) != scan_numbered_due(text)):
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  mismatch: {text!r}")
+    print(f"differential: {len(texts)} inputs ({len(texts) - args.fuzz} from testing/), {mismatches} mismatches")
+
+    extractors = {
+        "lectures": _extract_lectures_regex,
+        "exams": lambda t: _extract_exams_regex(t, ("Spring", 2025)),
+        "assignments": lambda t: _extract_assignments_regex(t, ("Spring", 2025)),
+    }
+    small, large = args.size, args.size * 4
+    failures = []
+    print(f"\n{'input':<20}{'extractor':<13}{small // 1000:>7}k ms{large // 1000:>7}k ms{'ratio':>8}")
+    for name, make in _ADVERSARIAL.items():
+        for label, fn in extractors.items():
+            times = []
+            for size in (small, large):
+                text = make(size)
+                started = time.perf_counter()
+                fn(text)
+                times.append(time.perf_counter() - started)
+            ratio = times[1] / max(times[0], 1e-4)
+            ok = times[1] < args.bound and ratio < 8
+            if not ok:
+                failures.append(f"{name}/{label}")
+            print(f"{name:<20}{label:<13}{times[0] * 1000:>10.1f}{times[1] * 1000:>10.1f}{ratio:>8.1f}"
+                  f"{'' if ok else '  ✗'}")
+
+    legacy_text = _ADVERSARIAL["space run"](small)
+    started = time.perf_counter()
+    _LEGACY_LECTURE_RE.findall(legacy_text)
+    print(f"\nold lecture regex on the {small // 1000}k space run: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    assert mismatches == 0, f"{mismatches} scanner results differ from the old regexes"
+    assert not failures, f"super-linear or over {args.bound}s: {', '.join(failures)}"
+    print("✅ scanners match the old regexes and stay within the linear time bound")
+
+
+def bench_ratelimit(args):
+    """
+    A burst of parse jobs, each in its own thread + event loop like BackgroundTasks
+    jobs, all taking requests / tokens from one limiter. Reports achieved rates
+    against the budget, per-job wait and FIFO order violations.
+    """
+    if args.store == "postgres":
+        limiter = PostgresRateLimiter(args.rpm, args.tpm, name=f"bench-{uuid.uuid4().hex[:8]}")
+    else:
+        limiter = LocalRateLimiter(args.rpm, args.tpm)
+    rnd = random.Random(args.seed)
+    sizes = [rnd.choice((2_000, 6_000, 12_000)) for _ in range(args.jobs)]
+    waits, granted = [None] * args.jobs, []
+    lock = threading.Lock()
+
+    def job(i):
+        async def run():
+            started = time.monotonic()
+            reserved = await limiter.acquire(sizes[i])
+            with lock:
+                granted.append((time.monotonic(), i))
+            waits[i] = time.monotonic() - started
+            limiter.release(reserved, reserved * args.usage)
+        asyncio.run(run())
+
+    started = time.monotonic()
+    threads = []
+    for i in range(args.jobs):
+        threads.append(threading.Thread(target=job, args=(i,)))
+        threads[-1].start()
+        time.sleep(0.002)  # arrival order = job index
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+
+    order = [i for _, i in sorted(granted)]
+    violations = sum(1 for a, b in zip(order, order[1:]) if b < a)
+    print(f"{args.jobs} jobs, {sum(sizes)} tokens reserved, budget {args.rpm:g} rpm / {args.tpm:g} tpm "
+          f"({args.store})")
+    print(f"elapsed {elapsed:.1f}s  wait p50 {percentile(waits, 50):.2f}s  p95 {percentile(waits, 95):.2f}s  "
+          f"max {max(waits):.2f}s")
+    if elapsed > 1:
+        # the buckets start full, so only what was admitted beyond them is paced
+        used = sum(sizes) * args.usage
+        paced_requests = max(0, args.jobs - args.rpm) / elapsed * 60
+        paced_tokens = max(0.0, used - args.tpm) / elapsed * 60
+        print(f"admitted beyond the initial buckets: {paced_requests:.0f} rpm, {paced_tokens:.0f} tpm "
+              f"of tokens used (budget {args.rpm:g} / {args.tpm:g})")
+    print(f"FIFO order violations: {violations}")
+
+
+def bench_batch(args):
+    """
+    Tiny documents arriving at --rate per second. A request costs --overhead
+    seconds plus --per-doc per document in it, with at most --concurrency
+    requests in flight. Each document spends --extract seconds in progress
+    (extraction) before its LLM step; latency is measured from that step.
+    Compares sending each document alone with batching at several maximum
+    waits.
+    """
+    rnd = random.Random(args.seed)
+    arrivals, t = [], 0.0
+    for _ in range(args.docs):
+        t += rnd.expovariate(args.rate)
+        arrivals.append(t)
+
+    def run(max_wait):
+        batcher = Batcher(max_docs=args.max_docs, max_tokens=10 ** 9, max_wait=max_wait) if max_wait is not None else None
+        requests = 0
+        slots = None
+
+        async def send(docs):
+            nonlocal requests
+            requests += 1
+            async with slots:
+                await asyncio.sleep(args.overhead + args.per_doc * len(docs))
+            return docs
+
+        async def one(at):
+            await asyncio.sleep(at)
+            with batcher.parsing() if batcher else nullcontext():
+                await asyncio.sleep(args.extract)
+                started = time.perf_counter()
+                result = await batcher.submit("bench", at, 1, send) if batcher else None
+            if result is None:
+                await send([at])
+            return time.perf_counter() - started
+
+        async def main():
+            nonlocal slots
+            slots = asyncio.Semaphore(args.concurrency)
+            return await asyncio.gather(*(one(at) for at in arrivals))
+
+        return asyncio.run(main()), requests
+
+    print(f"{args.docs} docs at {args.rate:g}/s, request = {args.overhead * 1000:.0f}ms + "
+          f"{args.per_doc * 1000:.0f}ms/doc, {args.concurrency} in flight, up to {args.max_docs} per batch")
+    for max_wait in [None] + args.waits:
+        latencies, requests = run(max_wait / 1000 if max_wait is not None else None)
+        label = "unbatched" if max_wait is None else f"wait {max_wait:g}ms"
+        print(f"{label:<12} requests {requests:>4}  p50 {percentile(latencies, 50) * 1000:5.0f}ms  "
+              f"p95 {percentile(latencies, 95) * 1000:5.0f}ms  max {max(latencies) * 1000:5.0f}ms")
+
+
+def bench_hedge(args):
+    """
+    Simulated LLM calls: latency around --median with a --tail-rate share of
+    calls taking 3-4x as long. Same call sequence with and without hedging.
+    """
+    rnd = random.Random(args.seed)
+    latencies = [
+        args.median * (rnd.uniform(3, 4) if rnd.random() < args.tail_rate else rnd.uniform(0.8, 1.25))
+        for _ in range(args.calls * 2)  # a hedge draws its own latency from the second half
+    ]
+
+    async def run(hedger):
+        draws = iter(latencies)
+        sem = asyncio.Semaphore(args.concurrency)
+        sent = 0
+
+        async def request(cancel):
+            nonlocal sent
+            sent += 1
+            await asyncio.sleep(next(draws))
+            return True
+
+        async def one():
+            async with sem:
+                started = time.perf_counter()
+                if hedger:
+                    await hedger.run(request, "bench")
+                else:
+                    await request(None)
+                return time.perf_counter() - started
+
+        # warm-up so the hedger has a latency history
+        if hedger:
+            for _ in range(hedger.min_samples):
+                hedger.observe("bench", args.median)
+        return await asyncio.gather(*(one() for _ in range(args.calls))), sent
+
+    for label, hedger in (("no hedging", None),
+                          ("hedged", Hedger(quantile=args.percentile, min_samples=20, max_ratio=args.max_ratio))):
+        durations, sent = asyncio.run(run(hedger))
+        line = "  ".join(f"p{q} {percentile(durations, q) * 1000:.0f}ms" for q in (50, 95, 99))
+        extra = f"  requests +{(sent - args.calls) / args.calls:.1%}"
+        if hedger:
+            stats = hedger.stats()
+            extra += f"  hedges {stats['hedges']}  hedge wins {stats['wins']}"
+        print(f"{label:<11} {line}{extra}")
+
+
+class _Throttled(Exception):
+    status_code = 429
+
+
+def bench_concurrency(args):
+    """
+    Simulated provider: a call takes --base seconds while at most --capacity
+    calls are in flight and slows down in proportion beyond that; past
+    2 x capacity it answers 429. --jobs callers each make --calls calls
+    through call_with_retries, with the adaptive limiter or a fixed limit.
+    """
+    def run(limiter):
+        in_flight = 0
+        throttled = 0
+        latencies = []
+        samples = []
+
+        async def provider(timeout):
+            nonlocal in_flight, throttled
+            in_flight += 1
+            try:
+                if in_flight > 2 * args.capacity:
+                    throttled += 1
+                    await asyncio.sleep(args.base / 10)
+                    raise _Throttled("429")
+                await asyncio.sleep(args.base * max(1.0, in_flight / args.capacity))
+            finally:
+                in_flight -= 1
+
+        async def caller():
+            for _ in range(args.calls):
+                started = time.perf_counter()
+                await call_with_retries(provider, Deadline(600), 60, max_retries=20,
+                                        breaker=CircuitBreaker(threshold=10 ** 6), label="bench",
+                                        concurrency=limiter)
+                latencies.append(time.perf_counter() - started)
+                if limiter:
+                    samples.append(limiter.limit)
+
+        async def main():
+            started = time.perf_counter()
+            await asyncio.gather(*(caller() for _ in range(args.jobs)))
+            return time.perf_counter() - started
+
+        elapsed = asyncio.run(main())
+        return elapsed, latencies, throttled, samples
+
+    logging.getLogger("app.processing.resilience").setLevel(logging.ERROR)  # one warning per 429 retry
+    total = args.jobs * args.calls
+    configs = [("adaptive", AdaptiveLimiter(initial=args.initial, max_limit=args.jobs))]
+    configs += [(f"fixed {n}", AdaptiveLimiter(initial=n, min_limit=n, max_limit=n)) for n in args.fixed]
+    configs.append(("unlimited", None))
+    print(f"{args.jobs} callers x {args.calls} calls, provider capacity {args.capacity}, base {args.base * 1000:.0f}ms")
+    for label, limiter in configs:
+        elapsed, latencies, throttled, samples = run(limiter)
+        line = (f"{label:<10} {total / elapsed:6.1f} calls/s  p50 {percentile(latencies, 50) * 1000:5.0f}ms  "
+                f"p95 {percentile(latencies, 95) * 1000:5.0f}ms  429s {throttled}")
+        if label == "adaptive":
+            tail = samples[len(samples) // 2:]
+            line += f"  limit settled {min(tail)}-{max(tail)}"
+        print(line)
+
+
+def _measure(fn, memory: bool):
+    """(result, seconds, peak Python-heap MB or None). Memory runs fn a second time under tracemalloc."""
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    peak = None
+    if memory:
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def _llm_like(items, rnd: random.Random):
+    """Ground-truth items reworded the way the model tends to return them."""
+    out = []
+    for it in items:
+        desc = it["description"]
+        if rnd.random() < 0.3:
+            desc = desc.replace("Problem Set #", "PS ").replace("Lab Report", "Lab report")
+        out.append({**it, "description": desc, "confidence": 80})
+    return out
+
+
+def _store_session(db_url: str):
+    """Session on an empty schema (SQLite in memory unless a database URL is given)."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.dialects.postgresql import UUID
+    from sqlalchemy.ext.compiler import compiles
+    from sqlalchemy.orm import sessionmaker
+    from app.database.db import Base
+    from app.database.models import File, User
+
+    @compiles(UUID, "sqlite")
+    def _uuid_on_sqlite(type_, compiler, **kw):
+        return "CHAR(32)"
+
+    engine = create_engine(db_url)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    user = User(google_id=f"bench-{uuid.uuid4()}", email=f"{uuid.uuid4()}@bench.local", name="bench")
+    session.add(user)
+    session.flush()
+    file = File(user_id=user.id, filename="synthetic.pdf", file_path="bench://synthetic.pdf")
+    session.add(file)
+    session.commit()
+    return session, file.id
+
+
+def bench_scale(args):
+    """Stage time and memory against document size, on generated syllabi with known ground truth."""
+    from app.processing.routes import _store_parsed
+
+    session, file_id = _store_session(args.db_url or "sqlite://")
+    sizes = [int(s) for s in args.pages.split(",")]
+    stages = ("extract", "two-col", "context", "chunk", "merge", "store")
+    rows = []
+    for pages in sizes:
+        items = pages * args.items_per_page
+        synthetic = generate_syllabus(pages, items, seed=args.seed)
+        doc = fitz.open(stream=synthetic["pdf"], filetype="pdf")
+        m = {}
+
+        extracted, *m["extract"] = _measure(lambda: _extract_document(doc, "accurate"), args.memory)
+        _, *m["two-col"] = _measure(
+            lambda: [_reconstruct_two_column_table(p) for p in doc], args.memory)
+
+        def context():
+            ctx = DocumentContext(extracted["full_text"], extracted["pages"], extracted["tables"])
+            ctx.regex_lectures, ctx.regex_exams, ctx.regex_assignments, ctx.relative_items, ctx.table_items
+            return ctx
+        ctx, *m["context"] = _measure(context, args.memory)
+        chunks, *m["chunk"] = _measure(lambda: _chunk_text(extracted["full_text"], CHUNK_CHAR_LIMIT), args.memory)
+
+        truth = synthetic["truth"]
+        rnd = random.Random(args.seed)
+        raw = {"course_name": "CS 9999", "instructor": "Prof. A. Example", "summary": "Synthetic",
+               "lectures": [{**l, "start_date": "Not Listed", "end_date": "Not Listed", "location": "Not Listed",
+                             "type": "lecture"} for l in truth["lectures"]],
+               "assignments": _llm_like(truth["assignments"], rnd), "exams": _llm_like(truth["exams"], rnd),
+               "grading": None}
+        parser = Parser()
+        merged, *m["merge"] = _measure(
+            lambda: parser._validate_and_merge(json.loads(json.dumps(raw)), ctx), args.memory)
+
+        def store():
+            _store_parsed(session, file_id, merged)
+            session.commit()
+        _, *m["store"] = _measure(store, args.memory)
+        doc.close()
+
+        found = {(a["description"], a["date"]) for a in ctx.table_items["assignments"] + ctx.regex_assignments}
+        expected = {(a["description"], a["date"]) for a in truth["assignments"]}
+        rows.append({"pages": pages, "items": items, "chars": len(extracted["full_text"]), "chunks": len(chunks),
+                     "recall": len(found & expected) / max(len(expected), 1),
+                     "merged": len(merged["assignments"]), "stages": m})
+
+    print(f"{'pages':>6}{'items':>7}{'chars':>10}{'chunks':>7}{'recall':>8}{'merged':>8}"
+          + "".join(f"{s:>12}" for s in stages))
+    for row in rows:
+        print(f"{row['pages']:>6}{row['items']:>7}{row['chars']:>10}{row['chunks']:>7}{row['recall']:>8.0%}"
+              f"{row['merged']:>8}" + "".join(f"{row['stages'][s][0] * 1000:>10.0f}ms" for s in stages))
+        if args.memory:
+            print(f"{'peak MB':>46}" + "".join(f"{row['stages'][s][1]:>12.1f}" for s in stages))
+    # Log-log slope between consecutive sizes: ~1 linear, ~2 quadratic
+    for prev, row in zip(rows, rows[1:]):
+        scale = math.log(row["pages"] / prev["pages"])
+        slopes = [math.log(max(row["stages"][s][0], 1e-5) / max(prev["stages"][s][0], 1e-5)) / scale
+                  for s in stages]
+        print(f"{'slope ' + str(prev['pages']) + '→' + str(row['pages']):>46}"
+              + "".join(f"{x:>12.2f}" for x in slopes))
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(rows, fh, indent=2)
+        print(f"\n📈 curves written to {args.json}")
+    print("\nPeak MB is the Python heap (tracemalloc); MuPDF's native allocations are not included.")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--pattern", default="*.pdf", help="glob inside testing/")
+    sub = ap.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("boilerplate", help="only shared policy statements are suppressed, not course text")
+    p.add_argument("--min-docs", type=int, default=5)
+    p.set_defaults(func=bench_boilerplate)
+    sub.add_parser("schedule", help="schedule-table interpreter: Week | Date case + items per PDF").set_defaults(
+        func=bench_schedule)
+    sub.add_parser("tables", help="prompt tokens per table serialization").set_defaults(func=bench_tables)
+    p = sub.add_parser("schema", help="tokens / LLM latency per PDF: full vs compact schema vs grouped calls")
+    p.add_argument("--llm", choices=("fixture", "replay"), default="fixture")
+    p.add_argument("--recordings", default=RECORDINGS_DIR)
+    p.add_argument("--ttft", type=float, default=0.5, help="fixture: seconds before the first token")
+    p.add_argument("--decode-tps", type=float, default=100.0, help="fixture: completion tokens per second")
+    p.set_defaults(func=bench_schema)
+    sub.add_parser("groups", help="prompt / completion tokens per field group").set_defaults(func=bench_groups)
+    sub.add_parser("tiers", help="extraction time / output per tier").set_defaults(func=bench_tiers)
+    p = sub.add_parser("redos", help="scanner fuzz vs old regexes + adversarial time bounds")
+    p.add_argument("--fuzz", type=int, default=20000, help="random schedule-shaped inputs")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--size", type=int, default=20000, help="adversarial input size (chars); also run at 4x")
+    p.add_argument("--bound", type=float, default=0.5, help="max seconds per extractor at 4x size")
+    p.set_defaults(func=bench_redos)
+    sub.add_parser("prefix", help="static prompt prefix per call kind + simulated prefix-cache hits").set_defaults(
+        func=bench_prefix)
+    p = sub.add_parser("routes", help="route chosen per PDF")
+    p.add_argument("--table", help="routing table JSON or path (default: LLM_ROUTING_TABLE or built-in)")
+    p.set_defaults(func=bench_routes)
+    p = sub.add_parser("ratelimit", help="burst of jobs through the LLM rate limiter")
+    p.add_argument("--jobs", type=int, default=40)
+    p.add_argument("--rpm", type=float, default=60)
+    p.add_argument("--tpm", type=float, default=120_000)
+    p.add_argument("--usage", type=float, default=0.6, help="fraction of each reservation actually used")
+    p.add_argument("--store", choices=("local", "postgres"), default="local")
+    p.add_argument("--seed", type=int, default=0)
+    p.set_defaults(func=bench_ratelimit)
+    p = sub.add_parser("batch", help="cross-document batching of tiny documents")
+    p.add_argument("--docs", type=int, default=200)
+    p.add_argument("--rate", type=float, default=40, help="arrivals per second")
+    p.add_argument("--overhead", type=float, default=0.4, help="seconds per request")
+    p.add_argument("--per-doc", type=float, default=0.05, help="seconds per document in a request")
+    p.add_argument("--extract", type=float, default=0.3, help="seconds in progress before the LLM step")
+    p.add_argument("--max-docs", type=int, default=8)
+    p.add_argument("--concurrency", type=int, default=8, help="requests in flight (provider / rate limit)")
+    p.add_argument("--waits", type=float, nargs="*", default=[100, 250, 500], help="max waits to compare (ms)")
+    p.add_argument("--seed", type=int, default=0)
+    p.set_defaults(func=bench_batch)
+    p = sub.add_parser("hedge", help="tail latency with / without hedged requests")
+    p.add_argument("--calls", type=int, default=400)
+    p.add_argument("--concurrency", type=int, default=20)
+    p.add_argument("--median", type=float, default=0.05, help="seconds")
+    p.add_argument("--tail-rate", type=float, default=0.05)
+    p.add_argument("--percentile", type=float, default=95)
+    p.add_argument("--max-ratio", type=float, default=0.1)
+    p.add_argument("--seed", type=int, default=0)
+    p.set_defaults(func=bench_hedge)
+    p = sub.add_parser("concurrency", help="adaptive vs fixed LLM concurrency against a simulated provider")
+    p.add_argument("--jobs", type=int, default=40)
+    p.add_argument("--calls", type=int, default=15)
+    p.add_argument("--capacity", type=int, default=12, help="calls the provider serves at full speed")
+    p.add_argument("--base", type=float, default=0.05, help="seconds per call at or below capacity")
+    p.add_argument("--initial", type=int, default=4)
+    p.add_argument("--fixed", type=int, nargs="*", default=[4, 40])
+    p.set_defaults(func=bench_concurrency)
+    p = sub.add_parser("scale", help="time / memory curves on synthetic syllabi")
+    p.add_argument("--pages", default="10,40,160", help="comma-separated page counts")
+    p.add_argument("--items-per-page", type=int, default=4)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--no-memory", dest="memory", action="store_false", help="skip the tracemalloc pass")
+    p.add_argument("--db-url", default=os.getenv("BENCH_DATABASE_URL"),
+                   help="database for the store stage (default: SQLite in memory)")
+    p.add_argument("--json", help="write the curves as JSON")
+    p.set_defaults(func=bench_scale)
+    args = ap.parse_args()
+    started = time.perf_counter()
+    args.func(args)
+    print(f"\n⏱️  {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,7 @@ from sqlalchemy import create_engine, text
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.database.db import get_engine
-from app.database.models import Base, User, File, Assignment, Exam, Summary, Lectures
+from app.database.models import Base, User, File, Assignment, Exam, Summary, Lectures, ParseRun, LLMRateBucket
 
 def create_new_tables():
     """Create new tables with UUID support."""
@@ -41,6 +41,8 @@ def create_new_tables():
         print("  • assignments (references files via UUID)")
         print("  • exams (references files via UUID)")
         print("  • lectures (references files via UUID)")
+        print("  • parse_runs (parse job ledger, file UUID without a foreign key)")
+        print("  • llm_rate_buckets (shared LLM rate limit budget, LLM_RATE_LIMITER=postgres)")
         
     except Exception as e:
         print(f"❌ Error creating tables: {e}")
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Golden-output suite for Parser.parse_pdf over the PDFs in testing/.
+
+A check run needs no OpenAI access and every run sees the same model output.
+Each PDF has a golden file with the final `parsed` dict and the per-stage
+timings. The LLM answers come from one of:
+
+- fixture (default): FixtureClient, an offline stand-in for the OpenAI
+  client that answers from the document text in the prompt (regex / table
+  extraction plus the first lines as name / instructor / summary). It goes
+  through the same call path as a live client and does not depend on prompt
+  wording or order, so prompt changes never invalidate it. Its golden files
+  are committed under testing/golden/fixture/, for the default
+  LLM_CALL_MODE and RESPONSE_SCHEMA (grouped calls see filtered text).
+- replay: recordings of real responses (app/processing/replay.py), keyed by
+  a fingerprint of the prompt; any prompt, model or max_tokens change needs a
+  new `record`. Golden files in testing/golden/.
+
+Usage:
+    python scripts/golden_parse.py check                 # fixture: parsed must match, stages within the time bound
+    python scripts/golden_parse.py update                # fixture: rewrite golden files after an intended change
+    python scripts/golden_parse.py record                # live LLM: write recordings + golden files (needs OPENAI_API_KEY)
+    python scripts/golden_parse.py check --llm replay    # replay the recordings instead of the fixture
+
+In replay, prompt tokens are counted by the offline prefix-cache model
+(replay.PromptCacheSimulator), so the summary shows how much of the prompt
+a provider cache would serve: a drop means per-document text moved into the
+shared prompt prefix.
+
+Boilerplate suppression is off unless BOILERPLATE_MODE is set: its corpus
+index depends on what was parsed before, which would change the prompts (and
+so the recording fingerprints) from run to run.
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sys
+import time
+
+# Add the parent directory to the Python path so we can import from app
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("BOILERPLATE_MODE", "off")
+
+from types import SimpleNamespace
+
+from app.processing.parser import DocumentContext, Parser, _prompt_cache_text
+from app.processing.replay import PromptCacheSimulator, ReplayStore, set_replay_store
+from app.processing.tokens import estimate_tokens
+from app.processing.types import CompactSyllabusData, SyllabusData
+
+TESTING_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'testing')
+GOLDEN_DIR = os.path.join(TESTING_DIR, 'golden')
+FIXTURE_GOLDEN_DIR = os.path.join(GOLDEN_DIR, 'fixture')
+RECORDINGS_DIR = os.path.join(TESTING_DIR, 'llm_recordings')
+
+
+class FixtureClient:
+    """
+    Offline stand-in for OpenAI(): beta.chat.completions.parse answers from
+    the syllabus text in the prompt. Supports the full and compact schemas
+    and the field groups (any response model whose fields are SyllabusData
+    fields). With decode_tps set, each call sleeps ttft_s plus its completion
+    tokens at that rate, a simple model of provider latency.
+    """
+
+    def __init__(self, ttft_s: float = 0.0, decode_tps: float = 0.0):
+        self.calls = 0
+        self.ttft_s = ttft_s
+        self.decode_tps = decode_tps
+        self.prompt_cache = PromptCacheSimulator()
+        self.beta = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(parse=self.parse)))
+
+    @staticmethod
+    def answer(prompt: str) -> dict:
+        semester = prompt.split("SEMESTER: ", 1)[1].split("\n", 1)[0] if "SEMESTER: " in prompt else ""
+        text = prompt.split("SYLLABUS TEXT:\n", 1)[-1]
+        ctx = DocumentContext(f"{semester}\n{text}")
+        data = Parser._deterministic_result(Parser.__new__(Parser), ctx)
+        # Prose lines only: skip page markers and table rows / rules
+        lines = [line.strip() for line in text.splitlines()
+                 if not line.startswith(("[PAGE", "|")) and sum(c.isalpha() for c in line) >= max(3, len(line) // 2)]
+        instructor = next((line for line in lines if "instructor" in line.lower() or "professor" in line.lower()),
+                          "Not Listed")
+        data.update(course_name=lines[0][:120] if lines else "Not Listed", instructor=instructor[:120],
+                    summary=" ".join(" ".join(lines[1:6]).split()[:60]))
+        return data
+
+    def parse(self, model, messages, response_format, max_completion_tokens=None, timeout=None):
+        self.calls += 1
+        prompt = messages[-1]["content"]
+        data = self.answer(prompt)
+        if response_format is CompactSyllabusData:
+            data = _to_compact(SyllabusData.model_validate(data).model_dump())
+        parsed = response_format.model_validate({name: data[name] for name in response_format.model_fields})
+        # Prompt / cached tokens from the same offline prefix-cache model replay uses
+        counts = self.prompt_cache.account(_prompt_cache_text(response_format, prompt))
+        completion = estimate_tokens(parsed.model_dump_json())
+        usage = SimpleNamespace(prompt_tokens=counts["prompt_tokens"], completion_tokens=completion,
+                                total_tokens=counts["prompt_tokens"] + completion,
+                                prompt_tokens_details=SimpleNamespace(cached_tokens=counts["cached_tokens"]))
+        if self.decode_tps:
+            time.sleep(self.ttft_s + completion / self.decode_tps)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(parsed=parsed))], usage=usage)
+
+
+def _to_compact(full: dict) -> dict:
+    """Group full-schema lectures by meeting pattern (inverse of _expand_compact)."""
+    starts = [l["start_date"] for l in full["lectures"]] or ["Not Listed"]
+    ends = [l["end_date"] for l in full["lectures"]] or ["Not Listed"]
+    sd, ed = min(starts), max(ends)
+    groups: dict = {}
+    for l in full["lectures"]:
+        key = (l["start_time"], l["end_time"], l["start_date"], l["end_date"], l["location"], l["type"])
+        groups.setdefault(key, []).append(l["day"])
+    lec = [{"d": days, "s": s, "e": e, "sd": None if a == sd else a, "ed": None if b == ed else b,
+            "loc": loc, "t": t} for (s, e, a, b, loc, t), days in groups.items()]
+    item = lambda i: {"n": i["description"], "d": i["date"], "t": i["time_due"], "c": i["confidence"]}
+    gr = full.get("grading")
+    return {"course": full["course_name"], "instr": full["instructor"], "summary": full["summary"],
+            "sd": sd, "ed": ed, "lec": lec,
+            "hw": [item(i) for i in full["assignments"]], "ex": [item(i) for i in full["exams"]],
+            "gr": {"cats": [{"n": c["name"], "w": c["weight"], "d": c["description"]} for c in gr["categories"]],
+                   "c": gr["confidence"]} if gr else None}
+
+
+def _normalize(value):
+    """JSON round trip, so tuples / dates compare the way they are stored."""
+    return json.loads(json.dumps(value, default=str, sort_keys=True))
+
+
+def _diff(expected, actual, path="parsed", limit=10):
+    """Paths where two JSON values differ (first `limit`)."""
+    out = []
+
+    def walk(a, b, p):
+        if len(out) >= limit:
+            return
+        if isinstance(a, dict) and isinstance(b, dict):
+            for k in sorted(set(a) | set(b)):
+                if k not in a or k not in b:
+                    out.append(f"{p}.{k}: {'missing' if k not in b else 'unexpected'}")
+                else:
+                    walk(a[k], b[k], f"{p}.{k}")
+        elif isinstance(a, list) and isinstance(b, list):
+            if len(a) != len(b):
+                out.append(f"{p}: {len(a)} items expected, got {len(b)}")
+            for i, (x, y) in enumerate(zip(a, b)):
+                walk(x, y, f"{p}[{i}]")
+        elif a != b:
+            out.append(f"{p}: expected {a!r}, got {b!r}")
+
+    walk(expected, actual, path)
+    return out
+
+
+def _slow_stages(golden, timings, ratio, slack):
+    """Stages slower than golden * ratio + slack seconds."""
+    return [
+        f"{stage}: {timings[stage]:.3f}s vs golden {baseline:.3f}s"
+        for stage, baseline in golden.items()
+        if stage in timings and timings[stage] > baseline * ratio + slack
+    ]
+
+
+async def _run(args):
+    fixture = args.llm == "fixture" and args.command != "record"
+    mode = "record" if args.command == "record" else "off" if fixture else "replay"
+    store = ReplayStore(mode=mode, directory=args.recordings, simulate_latency=args.latency)
+    set_replay_store(store)
+    parser = Parser(tier=args.tier) if args.tier else Parser()
+    if fixture:
+        parser.openai_key, parser._client = "fixture", FixtureClient()
+    golden_dir = args.golden or (FIXTURE_GOLDEN_DIR if fixture else GOLDEN_DIR)
+    os.makedirs(golden_dir, exist_ok=True)
+
+    paths = sorted(glob.glob(os.path.join(TESTING_DIR, args.pattern)))
+    failures = 0
+    tokens = {"prompt_tokens": 0, "cached_tokens": 0}
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        golden_path = os.path.join(golden_dir, f"{name}.json")
+        with open(path, "rb") as fh:
+            content = fh.read()
+
+        started = time.perf_counter()
+        result = await parser.parse_pdf(content)
+        elapsed = time.perf_counter() - started
+        if not result.get("success") or result.get("degraded"):
+            failures += 1
+            print(f"❌ {name}: {result.get('error') or result.get('degraded')}")
+            continue
+
+        usage = result.get("llm", {}).get("usage") or {}
+        for kind in tokens:
+            tokens[kind] += usage.get(kind) or 0
+        parsed = _normalize(result["parsed"])
+        timings = result.get("timings", {})
+        if args.command in ("record", "update"):
+            with open(golden_path, "w", encoding="utf-8") as fh:
+                json.dump({"tier": result.get("tier"), "parsed": parsed, "timings": timings},
+                          fh, indent=2, sort_keys=True, ensure_ascii=False)
+            print(f"📝 {name}: golden written ({elapsed:.2f}s)")
+            continue
+
+        if not os.path.exists(golden_path):
+            failures += 1
+            print(f"❌ {name}: no golden file (run `record` first)")
+            continue
+        with open(golden_path, encoding="utf-8") as fh:
+            golden = json.load(fh)
+
+        problems = _diff(golden["parsed"], parsed)
+        if golden.get("tier") != result.get("tier"):
+            problems.append(f"tier: expected {golden.get('tier')!r}, got {result.get('tier')!r}")
+        slow = _slow_stages(golden.get("timings", {}), timings, args.ratio, args.slack)
+        if problems or (slow and not args.no_timing):
+            failures += 1
+            print(f"❌ {name}")
+            for line in problems + ([] if args.no_timing else slow):
+                print(f"     {line}")
+        else:
+            stages = "  ".join(f"{k}={v * 1000:.0f}ms" for k, v in timings.items())
+            print(f"✅ {name}: {stages}  cached={usage.get('cached_tokens', 0)}/{usage.get('prompt_tokens', 0)}")
+
+    summary = f"\n{len(paths) - failures}/{len(paths)} passed"
+    if store.replaying:
+        summary += f" (replay hits {store.hits}, misses {store.misses})"
+    if tokens["prompt_tokens"]:
+        summary += (f"\nprompt tokens {tokens['prompt_tokens']}, cached {tokens['cached_tokens']} "
+                    f"({tokens['cached_tokens'] / tokens['prompt_tokens']:.1%})")
+    print(summary)
+    return failures
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("command", choices=("check", "record", "update"), nargs="?", default="check")
+    ap.add_argument("--pattern", default="*.pdf", help="glob inside testing/")
+    ap.add_argument("--tier", help="extraction tier (default: EXTRACTION_TIER)")
+    ap.add_argument("--llm", choices=("fixture", "replay"), default="fixture",
+                    help="where check / update get LLM answers (record always calls the live API)")
+    ap.add_argument("--golden", help="golden directory (default: testing/golden/fixture or testing/golden)")
+    ap.add_argument("--recordings", default=RECORDINGS_DIR)
+    ap.add_argument("--latency", action="store_true", help="replay with the recorded LLM latency")
+    ap.add_argument("--ratio", type=float, default=1.5, help="allowed slowdown per stage")
+    ap.add_argument("--slack", type=float, default=0.05, help="absolute seconds added to each stage bound")
+    ap.add_argument("--no-timing", action="store_true", help="check outputs only")
+    args = ap.parse_args()
+
+    started = time.time()
+    failures = asyncio.run(_run(args))
+    print(f"⏱️  {time.time() - started:.1f}s")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Synthetic syllabus generator for scale testing.
+
+Builds a course-pack-style PDF of any size, the matching plain text, and the
+ground truth a perfect parser would return:
+
+- page 1: course header, two-column "Label   Value" info block (lecture line
+  included) and the prelim schedule
+- schedule pages: bordered Date | Topic | Due tables, one deliverable per row
+- prose pages: paragraphs with inline "HW3 due 3/5" / "PS #2 (Due 2/9)" deadlines
+
+Usage:
+    python scripts/synthetic_syllabus.py --pages 500 --items 2000 --out /tmp/synthetic
+"""
+
+import argparse
+import json
+import os
+import random
+from datetime import date, timedelta
+
+import fitz  # PyMuPDF
+
+PAGE_W, PAGE_H = 612, 792
+MARGIN = 72
+ROW_H = 20
+ROWS_PER_TABLE_PAGE = 30
+TABLE_COLS = (MARGIN, 150, 420, PAGE_W - MARGIN)
+TABLE_SHARE = 0.6  # content pages rendered as schedule tables (rest are prose)
+
+TERM_START = date(2025, 1, 21)
+TERM_END = date(2025, 5, 6)
+
+# {n} item number; prose kinds are (sentence template, description), {md} "M/D", {mon} "Feb 14"
+TABLE_KINDS = ["Problem Set #{n}", "Quiz {n}", "Lab Report {n}", "Project Milestone {n}"]
+PROSE_KINDS = [
+    ("HW{n} due {md}", "HW{n}"),
+    ("Problem Set #{n} due {mon}", "Problem Set #{n}"),
+    ("PS #{n} (Due {md})", "PS #{n}"),
+]
+PRELIMS = ((date(2025, 2, 12), "Thurs"), (date(2025, 3, 17), "Tues"), (date(2025, 4, 23), "Thurs"))
+
+INFO_ROWS = [
+    ("Course", "CS 9999: Synthetic Systems"),
+    ("Term", "Spring 2025"),
+    ("Instructor", "Prof. A. Example (ae123@example.edu)"),
+    ("Office Hours", "Tuesdays 2:00-3:00 PM, Gates 101"),
+    ("Lectures", "MWF, 9:05-9:55a, or 10:10-11:00a"),
+    ("Location", "200 Baker Laboratory"),
+    ("Credits", "4"),
+    ("Textbook", "Systems at Scale, 3rd edition"),
+]
+
+FILLER = (
+    "Readings for this unit build on the previous lecture and should be completed before "
+    "section. Discussion questions are posted on the course site and are not graded. "
+)
+
+
+def _md(d: date) -> str:
+    return f"{d.month}/{d.day}"
+
+
+def _mon(d: date) -> str:
+    return f"{d.strftime('%b')} {d.day}"
+
+
+def _item_dates(count: int, rnd: random.Random):
+    span = (TERM_END - TERM_START).days
+    return sorted(TERM_START + timedelta(days=rnd.randrange(span)) for _ in range(count))
+
+
+def _draw_table(page, top: float, rows) -> float:
+    """Bordered table; rows are (date, topic, due) tuples. Returns the bottom y."""
+    y = top
+    for cells in [("Date", "Topic", "Due")] + list(rows):
+        for x0, x1, cell in zip(TABLE_COLS, TABLE_COLS[1:], cells):
+            page.insert_text((x0 + 4, y + 14), cell, fontsize=9)
+        page.draw_line((TABLE_COLS[0], y), (TABLE_COLS[-1], y), width=0.5)
+        y += ROW_H
+    page.draw_line((TABLE_COLS[0], y), (TABLE_COLS[-1], y), width=0.5)
+    for x in TABLE_COLS:
+        page.draw_line((x, top), (x, y), width=0.5)
+    return y
+
+
+def generate(pages: int = 20, items: int = 100, seed: int = 0) -> dict:
+    """
+    Build a synthetic syllabus. Returns {"pdf": bytes, "text": str, "truth": {...},
+    "pages": int, "items": int}; truth holds assignments / exams / lectures in
+    the parser's output shape.
+    """
+    rnd = random.Random(seed)
+    pages = max(pages, 2)
+    content_pages = pages - 1
+    table_pages = max(1, round(content_pages * TABLE_SHARE)) if content_pages > 1 else content_pages
+    prose_pages = content_pages - table_pages
+    table_capacity = table_pages * ROWS_PER_TABLE_PAGE
+    table_items = min(items, table_capacity) if not prose_pages else min(items * table_pages // content_pages,
+                                                                       table_capacity)
+    prose_items = items - table_items
+
+    doc = fitz.open()
+    text_pages = []
+    truth = {"assignments": [], "exams": [], "lectures": []}
+
+    # Page 1: header, two-column info block, prelims
+    page = doc.new_page(width=PAGE_W, height=PAGE_H)
+    y = MARGIN
+    lines = []
+    for label, value in INFO_ROWS:
+        page.insert_text((MARGIN, y), label, fontsize=10)
+        page.insert_text((230, y), value, fontsize=10)
+        lines.append(f"{label}: {value}")
+        y += 18
+    prelim_line = "Prelims: 7:30-9:00p - " + "; ".join(f"{dow} {_md(d)}" for d, dow in PRELIMS)
+    page.insert_text((MARGIN, y + 18), prelim_line, fontsize=10)
+    lines.append(prelim_line)
+    text_pages.append("\n".join(lines))
+    for n, (d, _) in enumerate(PRELIMS, start=1):
+        truth["exams"].append({"description": f"Prelim {n}", "date": d.isoformat(), "time_due": "19:30"})
+    for day in (0, 2, 4):
+        for start, end in (("09:05", "09:55"), ("10:10", "11:00")):
+            truth["lectures"].append({"day": day, "start_time": start, "end_time": end})
+
+    # Schedule tables: every row carries a date; deliverable rows carry a Due cell
+    rows = []
+    for i, d in enumerate(_item_dates(table_items, rnd)):
+        kind = TABLE_KINDS[i % len(TABLE_KINDS)]
+        desc = kind.format(n=i // len(TABLE_KINDS) % 99 + 1)
+        rows.append((_md(d), f"Unit {i // 3 + 1}: topic {i}", desc))
+        truth["assignments"].append({"description": desc, "date": d.isoformat(), "time_due": "Not Listed"})
+    for p in range(table_pages):
+        chunk = rows[p * ROWS_PER_TABLE_PAGE:(p + 1) * ROWS_PER_TABLE_PAGE]
+        if len(chunk) < ROWS_PER_TABLE_PAGE // 2:
+            chunk += [("", f"Review session {k}", "") for k in range(ROWS_PER_TABLE_PAGE // 2 - len(chunk))]
+        page = doc.new_page(width=PAGE_W, height=PAGE_H)
+        _draw_table(page, MARGIN, chunk)
+        text_pages.append("\n".join(["Date | Topic | Due"] + [" | ".join(r) for r in chunk]))
+
+    # Prose pages: deadlines embedded in filler paragraphs
+    prose = [[] for _ in range(prose_pages)]
+    for i, d in enumerate(_item_dates(prose_items, rnd)):
+        template, desc_t = PROSE_KINDS[i % len(PROSE_KINDS)]
+        n = i // len(PROSE_KINDS) % 99 + 1
+        prose[i * prose_pages // max(prose_items, 1)].append(template.format(n=n, md=_md(d), mon=_mon(d)) + ".")
+        truth["assignments"].append({"description": desc_t.format(n=n), "date": d.isoformat(),
+                                     "time_due": "Not Listed"})
+    for sentences in prose:
+        paragraphs = [FILLER * 2] + [FILLER + " ".join(sentences[k:k + 4]) for k in range(0, len(sentences), 4)]
+        body = "\n\n".join(paragraphs)
+        page = doc.new_page(width=PAGE_W, height=PAGE_H)
+        if page.insert_textbox(fitz.Rect(MARGIN, MARGIN, PAGE_W - MARGIN, PAGE_H - MARGIN), body, fontsize=7) < 0:
+            raise ValueError(f"{len(sentences)} deadlines overflow a prose page; use more pages or fewer items")
+        text_pages.append(body)
+
+    pdf = doc.tobytes(garbage=3, deflate=True)
+    doc.close()
+    text = "\n\n".join(f"[PAGE {i}]\n{t}" for i, t in enumerate(text_pages, start=1))
+    return {"pdf": pdf, "text": text, "truth": truth, "pages": pages, "items": items}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--pages", type=int, default=20)
+    ap.add_argument("--items", type=int, default=100, help="dated deliverables (tables + prose)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=".", help="output directory")
+    args = ap.parse_args()
+
+    syllabus = generate(args.pages, args.items, args.seed)
+    os.makedirs(args.out, exist_ok=True)
+    stem = os.path.join(args.out, f"synthetic-{args.pages}p-{args.items}i")
+    with open(stem + ".pdf", "wb") as fh:
+        fh.write(syllabus["pdf"])
+    with open(stem + ".txt", "w") as fh:
+        fh.write(syllabus["text"])
+    with open(stem + ".truth.json", "w") as fh:
+        json.dump(syllabus["truth"], fh, indent=2)
+    print(f"✅ {stem}.pdf ({len(syllabus['pdf']) / 1e6:.1f} MB), .txt and .truth.json written")
+
+
+if __name__ == "__main__":
+    main()